@@ -2,14 +2,16 @@
 import logging
 import httpx
 from typing import Optional
+from . import event_log, http_pool, metrics
 from .config import settings
 
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent"
 logger = logging.getLogger(__name__)
 
-async def get_ai_response(system_prompt: str, user_prompt: str) -> Optional[str]:
+async def get_ai_response(system_prompt: str, user_prompt: str, json_response: bool = False) -> Optional[str]:
     """
     A generic function to get a response from the Gemini AI model.
+    With json_response the model is asked to reply with JSON only.
     """
     if not settings.GEMINI_API_KEY:
         logger.warning("GEMINI_API_KEY is not set. Cannot call AI.")
@@ -21,27 +23,33 @@ async def get_ai_response(system_prompt: str, user_prompt: str) -> Optional[str]
         "contents": [{"parts": [{"text": user_prompt}]}],
         "systemInstruction": {"parts": [{"text": system_prompt}]},
     }
+    if json_response:
+        payload["generationConfig"] = {"responseMimeType": "application/json"}
     
-    async with httpx.AsyncClient(timeout=90.0) as client: # Increased timeout for potentially longer tasks
-        try:
-            response = await client.post(GEMINI_API_URL, headers=headers, params=params, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            candidate = data.get("candidates", [{}])[0]
-            content = candidate.get("content", {}).get("parts", [{}])[0]
-            feedback = content.get("text")
-            
-            if not feedback:
-                logger.error("AI response was empty or malformed.")
-                return "Sorry, the AI couldn't generate a response at this moment."
-            return feedback
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error from AI API: {e.response.text}")
-            return "Sorry, I'm having trouble connecting to the AI service right now."
-        except Exception as e:
-            logger.error(f"An unexpected error occurred while calling AI API: {e}")
-            return "An unexpected error occurred. Please try again."
+    client = http_pool.client()
+    try:
+        event_log.add("ai_calls")
+        with event_log.timed("ai"), metrics.span("ai"):
+            # Generous timeout: long CVs and interview transcripts take the model a while.
+            response = await client.post(GEMINI_API_URL, headers=headers, params=params, json=payload, timeout=90.0)
+        response.raise_for_status()
+        data = response.json()
+        event_log.add("ai_tokens", data.get("usageMetadata", {}).get("totalTokenCount", 0))
+        
+        candidate = data.get("candidates", [{}])[0]
+        content = candidate.get("content", {}).get("parts", [{}])[0]
+        feedback = content.get("text")
+        
+        if not feedback:
+            logger.error("AI response was empty or malformed.")
+            return "Sorry, the AI couldn't generate a response at this moment."
+        return feedback
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Error from AI API: {e.response.text}")
+        return "Sorry, I'm having trouble connecting to the AI service right now."
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while calling AI API: {e}")
+        return "An unexpected error occurred. Please try again."
 
 async def optimize_resume(cv_text: str, job_description: str) -> Optional[str]:
     """
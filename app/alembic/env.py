@@ -0,0 +1,46 @@
+# app/alembic/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from app import models  # noqa: F401  (registers every table on Base.metadata)
+from app.config import settings
+from app.database import Base, schema_engines
+
+config = context.config
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline() -> None:
+    """Emits the migration SQL without connecting to the database."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """
+    Runs the migrations against every database holding the app's tables:
+    DATABASE_URL, or each shard file when SQLITE_SHARD_COUNT > 1 (each keeps
+    its own alembic_version).
+    """
+    for connectable in schema_engines():
+        with connectable.connect() as connection:
+            # SQLite cannot ALTER/DROP columns in place; batch mode rebuilds the table instead.
+            context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+            with context.begin_transaction():
+                context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
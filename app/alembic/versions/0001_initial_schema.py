@@ -0,0 +1,62 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_sessions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('phone_number', sa.String(), nullable=False),
+        sa.Column('user_name', sa.String(), nullable=True),
+        sa.Column('job_interest', sa.String(), nullable=True),
+        sa.Column('training_interest', sa.String(), nullable=True),
+        sa.Column('mentorship_interest', sa.String(), nullable=True),
+        sa.Column('entrepreneurship_interest', sa.String(), nullable=True),
+        sa.Column('resume_data', sa.JSON(), nullable=True),
+        sa.Column('interview_data', sa.JSON(), nullable=True),
+        sa.Column('cover_letter_data', sa.JSON(), nullable=True),
+        sa.Column('current_menu', sa.String(), nullable=False),
+        sa.Column('session_data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('last_active', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_user_sessions_id'), 'user_sessions', ['id'], unique=False)
+    op.create_index(op.f('ix_user_sessions_phone_number'), 'user_sessions', ['phone_number'], unique=True)
+    op.create_table(
+        'feedback',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_phone_number', sa.String(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=True),
+        sa.Column('what_liked', sa.Text(), nullable=True),
+        sa.Column('what_confusing', sa.Text(), nullable=True),
+        sa.Column('feature_requests', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['user_phone_number'], ['user_sessions.phone_number']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_feedback_id'), 'feedback', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_feedback_id'), table_name='feedback')
+    op.drop_table('feedback')
+    op.drop_index(op.f('ix_user_sessions_phone_number'), table_name='user_sessions')
+    op.drop_index(op.f('ix_user_sessions_id'), table_name='user_sessions')
+    op.drop_table('user_sessions')
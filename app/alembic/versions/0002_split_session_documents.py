@@ -0,0 +1,61 @@
+"""move CV, cover letter and interview documents out of user_sessions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_documents',
+        sa.Column('user_session_id', sa.Integer(), nullable=False),
+        sa.Column('resume_data', sa.JSON(), nullable=False),
+        sa.Column('cover_letter_data', sa.JSON(), nullable=False),
+        sa.Column('interview_data', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['user_session_id'], ['user_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_session_id'),
+    )
+    # Only users who have started a document flow need a row; everyone else gets one on first use.
+    op.execute(
+        """
+        INSERT INTO user_documents (user_session_id, resume_data, cover_letter_data, interview_data)
+        SELECT id, COALESCE(resume_data, '{}'), COALESCE(cover_letter_data, '{}'), COALESCE(interview_data, '{}')
+        FROM user_sessions
+        WHERE COALESCE(CAST(resume_data AS TEXT), '{}') <> '{}'
+           OR COALESCE(CAST(cover_letter_data AS TEXT), '{}') <> '{}'
+           OR COALESCE(CAST(interview_data AS TEXT), '{}') <> '{}'
+        """
+    )
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.drop_column('resume_data')
+        batch_op.drop_column('cover_letter_data')
+        batch_op.drop_column('interview_data')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.add_column(sa.Column('resume_data', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('cover_letter_data', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('interview_data', sa.JSON(), nullable=True))
+    op.execute(
+        """
+        UPDATE user_sessions SET
+            resume_data = (SELECT resume_data FROM user_documents WHERE user_session_id = user_sessions.id),
+            cover_letter_data = (SELECT cover_letter_data FROM user_documents WHERE user_session_id = user_sessions.id),
+            interview_data = (SELECT interview_data FROM user_documents WHERE user_session_id = user_sessions.id)
+        """
+    )
+    op.drop_table('user_documents')
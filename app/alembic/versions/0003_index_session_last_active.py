@@ -0,0 +1,25 @@
+"""index user_sessions.last_active for the expiry sweeper
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_sessions_last_active', 'user_sessions', ['last_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_sessions_last_active', table_name='user_sessions')
@@ -0,0 +1,64 @@
+"""rewrite user_sessions.session_data in the compact state encoding
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.session_state import decode_state, encode_state
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+user_sessions = sa.table(
+    'user_sessions',
+    sa.column('id', sa.Integer),
+    sa.column('session_data', sa.JSON),
+)
+
+
+def _rewrite(convert) -> None:
+    """Rewrites session_data batch by batch, only for rows whose stored form changes."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(user_sessions.c.id, user_sessions.c.session_data)
+            .where(user_sessions.c.id > last_id)
+            .order_by(user_sessions.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            converted = convert(row.session_data)
+            if converted != row.session_data:
+                updates.append({'row_id': row.id, 'data': converted})
+        if updates:
+            conn.execute(
+                user_sessions.update().where(user_sessions.c.id == sa.bindparam('row_id')).values(session_data=sa.bindparam('data')),
+                updates,
+            )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    # Transient values (AI feedback, pasted job descriptions) only live for a
+    # turn or two, so they are dropped here rather than moved out of the row.
+    _rewrite(lambda data: encode_state(decode_state(data, store=None), store=None))
+
+
+def downgrade() -> None:
+    _rewrite(lambda data: decode_state(data, store=None))
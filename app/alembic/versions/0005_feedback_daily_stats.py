@@ -0,0 +1,54 @@
+"""add feedback_daily_stats, the aggregates behind the admin feedback analytics
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+feedback = sa.table(
+    'feedback',
+    sa.column('rating', sa.Integer),
+    sa.column('timestamp', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    stats = op.create_table(
+        'feedback_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('responses', sa.Integer(), nullable=False),
+        sa.Column('rating_1', sa.Integer(), nullable=False),
+        sa.Column('rating_2', sa.Integer(), nullable=False),
+        sa.Column('rating_3', sa.Integer(), nullable=False),
+        sa.Column('rating_4', sa.Integer(), nullable=False),
+        sa.Column('rating_5', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    # One pass over the existing feedback; from here on the writer keeps the counts current.
+    day = sa.func.date(feedback.c.timestamp)
+    op.execute(
+        stats.insert().from_select(
+            ['day', 'responses', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'],
+            sa.select(
+                day,
+                sa.func.count(),
+                *[sa.func.sum(sa.case((feedback.c.rating == stars, 1), else_=0)) for stars in range(1, 6)],
+            ).group_by(day),
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('feedback_daily_stats')
@@ -0,0 +1,48 @@
+"""add conversation_events, the append-only conversation event log
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'conversation_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('phone_hash', sa.String(length=16), nullable=False),
+        sa.Column('menu_before', sa.String(length=32), nullable=False),
+        sa.Column('menu_after', sa.String(length=32), nullable=False),
+        sa.Column('intent', sa.String(length=32), nullable=False),
+        sa.Column('step', sa.String(length=32), nullable=True),
+        sa.Column('error', sa.Boolean(), nullable=False),
+        sa.Column('total_ms', sa.Integer(), nullable=False),
+        sa.Column('db_ms', sa.Integer(), nullable=False),
+        sa.Column('ai_ms', sa.Integer(), nullable=False),
+        sa.Column('send_ms', sa.Integer(), nullable=False),
+        sa.Column('ai_calls', sa.Integer(), nullable=False),
+        sa.Column('ai_tokens', sa.Integer(), nullable=False),
+        sa.Column('catalog_hits', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_conversation_events_created_at', 'conversation_events', ['created_at'], unique=False)
+    op.create_index('ix_conversation_events_intent_created_at', 'conversation_events', ['intent', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversation_events_intent_created_at', table_name='conversation_events')
+    op.drop_index('ix_conversation_events_created_at', table_name='conversation_events')
+    op.drop_table('conversation_events')
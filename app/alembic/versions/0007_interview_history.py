@@ -0,0 +1,28 @@
+"""add user_documents.interview_history, the interview questions a user has been asked
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('user_documents') as batch_op:
+        batch_op.add_column(sa.Column('interview_history', sa.Text(), nullable=False, server_default=''))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_documents') as batch_op:
+        batch_op.drop_column('interview_history')
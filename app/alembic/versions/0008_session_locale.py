@@ -0,0 +1,28 @@
+"""add user_sessions.locale, the language a user's replies are written in
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.add_column(sa.Column('locale', sa.String(length=8), nullable=False, server_default='en'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.drop_column('locale')
@@ -0,0 +1,35 @@
+"""add shared_state, the database backend of app/shared_state.py
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'shared_state',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('value', sa.JSON(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_shared_state_expires_at', 'shared_state', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_shared_state_expires_at', table_name='shared_state')
+    op.drop_table('shared_state')
@@ -0,0 +1,46 @@
+"""add campaigns, the broadcasts sent by app/campaigns.py
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-23 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'campaigns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('job_interest', sa.String(), nullable=True),
+        sa.Column('training_interest', sa.String(), nullable=True),
+        sa.Column('active_since', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('active_before', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('owner', sa.String(length=32), nullable=True),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('shard_id', sa.String(length=16), nullable=True),
+        sa.Column('after_id', sa.Integer(), nullable=False),
+        sa.Column('sent', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_campaigns_status', 'campaigns', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_campaigns_status', table_name='campaigns')
+    op.drop_table('campaigns')
@@ -0,0 +1,32 @@
+"""add campaigns.template_name, template_language and template_params, the template a broadcast is sent as
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-24 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('campaigns') as batch_op:
+        batch_op.add_column(sa.Column('template_name', sa.String(length=512), nullable=True))
+        batch_op.add_column(sa.Column('template_language', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('template_params', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('campaigns') as batch_op:
+        batch_op.drop_column('template_params')
+        batch_op.drop_column('template_language')
+        batch_op.drop_column('template_name')
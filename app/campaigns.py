@@ -0,0 +1,350 @@
+# app/campaigns.py
+"""
+Broadcast campaigns: one message sent to every user matching some filters.
+
+An admin creates a campaign (POST /admin/campaigns) with the message and any
+of job_interest, training_interest (matched case-insensitively) and a
+last_active window. Web users are never included. WhatsApp only delivers
+free-form text to users who wrote in the last 24 hours, so a campaign names
+an approved message template (template_name, template_language and the
+template_params for its body) and is sent as that; one without a template
+goes out as plain text and reaches only recent users. Every worker runs
+CAMPAIGNS.run_sender(), which claims a pending campaign and sends it:
+
+- Recipients are streamed from user_sessions in id order, CAMPAIGN_FETCH_SIZE
+  rows per round trip (yield_per; a server-side cursor on PostgreSQL), shard
+  by shard in sharded mode, so the table is never loaded into memory. The
+  cursor is reopened from the last id read every checkpoint, so no read
+  transaction stays open for the whole campaign.
+- Sends are paced to CAMPAIGN_SEND_RATE per second over all workers, which
+  take turns from a counter per second kept in STATE (app/shared_state.py;
+  with the memory backend the rate holds per process), with at most
+  CAMPAIGN_SEND_CONCURRENCY waiting on WhatsApp at once. A failed send is
+  counted and skipped; a 429 from WhatsApp instead pauses all of the
+  worker's sends (for its Retry-After, or a backoff doubling from
+  RATE_LIMIT_BACKOFF_SECONDS) and the send is retried, up to
+  RATE_LIMIT_RETRIES times.
+- Every CAMPAIGN_CHECKPOINT_SECONDS the campaign row records the last
+  recipient every earlier one has been sent to, and renews the claim's lease.
+  A campaign whose worker died is taken over by another worker once the lease
+  (CAMPAIGN_LEASE_SECONDS) runs out, from that checkpoint: delivery is at
+  least once, and the users after the checkpoint may get the message twice.
+  A worker that is shut down releases its campaign at once.
+
+Cancelling (POST /admin/campaigns/{id}/cancel) takes effect at the sending
+worker's next checkpoint; checkpoints only update a running campaign, so a
+cancelled one is never marked done.
+
+Campaigns live in the first database (shard0 in sharded mode), reached
+through its engine directly, as app/shared_state.py does.
+"""
+import asyncio
+import logging
+import secrets
+import time
+from collections import deque
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import Select
+
+from . import models, sharding, whatsapp_client
+from .config import settings
+from .database import AsyncSessionLocal, async_schema_engines
+from .shared_state import STATE
+
+logger = logging.getLogger(__name__)
+
+Campaign = models.Campaign
+UserSession = models.UserSession
+
+RATE_LIMIT_RETRIES = 6
+RATE_LIMIT_BACKOFF_SECONDS = 1.0
+RATE_LIMIT_BACKOFF_MAX_SECONDS = 60.0
+
+def recipients_query(campaign: Any) -> Select:
+    """The ids and phone numbers of the users a campaign (or anything with its filter attributes) is sent to."""
+    stmt = select(UserSession.id, UserSession.phone_number).where(UserSession.phone_number.not_like("web-%"))
+    if campaign.job_interest:
+        stmt = stmt.where(func.lower(UserSession.job_interest) == campaign.job_interest.lower())
+    if campaign.training_interest:
+        stmt = stmt.where(func.lower(UserSession.training_interest) == campaign.training_interest.lower())
+    if campaign.active_since is not None:
+        stmt = stmt.where(UserSession.last_active >= campaign.active_since)
+    if campaign.active_before is not None:
+        stmt = stmt.where(UserSession.last_active < campaign.active_before)
+    return stmt
+
+def _shards() -> List[Optional[str]]:
+    """The shards recipients are read from, in the order campaigns go through them."""
+    return sharding.shard_ids() if sharding.is_sharded() else [None]
+
+def _as_dict(row: Row) -> Dict[str, Any]:
+    return {key: value for key, value in row._mapping.items() if key != "owner"}
+
+class CampaignSender:
+    """Claims campaigns and sends them, checkpointing progress in the campaigns table."""
+
+    def __init__(self, engine: AsyncEngine, rate: float, concurrency: int, fetch_size: int,
+                 checkpoint_interval: float, lease: float, poll_interval: float,
+                 send: Callable[[str, Row], Awaitable[bool]] = None):
+        self.engine = engine
+        self.rate = rate
+        self.concurrency = concurrency
+        self.fetch_size = fetch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.lease = lease
+        self.poll_interval = poll_interval
+        # Sends a campaign (its row) to one phone number; whether it went out.
+        self.send = send or self._deliver
+        # Claims this process holds are marked with it.
+        self.owner = secrets.token_hex(8)
+        self._wake = asyncio.Event()
+        # Monotonic time before which no send starts, after a 429.
+        self._resume_at = 0.0
+        self.stats: Dict[str, int] = {"campaigns": 0, "sent": 0, "failed": 0, "checkpoints": 0, "rate_limited": 0}
+
+    # --- Admin ---
+
+    async def create(self, message: str, job_interest: Optional[str] = None, training_interest: Optional[str] = None,
+                     active_since: Optional[datetime] = None, active_before: Optional[datetime] = None,
+                     template_name: Optional[str] = None, template_language: str = "en",
+                     template_params: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Stores a pending campaign, which the next sender to look claims."""
+        stmt = insert(Campaign).values(
+            message=message, template_name=template_name, template_language=template_language if template_name else None,
+            template_params=(template_params or []) if template_name else None,
+            job_interest=job_interest, training_interest=training_interest,
+            active_since=active_since, active_before=active_before,
+            status="pending", after_id=0, sent=0, failed=0,
+        ).returning(*Campaign.__table__.c)
+        async with self.engine.begin() as connection:
+            row = (await connection.execute(stmt)).one()
+        self._wake.set()
+        return _as_dict(row)
+
+    async def get(self, campaign_id: int) -> Optional[Dict[str, Any]]:
+        async with self.engine.connect() as connection:
+            row = (await connection.execute(select(Campaign.__table__).where(Campaign.id == campaign_id))).first()
+        return _as_dict(row) if row is not None else None
+
+    async def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The newest campaigns with their progress."""
+        async with self.engine.connect() as connection:
+            rows = (await connection.execute(select(Campaign.__table__).order_by(Campaign.id.desc()).limit(limit))).all()
+        return [_as_dict(row) for row in rows]
+
+    async def cancel(self, campaign_id: int) -> bool:
+        """Cancels a campaign that has not finished; its sender stops at its next checkpoint."""
+        stmt = (
+            update(Campaign)
+            .where(Campaign.id == campaign_id, Campaign.status.in_(("pending", "running")))
+            .values(status="cancelled", finished_at=datetime.now(timezone.utc))
+        )
+        async with self.engine.begin() as connection:
+            return (await connection.execute(stmt)).rowcount == 1
+
+    @staticmethod
+    async def count_recipients(campaign: Any) -> int:
+        """How many users a campaign's filters select now, over every shard."""
+        stmt = select(func.count()).select_from(recipients_query(campaign).subquery())
+        total = 0
+        async with AsyncSessionLocal() as db:
+            for shard_id in _shards():
+                total += (await db.execute(stmt, bind_arguments={"shard_id": shard_id} if shard_id else None)).scalar_one()
+        return total
+
+    # --- Sending ---
+
+    async def _claim(self) -> Optional[Row]:
+        """Takes the oldest pending campaign, or a running one whose sender's lease ran out."""
+        now = datetime.now(timezone.utc)
+        claimable = (Campaign.status.in_(("pending", "running")), or_(Campaign.lease_until.is_(None), Campaign.lease_until < now))
+        async with self.engine.connect() as connection:
+            ids = (await connection.execute(select(Campaign.id).where(*claimable).order_by(Campaign.id))).scalars().all()
+        for campaign_id in ids:
+            # Re-checked in the UPDATE, so of several workers only one gets it.
+            stmt = (
+                update(Campaign)
+                .where(Campaign.id == campaign_id, *claimable)
+                .values(status="running", owner=self.owner, lease_until=now + timedelta(seconds=self.lease))
+                .returning(*Campaign.__table__.c)
+            )
+            async with self.engine.begin() as connection:
+                row = (await connection.execute(stmt)).first()
+            if row is not None:
+                return row
+        return None
+
+    async def _checkpoint(self, campaign_id: int, progress: Dict[str, Any], done: bool = False, release: bool = False) -> bool:
+        """
+        Records progress and renews the lease (ends it when releasing); False
+        if the campaign was cancelled or another worker took it over, in which
+        case nothing is written.
+        """
+        now = datetime.now(timezone.utc)
+        values = dict(progress, lease_until=now if release else now + timedelta(seconds=self.lease))
+        if done:
+            values.update(status="done", finished_at=now, owner=None, lease_until=None)
+        stmt = (
+            update(Campaign)
+            .where(Campaign.id == campaign_id, Campaign.owner == self.owner, Campaign.status == "running")
+            .values(**values)
+            .returning(Campaign.status)
+        )
+        async with self.engine.begin() as connection:
+            status = (await connection.execute(stmt)).scalar_one_or_none()
+        self.stats["checkpoints"] += 1
+        return status is not None
+
+    async def _recipients(self, campaign: Row, shard_id: Optional[str], after_id: int) -> AsyncIterator[Tuple[int, str]]:
+        """The campaign's recipients on a shard after after_id, a new cursor every checkpoint interval."""
+        query = recipients_query(campaign).order_by(UserSession.id).execution_options(yield_per=self.fetch_size)
+        bind_arguments = {"shard_id": shard_id} if shard_id else None
+        while True:
+            opened = time.monotonic()
+            async with AsyncSessionLocal() as db:
+                result = await db.stream(query.where(UserSession.id > after_id), bind_arguments=bind_arguments)
+                # A batch per await; iterating the result itself would cost one per row.
+                async for batch in result.partitions():
+                    for after_id, phone_number in batch:
+                        yield after_id, phone_number
+                    if time.monotonic() - opened >= self.checkpoint_interval:
+                        await result.close()
+                        break
+                else:
+                    return
+
+    async def _pace(self):
+        """
+        Waits for a turn to send. Turns are numbered per window of time in
+        STATE, rate * window of them per window, and each is spread to its
+        own moment in the window; a worker whose number is past the budget
+        tries again in the next window.
+        """
+        window = max(1.0, 1 / self.rate)
+        budget = round(self.rate * window)
+        while True:
+            index = int(time.time() // window)
+            turn = await STATE.incr(f"campaign_sends:{index}", ttl=2 * window)
+            if turn <= budget:
+                delay = index * window + (turn - 1) / self.rate - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                return
+            await asyncio.sleep(max(0.0, (index + 1) * window - time.time()))
+
+    @staticmethod
+    async def _deliver(phone_number: str, campaign: Row) -> bool:
+        """Sends the campaign's template, or its message as text when it has none."""
+        if campaign.template_name:
+            return await whatsapp_client.send_whatsapp_template(
+                phone_number, campaign.template_name, campaign.template_language or "en", campaign.template_params or [])
+        return await whatsapp_client.send_whatsapp_message(phone_number, campaign.message)
+
+    async def _wait_for_resume(self):
+        while (delay := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def _send_one(self, phone_number: str, campaign: Row, slots: asyncio.Semaphore) -> bool:
+        try:
+            for attempt in range(RATE_LIMIT_RETRIES + 1):
+                try:
+                    return bool(await self.send(phone_number, campaign))
+                except whatsapp_client.RateLimited as e:
+                    self.stats["rate_limited"] += 1
+                    if attempt == RATE_LIMIT_RETRIES:
+                        logger.error(f"Campaign send still rate limited after {attempt} retries", extra={"phone": phone_number})
+                        return False
+                    # WhatsApp limits the sending number as a whole, so every send waits, not only this one.
+                    delay = e.retry_after or min(RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt, RATE_LIMIT_BACKOFF_MAX_SECONDS)
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                    await self._wait_for_resume()
+        except Exception as e:
+            logger.error(f"Campaign send failed: {e}", extra={"phone": phone_number})
+            return False
+        finally:
+            slots.release()
+
+    async def send_campaign(self, campaign: Row) -> bool:
+        """Sends a claimed campaign from its checkpoint; False if it stopped before the end."""
+        shards = _shards()
+        first = shards.index(campaign.shard_id) if campaign.shard_id in shards else 0
+        progress = {"shard_id": shards[first], "after_id": campaign.after_id, "sent": campaign.sent, "failed": campaign.failed}
+        # Sends in recipient order; the checkpoint only moves past the ones that have finished.
+        in_flight: Deque[Tuple[int, asyncio.Task]] = deque()
+        slots = asyncio.Semaphore(self.concurrency)
+        last_checkpoint = time.monotonic()
+
+        def settle():
+            while in_flight and in_flight[0][1].done():
+                recipient_id, task = in_flight.popleft()
+                progress["after_id"] = recipient_id
+                progress["sent" if task.result() else "failed"] += 1
+
+        logger.info(f"Sending campaign {campaign.id} from {progress['shard_id'] or 'the start'} after id {progress['after_id']}")
+        try:
+            for shard_id in shards[first:]:
+                if shard_id != progress["shard_id"]:
+                    progress.update(shard_id=shard_id, after_id=0)
+                async with aclosing(self._recipients(campaign, shard_id, progress["after_id"])) as recipients:
+                    async for recipient_id, phone_number in recipients:
+                        await slots.acquire()
+                        await self._wait_for_resume()
+                        if self.rate > 0:
+                            await self._pace()
+                        in_flight.append((recipient_id, asyncio.create_task(self._send_one(phone_number, campaign, slots))))
+                        settle()
+                        if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                            last_checkpoint = time.monotonic()
+                            if not await self._checkpoint(campaign.id, progress):
+                                logger.info(f"Campaign {campaign.id} was cancelled or taken over; stopping")
+                                return False
+                await asyncio.gather(*(task for _, task in in_flight))
+                settle()
+            if not await self._checkpoint(campaign.id, progress, done=True):
+                logger.info(f"Campaign {campaign.id} was cancelled or taken over as it finished")
+                return False
+        except asyncio.CancelledError:
+            # Shutting down: what has finished is recorded and the campaign released for another worker.
+            settle()
+            for _, task in in_flight:
+                task.cancel()
+            await self._checkpoint(campaign.id, progress, release=True)
+            raise
+        finally:
+            self.stats["sent"] += progress["sent"] - campaign.sent
+            self.stats["failed"] += progress["failed"] - campaign.failed
+        self.stats["campaigns"] += 1
+        logger.info(f"Campaign {campaign.id} done: {progress['sent']} sent, {progress['failed']} failed")
+        return True
+
+    async def run_sender(self):
+        """Sends whatever campaign can be claimed, then waits for a new one or the next poll, until cancelled."""
+        if self.poll_interval <= 0:
+            return
+        while True:
+            self._wake.clear()
+            try:
+                while (campaign := await self._claim()) is not None:
+                    await self.send_campaign(campaign)
+            except Exception as e:
+                logger.error(f"Campaign sender failed: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+CAMPAIGNS = CampaignSender(
+    async_schema_engines()[0],
+    rate=settings.CAMPAIGN_SEND_RATE,
+    concurrency=settings.CAMPAIGN_SEND_CONCURRENCY,
+    fetch_size=settings.CAMPAIGN_FETCH_SIZE,
+    checkpoint_interval=settings.CAMPAIGN_CHECKPOINT_SECONDS,
+    lease=settings.CAMPAIGN_LEASE_SECONDS,
+    poll_interval=settings.CAMPAIGN_POLL_SECONDS,
+)
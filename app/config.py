@@ -2,7 +2,7 @@
 import os
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 
 # Define the path to the .env file in the project root
 env_path = Path(__file__).resolve().parent.parent / ".env"
@@ -14,6 +14,28 @@ class Settings(BaseSettings):
     # Database configuration
     DATABASE_URL: str = "sqlite:///./kazileo.db"
 
+    # Engine profile: "auto" picks "postgres" or "sqlite" from DATABASE_URL,
+    # "default" uses SQLAlchemy's untuned defaults.
+    DB_ENGINE_PROFILE: str = "auto"
+
+    # PostgreSQL pooling and statement caching
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    # SQLite pragmas applied to every connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
+
+    # Sharded SQLite: above 1, sessions are spread over this many database files
+    # by phone number hash (see app/sharding.py and migrate_to_shards.py).
+    SQLITE_SHARD_COUNT: int = 1
+
     # WhatsApp API configuration
     WHATSAPP_TOKEN: str = ""
     WHATSAPP_PHONE_ID: str = ""
@@ -26,9 +48,122 @@ class Settings(BaseSettings):
 
 
 
+    # Partner job feeds (comma-separated CSV/JSON/RSS paths), how long a listing
+    # stays live, and how often the feeds are re-read and old listings expired
+    # (0 reads them only at startup).
+    JOB_FEED_PATHS: str = ""
+    JOB_FEED_MAX_AGE_DAYS: int = 30
+    JOB_FEED_REFRESH_SECONDS: float = 900.0
+
+    # Extra interview question files or directories of them (comma-separated), on top of app/data/interview_questions
+    INTERVIEW_QUESTION_PATHS: str = ""
+
     # Session timeout in minutes (e.g., 5 minutes)
     SESSION_TIMEOUT_MINUTES: int = 5
 
+    # Write-behind session cache: how often dirty sessions are flushed (0 writes
+    # through on every turn) and how many sessions are kept in memory per process.
+    SESSION_FLUSH_INTERVAL_SECONDS: float = 1.0
+    SESSION_CACHE_MAX_ENTRIES: int = 10000
+
+    # Expiry sweeper: how often idle sessions are reset in bulk, how many rows
+    # each UPDATE touches, and after how many idle days an unfinished interview
+    # is compacted away (0 keeps them forever).
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 60.0
+    SESSION_SWEEP_BATCH_SIZE: int = 500
+    SESSION_COMPACT_AFTER_DAYS: int = 0
+
+    # session_data encoding: strings longer than this, and AI feedback / job
+    # descriptions, are held out of the row for this many seconds (with the
+    # memory SHARED_STATE_BACKEND only; otherwise they stay in the row).
+    SESSION_INLINE_MAX_CHARS: int = 256
+    SESSION_TRANSIENT_TTL_SECONDS: int = 3600
+
+    # Feedback writer: how often buffered feedback forms are written (0 writes
+    # each one as it completes) and the most held before an early flush.
+    FEEDBACK_FLUSH_INTERVAL_SECONDS: float = 2.0
+    FEEDBACK_BATCH_SIZE: int = 500
+
+    # Conversation event log: events are queued in memory and appended in
+    # batches every interval; past EVENT_LOG_MAX_PENDING queued events the
+    # oldest are dropped. Phone numbers are stored as hashes keyed with
+    # EVENT_LOG_HASH_KEY; left empty, a random key is generated once and kept in
+    # EVENT_LOG_HASH_KEY_FILE, which every worker and container must share (set
+    # the key itself when they do not share a disk).
+    EVENT_LOG_ENABLED: bool = True
+    EVENT_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    EVENT_LOG_MAX_PENDING: int = 50000
+    EVENT_LOG_BATCH_SIZE: int = 1000
+    EVENT_LOG_HASH_KEY: str = ""
+    EVENT_LOG_HASH_KEY_FILE: str = "./.event_log_hash_key"
+
+    # Free text the intent router cannot place is classified locally; below
+    # this probability the message is treated as not understood.
+    INTENT_MIN_CONFIDENCE: float = 0.6
+
+    # CV and cover letter export: worker processes rendering PDF/DOCX files (0
+    # renders on a thread instead), how many uploaded files are remembered by
+    # content hash, and where files for web users are kept (default: a temp dir).
+    EXPORT_WORKERS: int = 2
+    EXPORT_CACHE_SIZE: int = 1000
+    EXPORT_LOCAL_DIR: str = ""
+
+    # Per-turn latency spans and the Prometheus GET /metrics endpoint; off,
+    # spans are a shared no-op and /metrics answers 404.
+    METRICS_ENABLED: bool = True
+
+    # Slow-turn profiler: the share of turns run under cProfile (0 profiles
+    # only the turns an admin asked to capture), how long a sampled turn must
+    # take to be kept, and how many kept profiles each process holds.
+    PROFILER_SAMPLE_RATE: float = 0.0
+    PROFILER_SLOW_TURN_SECONDS: float = 1.0
+    PROFILER_MAX_PROFILES: int = 50
+
+    # Logging: records are queued and written as JSON lines by a background
+    # thread every interval; past LOG_MAX_PENDING waiting records new ones are
+    # dropped. Phone numbers are logged as hashes and message bodies cut to
+    # LOG_BODY_MAX_CHARS (0 logs only their length). LOG_SAMPLE_RATES keeps a
+    # share of a logger's records below WARNING, e.g.
+    # LOG_SAMPLE_RATES='{"uvicorn.access": 0.01}'.
+    LOG_LEVEL: str = "INFO"
+    LOG_FLUSH_INTERVAL_SECONDS: float = 0.25
+    LOG_MAX_PENDING: int = 10000
+    LOG_BODY_MAX_CHARS: int = 0
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+    # Shared state (see app/shared_state.py): "memory" keeps web replies, turn
+    # locks and session versions in this process, which suits one worker;
+    # "database" keeps them in the shared_state table so that several workers
+    # or containers can serve the same users. A lock is waited for at most
+    # SHARED_STATE_LOCK_TIMEOUT_SECONDS (a user's message then gets a "busy"
+    # reply); its holder renews it while running, and if the holder dies it
+    # is freed SHARED_STATE_LOCK_LEASE_SECONDS after the last renewal.
+    SHARED_STATE_BACKEND: str = "memory"
+    SHARED_STATE_LOCK_TIMEOUT_SECONDS: float = 120.0
+    SHARED_STATE_LOCK_LEASE_SECONDS: float = 30.0
+
+    # Broadcast campaigns (see app/campaigns.py): messages sent per second
+    # over all workers (shared through SHARED_STATE_BACKEND) and at most at
+    # once per worker, recipients fetched per round trip from the database,
+    # how often progress is checkpointed (and the recipient cursor reopened),
+    # how long a silent sender keeps its campaign before another worker takes
+    # it over, and how often each worker looks for campaigns to send.
+    CAMPAIGN_SEND_RATE: float = 20.0
+    CAMPAIGN_SEND_CONCURRENCY: int = 8
+    CAMPAIGN_FETCH_SIZE: int = 1000
+    CAMPAIGN_CHECKPOINT_SECONDS: float = 5.0
+    CAMPAIGN_LEASE_SECONDS: float = 60.0
+    CAMPAIGN_POLL_SECONDS: float = 30.0
+
+    # Startup warm-up (see app/startup.py): how long to wait before retrying a
+    # step that failed, such as a database that is not up yet, and how long
+    # /readyz waits for the database to answer.
+    STARTUP_RETRY_SECONDS: float = 5.0
+    READYZ_DB_TIMEOUT_SECONDS: float = 2.0
+
+    # Sent as the X-Admin-Token header to the /admin endpoints; empty disables them.
+    ADMIN_TOKEN: str = ""
+
     model_config = SettingsConfigDict(env_file=env_path, extra='ignore')
 
 # Create a single, importable instance of the settings
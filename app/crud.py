@@ -1,70 +1,422 @@
+import json
 import logging
+import weakref
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session, attributes
-from app import models
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import JSON, Boolean, Text, case, column, func, inspect, literal, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import attributes
+from app import cover_letter_generator, event_log, feedback_handler, models, resume_builder, sharding
 from app.config import settings
 
-def get_or_create_session(db: Session, phone_number: str, user_name: str) -> tuple[models.UserSession, bool]:
+logger = logging.getLogger(__name__)
+
+# Columns a conversation turn can change, and which of them hold JSON documents.
+SESSION_STATE_COLUMNS = (
+    "user_name", "job_interest", "training_interest", "mentorship_interest", "entrepreneurship_interest",
+    "current_menu", "session_data", "last_active", "locale",
+)
+DOCUMENT_COLUMNS = ("resume_data", "cover_letter_data", "interview_data", "interview_history")
+JSON_COLUMNS = {"session_data", "resume_data", "cover_letter_data", "interview_data"}
+
+# What each loaded session or document row looked like when it was last persisted.
+_snapshots: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+def _tracked_columns(obj: Any) -> Tuple[str, ...]:
+    return DOCUMENT_COLUMNS if isinstance(obj, models.UserDocuments) else SESSION_STATE_COLUMNS
+
+def _column_value(obj: Any, column: str) -> Any:
+    value = getattr(obj, column)
+    if column in JSON_COLUMNS:
+        return json.dumps(value, sort_keys=True, default=str)
+    return value
+
+def take_snapshot(obj: Any):
+    """Records a session's (or document row's) current column values as the persisted baseline."""
+    _snapshots[obj] = {column: _column_value(obj, column) for column in _tracked_columns(obj)}
+
+def is_persisted(obj: Any) -> bool:
+    """Whether the object has a row in the database that it was snapshotted against."""
+    return obj in _snapshots
+
+def changed_columns(obj: Any) -> Dict[str, Any]:
+    """
+    Returns {column: serialised value} for every column whose content differs
+    from the last snapshot. JSON columns are compared by their serialised form,
+    so in-place edits to the dicts are detected without flag_modified.
+    """
+    snapshot = _snapshots.get(obj, {})
+    changed = {}
+    for column in _tracked_columns(obj):
+        value = _column_value(obj, column)
+        if column not in snapshot or snapshot[column] != value:
+            changed[column] = value
+    return changed
+
+def mark_persisted(obj: Any, changed: Dict[str, Any]):
+    """Folds freshly written columns into the snapshot without reloading the row."""
+    _snapshots.setdefault(obj, {}).update(changed)
+
+def row_bytes(changed: Dict[str, Any]) -> int:
+    """Approximates how many bytes an UPDATE of these columns writes."""
+    return sum(len(str(value).encode("utf-8")) for value in changed.values() if value is not None)
+
+def apply_session_timeout(session: models.UserSession, now_utc: datetime):
+    """
+    Resets the menu and flow state if the session has been idle past the timeout.
+    Only sessions held in memory need this: stored rows are reset by the upsert
+    and, in bulk, by the expiry sweeper.
+    """
+    session_timeout = timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
+    last_active_aware = session.last_active.replace(tzinfo=timezone.utc)
+
+    if now_utc - last_active_aware > session_timeout:
+        logger.info("Session expired. Resetting menu.", extra={"phone": session.phone_number})
+        session.current_menu = "main"
+        session.session_data = {}
+
+def _dialect_insert(dialect_name: str):
+    """Returns the dialect's INSERT construct, which supports ON CONFLICT."""
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+
+async def get_or_create_session(db: AsyncSession, phone_number: str, user_name: str) -> tuple[models.UserSession, bool]:
     """
-    Retrieves an existing user session or creates a new one.
+    Retrieves an existing user session or creates a new one in a single
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, so concurrent
+    first messages from the same number never race on the unique constraint.
     Also returns a boolean indicating if the session is new.
+
+    The conflict branch bumps last_active and, if the session was idle past
+    the timeout, resets the menu and flow state (see apply_session_timeout).
     """
-    session = db.query(models.UserSession).filter(models.UserSession.phone_number == phone_number).first()
-    is_new = False
+    table = models.UserSession.__table__
+    now_utc = datetime.now(timezone.utc)
+    cutoff = now_utc - timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
+    with sharding.route(phone_number):
+        dialect_name = db.get_bind(models.UserSession.__mapper__).dialect.name
+    expired = table.c.last_active < cutoff
+
+    stmt = _dialect_insert(dialect_name)(models.UserSession).values(
+        phone_number=phone_number,
+        user_name=user_name,
+        current_menu="main",
+        session_data={},
+        created_at=now_utc,
+        last_active=now_utc,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.phone_number],
+        set_={
+            "current_menu": case((expired, literal("main")), else_=table.c.current_menu),
+            "session_data": case((expired, literal({}, JSON)), else_=table.c.session_data),
+            "last_active": now_utc,
+        },
+    )
+    if dialect_name == "postgresql":
+        # xmax is only zero for a row version this statement inserted.
+        is_new = literal_column("xmax").cast(Text) == "0"
+    else:
+        # SQLite has no such marker, but only a fresh row carries our own created_at.
+        is_new = table.c.created_at == now_utc
+    stmt = stmt.returning(*table.c, is_new.label("is_new"))
+    # Loading through select().from_statement() keeps the shard identity on the returned object.
+    stmt = select(models.UserSession, column("is_new", Boolean)).from_statement(stmt)
+
+    with sharding.route(phone_number):
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        session, is_new = result.one()
+        await db.commit()
+    take_snapshot(session)
+    if is_new:
+        logger.info("New user session created", extra={"phone": phone_number})
+    return session, bool(is_new)
 
-    if session:
-        # Check for session timeout
-        session_timeout = timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
-        now_utc = datetime.now(timezone.utc)
-        
-        last_active_aware = session.last_active.replace(tzinfo=timezone.utc)
+def loaded_documents(session: models.UserSession) -> Optional[models.UserDocuments]:
+    """Returns the session's documents if a flow has loaded them this turn, without loading them."""
+    value = inspect(session).attrs.documents.loaded_value
+    return value if isinstance(value, models.UserDocuments) else None
 
-        if now_utc - last_active_aware > session_timeout:
-            logging.info(f"Session for {phone_number} expired. Resetting menu.")
-            session.current_menu = "main"
-            session.session_data = {}
+async def load_documents(db: AsyncSession, session: models.UserSession) -> models.UserDocuments:
+    """
+    Fetches the CV, cover letter and interview documents for a session.
+    Only the flows that use them call this, so ordinary turns never read the blobs.
+    The row itself is created the first time the documents are saved.
+    """
+    documents = loaded_documents(session)
+    if documents is not None:
+        return documents
+
+    with sharding.route(session.phone_number), event_log.timed("db"):
+        documents = await db.get(models.UserDocuments, session.id)
+    if documents is None:
+        documents = models.UserDocuments(user_session_id=session.id, resume_data={}, cover_letter_data={}, interview_data={}, interview_history="")
     else:
-        logging.info(f"New user session created for {phone_number}")
-        # We no longer pass feedback_data here
-        session = models.UserSession(
-            phone_number=phone_number,
-            user_name=user_name,
-            current_menu="main",
-            session_data={},
-            resume_data={},
-            cover_letter_data={},
-            interview_data={}
-        )
-        db.add(session)
-        db.commit()
-        db.refresh(session)
-        is_new = True
-        
-    return session, is_new
-
-def update_session(db: Session, session: models.UserSession):
-    """
-    Marks session_data as modified to ensure changes are persisted.
-    """
-    attributes.flag_modified(session, "session_data")
-    attributes.flag_modified(session, "resume_data")
-    attributes.flag_modified(session, "cover_letter_data")
-    attributes.flag_modified(session, "interview_data")
-    # We no longer flag feedback_data here
-    db.commit()
-
-def save_feedback(db: Session, user_phone_number: str, feedback_data: dict):
-    """Saves user feedback to the database."""
-    user_session = db.query(models.UserSession).filter(models.UserSession.phone_number == user_phone_number).first()
-    if user_session:
-        new_feedback = models.Feedback(
-            rating=feedback_data.get("rating"),
-            likes=feedback_data.get("likes"),
-            dislikes=feedback_data.get("dislikes"),
-            suggestions=feedback_data.get("suggestions"),
-            user_session_id=user_session.id
-        )
-        db.add(new_feedback)
-        db.commit()
-        logging.info(f"Feedback saved for user {user_phone_number}")
+        if inspect(session).detached:
+            db.expunge(documents)
+        take_snapshot(documents)
+    attributes.set_committed_value(session, "documents", documents)
+    return documents
+
+async def update_session(db: AsyncSession, session: models.UserSession) -> int:
+    """
+    Persists only the columns whose content changed during the turn, including
+    the documents if a flow loaded them. Returns the approximate row bytes written.
+    """
+    documents = loaded_documents(session)
+    changed_documents = changed_columns(documents) if documents is not None else {}
+    if changed_columns(session) or changed_documents:
+        # Set explicitly so the onupdate default never leaves an expired attribute behind.
+        session.last_active = datetime.now(timezone.utc)
+    changed = changed_columns(session)
+    for column in JSON_COLUMNS.intersection(changed):
+        attributes.flag_modified(session, column)
+
+    if changed_documents:
+        if not is_persisted(documents):
+            db.add(documents)
+        for column in JSON_COLUMNS.intersection(changed_documents):
+            attributes.flag_modified(documents, column)
 
+    if not changed and not changed_documents:
+        return 0
+    with sharding.route(session.phone_number):
+        await db.commit()
+    mark_persisted(session, changed)
+    if changed_documents:
+        mark_persisted(documents, changed_documents)
+    return row_bytes(changed) + row_bytes(changed_documents)
+
+FEEDBACK_COLUMNS = ("rating", "what_liked", "what_confusing", "feature_requests")
+RATING_COLUMNS = ("rating_1", "rating_2", "rating_3", "rating_4", "rating_5")
+
+def feedback_row(user_phone_number: str, feedback_data: dict, now_utc: datetime = None) -> Dict[str, Any]:
+    """Maps a completed feedback conversation (see feedback_handler) onto a feedback row."""
+    row = {column: feedback_data.get(column) for column in FEEDBACK_COLUMNS}
+    row["user_phone_number"] = user_phone_number
+    row["timestamp"] = now_utc or datetime.now(timezone.utc)
+    return row
+
+def _daily_counts(rows) -> Dict[Any, Dict[str, int]]:
+    counts: Dict[Any, Dict[str, int]] = {}
+    for row in rows:
+        day = counts.setdefault(row["timestamp"].date(), {"responses": 0, **{column: 0 for column in RATING_COLUMNS}})
+        day["responses"] += 1
+        if row["rating"] in range(1, 6):
+            day[f"rating_{row['rating']}"] += 1
+    return counts
+
+async def save_feedback(db: AsyncSession, rows: List[Dict[str, Any]]):
+    """
+    Saves a batch of feedback rows (see feedback_row) and folds them into the
+    per-day aggregates: one multi-row INSERT and one upsert per shard, then a
+    single commit.
+    """
+    by_shard: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for row in rows:
+        shard_id = sharding.shard_for(row["user_phone_number"]) if sharding.is_sharded() else None
+        by_shard.setdefault(shard_id, []).append(row)
+
+    table = models.FeedbackDailyStats.__table__
+    for shard_rows in by_shard.values():
+        with sharding.route(shard_rows[0]["user_phone_number"]):
+            dialect_name = db.get_bind(models.Feedback.__mapper__).dialect.name
+            await db.execute(models.Feedback.__table__.insert(), shard_rows)
+            stmt = _dialect_insert(dialect_name)(table).values(
+                [{"day": day, **counts} for day, counts in _daily_counts(shard_rows).items()]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.day],
+                set_={column: table.c[column] + stmt.excluded[column] for column in ("responses",) + RATING_COLUMNS},
+            )
+            await db.execute(stmt)
+    with sharding.route(rows[0]["user_phone_number"]):
+        await db.commit()
+    logger.info("Saved %d feedback responses", len(rows))
+
+async def feedback_analytics(db: AsyncSession, days: int = 30, recent: int = 20) -> Dict[str, Any]:
+    """
+    Rating distribution, a daily trend over the last `days` days and the most
+    recent comments. The first two come from feedback_daily_stats; the comments
+    are the newest rows by primary key. Neither scans the feedback table.
+    In sharded mode each query fans out and the shards are merged here.
+    """
+    stats = models.FeedbackDailyStats
+    rating_sums = [func.coalesce(func.sum(getattr(stats, column)), 0) for column in RATING_COLUMNS]
+    distribution = [0] * len(RATING_COLUMNS)
+    responses = 0
+    for row in (await db.execute(select(func.coalesce(func.sum(stats.responses), 0), *rating_sums))).all():
+        responses += row[0]
+        distribution = [total + count for total, count in zip(distribution, row[1:])]
+
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    trend: Dict[Any, Dict[str, int]] = {}
+    for row in (await db.execute(select(stats.day, stats.responses, *[getattr(stats, column) for column in RATING_COLUMNS]).where(stats.day >= since))).all():
+        day = trend.setdefault(row.day, {"responses": 0, **{column: 0 for column in RATING_COLUMNS}})
+        day["responses"] += row.responses
+        for column in RATING_COLUMNS:
+            day[column] += getattr(row, column)
+
+    return {
+        "responses": responses,
+        "ratings": sum(distribution),
+        "average_rating": _average_rating(distribution),
+        "distribution": {str(stars): count for stars, count in enumerate(distribution, start=1)},
+        "trend": [
+            {
+                "day": day.isoformat(),
+                "responses": counts["responses"],
+                "average_rating": _average_rating([counts[column] for column in RATING_COLUMNS]),
+            }
+            for day, counts in sorted(trend.items())
+        ],
+        "recent": await recent_feedback(db, limit=recent),
+    }
+
+def _average_rating(distribution: List[int]) -> Optional[float]:
+    rated = sum(distribution)
+    return round(sum(stars * count for stars, count in enumerate(distribution, start=1)) / rated, 2) if rated else None
+
+async def recent_feedback(db: AsyncSession, limit: int = 20) -> List[Dict[str, Any]]:
+    """The newest feedback responses, newest first, as feedback_handler-style dicts."""
+    feedback = models.Feedback
+    stmt = select(feedback.timestamp, *[getattr(feedback, column) for column in FEEDBACK_COLUMNS]).order_by(feedback.id.desc()).limit(limit)
+    rows = (await db.execute(stmt)).all()
+    # Every shard returns its own newest rows; keep the newest overall.
+    rows = sorted(rows, key=lambda row: row.timestamp, reverse=True)[:limit]
+    return [{"timestamp": row.timestamp.isoformat(), **{column: getattr(row, column) for column in FEEDBACK_COLUMNS}} for row in rows]
+
+async def iter_sessions(db: AsyncSession, batch_size: int = 500) -> AsyncIterator[models.UserSession]:
+    """
+    Yields every user session, shard by shard in sharded mode, in id-ordered
+    batches so admin and broadcast jobs never hold a whole table in memory.
+    Each batch is expunged from db once it has been consumed.
+    """
+    for shard_id in sharding.shard_ids() if sharding.is_sharded() else [None]:
+        last_id = 0
+        while True:
+            stmt = (
+                select(models.UserSession)
+                .where(models.UserSession.id > last_id)
+                .order_by(models.UserSession.id)
+                .limit(batch_size)
+            )
+            result = await db.execute(stmt, bind_arguments={"shard_id": shard_id} if shard_id else None)
+            batch = result.scalars().all()
+            if not batch:
+                break
+            for session in batch:
+                yield session
+            last_id = batch[-1].id
+            for session in batch:
+                db.expunge(session)
+
+
+# Steps each flow reports to the event log, in order; "complete" is the last turn.
+FLOW_STEPS = {
+    "resume_builder": list(resume_builder.CV_FORM.keys) + ["complete"],
+    "cover_letter": list(cover_letter_generator.COVER_LETTER_FORM.keys) + ["complete"],
+    "feedback": list(feedback_handler.FEEDBACK_FORM.keys) + ["complete"],
+}
+
+async def iter_events(db: AsyncSession, since: Optional[datetime] = None, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields conversation events as dicts, shard by shard in sharded mode, in
+    id-ordered batches so an export never holds the log in memory.
+    """
+    events = models.ConversationEvent.__table__
+    for shard_id in sharding.shard_ids() if sharding.is_sharded() else [None]:
+        last_id = 0
+        while True:
+            stmt = select(events).where(events.c.id > last_id).order_by(events.c.id).limit(batch_size)
+            if since is not None:
+                stmt = stmt.where(events.c.created_at >= since)
+            batch = (await db.execute(stmt, bind_arguments={"shard_id": shard_id} if shard_id else None)).mappings().all()
+            if not batch:
+                break
+            for event in batch:
+                yield dict(event)
+            last_id = batch[-1]["id"]
+
+async def flow_funnel(db: AsyncSession, flow: str, since: datetime) -> Dict[str, Any]:
+    """
+    How many users reached each step of a flow since `since`, how many of
+    them never reached the next one, and how many turns (round trips) the
+    flow took per completion, counting abandoned attempts by users who went on
+    to complete it. A user's events all live on one shard, so the per-shard
+    distinct counts simply add up.
+    """
+    events = models.ConversationEvent
+    steps = FLOW_STEPS[flow]
+    stmt = (
+        select(events.step, func.count(func.distinct(events.phone_hash)))
+        .where(events.intent == flow, events.created_at >= since, events.step.is_not(None))
+        .group_by(events.step)
+    )
+    reached = dict.fromkeys(steps, 0)
+    for step, users in (await db.execute(stmt)).all():
+        if step in reached:
+            reached[step] += users
+
+    completions = func.sum(case((events.step == "complete", 1), else_=0))
+    per_user = (
+        select(func.count(), completions)
+        .where(events.intent == flow, events.created_at >= since)
+        .group_by(events.phone_hash)
+        .having(completions > 0)
+    )
+    turns = completions_total = 0
+    for user_turns, user_completions in (await db.execute(per_user)).all():
+        turns += user_turns
+        completions_total += user_completions
+
+    started, completed = reached[steps[0]], reached["complete"]
+    return {
+        "flow": flow,
+        "since": since.isoformat(),
+        "started": started,
+        "completed": completed,
+        "completion_rate": round(completed / started, 4) if started else None,
+        "turns_per_completion": round(turns / completions_total, 2) if completions_total else None,
+        "steps": [
+            {
+                "step": step,
+                "users": reached[step],
+                "dropped": max(reached[step] - reached[next_step], 0) if next_step else 0,
+                "drop_off_rate": round(max(reached[step] - reached[next_step], 0) / reached[step], 4) if next_step and reached[step] else None,
+            }
+            for step, next_step in zip(steps, steps[1:] + [None])
+        ],
+    }
+
+async def intent_summary(db: AsyncSession, since: datetime) -> List[Dict[str, Any]]:
+    """Turns, errors, retries after unusable input, average latency and AI usage per intent since `since`, busiest first."""
+    events = models.ConversationEvent
+    stmt = (
+        select(
+            events.intent, func.count(), func.sum(case((events.error, 1), else_=0)),
+            func.sum(events.total_ms), func.sum(events.ai_ms), func.sum(events.ai_tokens), func.sum(events.retries),
+        )
+        .where(events.created_at >= since)
+        .group_by(events.intent)
+    )
+    totals: Dict[str, List[int]] = {}
+    for intent, *sums in (await db.execute(stmt)).all():
+        totals[intent] = [total + (value or 0) for total, value in zip(totals.get(intent, [0] * len(sums)), sums)]
+    return [
+        {
+            "intent": intent,
+            "turns": turns,
+            "errors": errors,
+            "avg_total_ms": round(total_ms / turns, 1),
+            "avg_ai_ms": round(ai_ms / turns, 1),
+            "ai_tokens": ai_tokens,
+            "retries": retries,
+            "retry_rate": round(retries / turns, 3),
+        }
+        for intent, (turns, errors, total_ms, ai_ms, ai_tokens, retries) in sorted(totals.items(), key=lambda item: -item[1][0])
+    ]
@@ -1,27 +1,160 @@
 # app/database.py
-from sqlalchemy import create_engine
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from . import sharding
 from .config import settings
 
-# Create the SQLAlchemy engine using the URL from settings.
-# The SQLite-specific connect_args have been removed to support PostgreSQL.
-engine = create_engine(
-    settings.DATABASE_URL
-)
+ENGINE_PROFILES = ("default", "postgres", "sqlite")
+
+def async_database_url(url: str) -> str:
+    """
+    Maps a sync DATABASE_URL onto its async driver: asyncpg for PostgreSQL,
+    aiosqlite for local SQLite. URLs that already name an async driver pass through.
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+def engine_profile_name(url: str, profile: str = None) -> str:
+    """Resolves DB_ENGINE_PROFILE, picking the profile from the URL's dialect when it is "auto"."""
+    profile = (profile or settings.DB_ENGINE_PROFILE).lower()
+    if profile == "auto":
+        if url.startswith(("postgres://", "postgresql")):
+            return "postgres"
+        if url.startswith("sqlite"):
+            return "sqlite"
+        return "default"
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE {profile!r}; expected auto or one of {', '.join(ENGINE_PROFILES)}")
+    return profile
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """The pragmas the sqlite profile runs on every new connection."""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+    }
+
+def engine_options(profile: str, is_async: bool) -> Dict[str, Any]:
+    """create_engine keyword arguments for a profile."""
+    if profile == "postgres":
+        options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            # SQLAlchemy's compiled-statement cache, shared by both drivers.
+            "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+        if is_async:
+            # asyncpg also keeps server-side prepared statements per connection.
+            options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        return options
+    if profile == "sqlite":
+        # The driver's own lock wait, matched to busy_timeout.
+        return {"connect_args": {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {}
+
+def apply_engine_profile(sync_engine: Engine, profile: str):
+    """Installs the per-connection setup a profile needs (the sqlite pragmas)."""
+    if profile != "sqlite":
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
 
-# Each instance of SessionLocal will be a new database session
+def describe_engine_profile() -> str:
+    """A one-line summary of the active profile for the startup log."""
+    if ENGINE_PROFILE == "postgres":
+        options = engine_options(ENGINE_PROFILE, is_async=True)
+        details = ", ".join(f"{key}={value}" for key, value in options.items() if key != "connect_args")
+    elif ENGINE_PROFILE == "sqlite":
+        details = ", ".join(f"{name}={value}" for name, value in sqlite_pragmas().items())
+    else:
+        details = "SQLAlchemy defaults"
+    if SHARD_ENGINES:
+        details += f", {len(SHARD_ENGINES)} shards"
+    return f"{ENGINE_PROFILE} ({async_engine.dialect.name}/{async_engine.dialect.driver}): {details}"
+
+def build_engines(url: str, profile: str = None):
+    """Creates the sync and async engines for a URL under a profile; returns (sync, async, profile name)."""
+    profile = engine_profile_name(url, profile)
+    sync_engine = create_engine(url, **engine_options(profile, is_async=False))
+    apply_engine_profile(sync_engine, profile)
+    async_engine = create_async_engine(async_database_url(url), **engine_options(profile, is_async=True))
+    apply_engine_profile(async_engine.sync_engine, profile)
+    return sync_engine, async_engine, profile
+
+def build_shard_engines(url: str, count: int = None, profile: str = None) -> Dict[str, Tuple[Engine, AsyncEngine]]:
+    """Creates a sync and async engine per shard file, each with its own pool and WAL."""
+    return {
+        shard_id: build_engines(sharding.shard_url(url, shard_id), profile)[:2]
+        for shard_id in sharding.shard_ids(count)
+    }
+
+def sharded_sessionmaker(async_engines: Dict[str, AsyncEngine]) -> async_sessionmaker:
+    """An AsyncSession factory whose statements are routed to shards by app.sharding."""
+    return async_sessionmaker(
+        sync_session_class=ShardedSession,
+        shards={shard_id: shard_engine.sync_engine for shard_id, shard_engine in async_engines.items()},
+        shard_chooser=sharding.shard_chooser,
+        identity_chooser=sharding.identity_chooser,
+        execute_chooser=sharding.execute_chooser,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+# Both engines are built from the URL in settings, tuned by DB_ENGINE_PROFILE.
+# The sync engine is kept for scripts such as check_schema.py and the benchmarks;
+# the web app uses the async one, so queries never block the event loop.
+engine, async_engine, ENGINE_PROFILE = build_engines(settings.DATABASE_URL)
+
+# Each instance of SessionLocal will be a new (sync) database session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# In sharded mode the web app talks to the shard files instead; engine and
+# async_engine still point at the single-file layout (the migration source).
+SHARD_ENGINES = build_shard_engines(settings.DATABASE_URL) if sharding.is_sharded() else {}
+
+if SHARD_ENGINES:
+    AsyncSessionLocal = sharded_sessionmaker({shard_id: engines[1] for shard_id, engines in SHARD_ENGINES.items()})
+else:
+    # expire_on_commit is off because attributes cannot be lazily refreshed under asyncio.
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def schema_engines() -> List[Engine]:
+    """The sync engines whose databases hold the app's tables: every shard, or the single file."""
+    return [engines[0] for engines in SHARD_ENGINES.values()] or [engine]
+
+def async_schema_engines() -> List[AsyncEngine]:
+    """The async engines the web app queries: every shard, or the single file."""
+    return [engines[1] for engines in SHARD_ENGINES.values()] or [async_engine]
+
 # Base class for our SQLAlchemy models to inherit from
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """
-    Dependency function to get a database session for each request.
+    Dependency function to get an async database session for each request.
     Ensures the session is always closed after the request.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
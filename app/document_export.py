@@ -0,0 +1,144 @@
+# app/document_export.py
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from . import documents, whatsapp_client
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Characters file systems (or the user's phone) may refuse in a file name.
+_UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+# WhatsApp keeps uploaded media for 30 days; an id is reused for a little less.
+MEDIA_TTL_SECONDS = 29 * 24 * 3600
+
+def content_hash(fmt: str, document: documents.Document) -> str:
+    """A key for a rendered file: the same CV (or letter) in the same format has the same hash."""
+    return hashlib.blake2b(repr((fmt, document)).encode("utf-8"), digest_size=16).hexdigest()
+
+class DocumentExporter:
+    """
+    Sends CVs and cover letters as PDF or DOCX document messages.
+
+    Rendering runs in a pool of worker processes, so a long document never
+    holds up the event loop (or, through the GIL, other turns). Each rendered
+    and uploaded file is remembered by a hash of its content: asking again for
+    an unchanged CV reuses the same media id without rendering or uploading,
+    and concurrent requests for the same file share one render.
+
+    stats reports render times, how long renders waited for a free worker, and
+    how often every worker was busy when one was submitted.
+    """
+
+    def __init__(self, workers: int, cache_size: int):
+        self.workers = workers
+        self.cache_size = cache_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # (local, content hash) -> (uploaded at, media id), least recently used first.
+        self._media: "OrderedDict[Tuple[bool, str], Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[bool, str], "asyncio.Future[Optional[str]]"] = {}
+        self._busy = 0
+        self.stats: Dict[str, Any] = {
+            "exports": 0, "cache_hits": 0, "renders": 0, "failures": 0,
+            "render_ms": 0.0, "max_render_ms": 0.0, "wait_ms": 0.0, "max_busy": 0, "saturated": 0,
+        }
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        """The worker pool, started on first use. Workers are spawned so they import only app.documents."""
+        if self._pool is None and self.workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def export(self, to: str, document: documents.Document, fmt: str, caption: str = "") -> bool:
+        """Renders (or reuses) the document in fmt and sends it to the user; False if it could not be sent."""
+        self.stats["exports"] += 1
+        key = (whatsapp_client.is_local(to), content_hash(fmt, document))
+        filename = f"{_UNSAFE_FILENAME.sub(' ', document.filename).strip() or 'document'}.{fmt}"
+        cached = self._media.get(key)
+        if cached and time.time() - cached[0] < MEDIA_TTL_SECONDS:
+            self._media.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            media_id = cached[1]
+        else:
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                in_flight = self._in_flight[key] = asyncio.ensure_future(self._render_and_upload(to, document, fmt, filename, key))
+                in_flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            else:
+                self.stats["cache_hits"] += 1
+            media_id = await asyncio.shield(in_flight)
+        if media_id is None:
+            return False
+        return await whatsapp_client.send_whatsapp_document(to, media_id, filename, caption)
+
+    async def _render_and_upload(self, to: str, document: documents.Document, fmt: str, filename: str,
+                                 key: Tuple[bool, str]) -> Optional[str]:
+        try:
+            content = await self.render(fmt, document)
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"Failed to render {filename}: {e}", exc_info=True)
+            return None
+        media_id = await whatsapp_client.upload_media(to, content, documents.MIME_TYPES[fmt], filename, key[1])
+        if media_id is None:
+            self.stats["failures"] += 1
+            return None
+        self._media[key] = (time.time(), media_id)
+        while len(self._media) > self.cache_size:
+            self._media.popitem(last=False)
+        return media_id
+
+    async def render(self, fmt: str, document: documents.Document) -> bytes:
+        """Renders on a worker, recording how long it took and how long it waited for one."""
+        if self._busy >= max(self.workers, 1):
+            self.stats["saturated"] += 1
+        self._busy += 1
+        self.stats["max_busy"] = max(self.stats["max_busy"], self._busy)
+        start = time.perf_counter()
+        try:
+            content, seconds = await asyncio.get_running_loop().run_in_executor(self._executor(), documents.render, fmt, document)
+        finally:
+            self._busy -= 1
+        render_ms = seconds * 1000
+        self.stats["renders"] += 1
+        self.stats["render_ms"] += render_ms
+        self.stats["max_render_ms"] = max(self.stats["max_render_ms"], render_ms)
+        self.stats["wait_ms"] += max(0.0, (time.perf_counter() - start) * 1000 - render_ms)
+        return content
+
+    async def warm_up(self):
+        """Starts every worker and has it import app.documents, so the first export does not wait for a process to spawn."""
+        pool = self._executor()
+        loop = asyncio.get_running_loop()
+        pids = set()
+        # Workers spawn one per submission but take work as they come up, so a
+        # quick one may answer for a slow one: ask again until each has answered.
+        while pool is not None and len(pids) < self.workers:
+            pids.update(await asyncio.gather(*(loop.run_in_executor(pool, documents.warm_up) for _ in range(self.workers))))
+
+    def report(self) -> Dict[str, Any]:
+        """stats with the averages and the pool's current load, for the admin endpoint."""
+        renders = self.stats["renders"] or 1
+        return {
+            **self.stats,
+            "mean_render_ms": round(self.stats["render_ms"] / renders, 2),
+            "mean_wait_ms": round(self.stats["wait_ms"] / renders, 2),
+            "workers": self.workers,
+            "busy": self._busy,
+            "cached_files": len(self._media),
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+EXPORTER = DocumentExporter(settings.EXPORT_WORKERS, settings.EXPORT_CACHE_SIZE)
@@ -0,0 +1,187 @@
+# app/documents.py
+"""
+PDF and DOCX rendering of the CV and cover letter.
+
+Both formats are written directly with the standard library: the PDF uses
+the viewer's built-in Helvetica (no embedded fonts) and the DOCX is the
+smallest package Word and Google Docs open. The output depends only on the
+Document, so the same content renders to the same bytes.
+
+This module imports nothing from the app: document_export runs render() in
+worker processes, which import only what it needs.
+"""
+import io
+import os
+import re
+import time
+import zipfile
+from typing import List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape
+
+class Document(NamedTuple):
+    filename: str
+    # Printed large at the top; empty for none.
+    title: str
+    # (heading or None, text); newlines in the text are kept as line breaks.
+    sections: Tuple[Tuple[Optional[str], str], ...]
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# --- PDF ---
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4, in points
+MARGIN = 56
+TITLE_SIZE, HEADING_SIZE, BODY_SIZE = 18, 12, 10.5
+LEADING = 1.35
+
+# Helvetica advance widths (per 1000 units of font size) for ' ' to '~'; the bold face is close enough to it.
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+def _text_width(text: str, size: float) -> float:
+    return sum(_HELVETICA_WIDTHS[ord(c) - 32] if " " <= c <= "~" else 556 for c in text) * size / 1000
+
+def _wrap(line: str, size: float, width: float) -> List[str]:
+    """Breaks a line into lines no wider than width, at spaces where possible."""
+    lines, current = [], ""
+    for word in line.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if _text_width(candidate, size) <= width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        while _text_width(word, size) > width:
+            cut = max(1, int(len(word) * width / _text_width(word, size)))
+            lines.append(word[:cut])
+            word = word[cut:]
+        current = word
+    lines.append(current)
+    return lines
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def render_pdf(document: Document) -> bytes:
+    # (font, size, text, space above) for every line, then laid out onto pages.
+    lines: List[Tuple[str, float, str, float]] = []
+    width = PAGE_WIDTH - 2 * MARGIN
+    if document.title:
+        lines.extend(("F2", TITLE_SIZE, text, 0) for text in _wrap(document.title, TITLE_SIZE, width))
+    for heading, text in document.sections:
+        # A heading is set off from the section above it; a section without one, by a smaller gap.
+        gap = BODY_SIZE * 0.6
+        if heading:
+            for line in _wrap(heading, HEADING_SIZE, width):
+                lines.append(("F2", HEADING_SIZE, line, BODY_SIZE if gap else 0))
+                gap = 0
+        for paragraph_line in text.split("\n"):
+            for wrapped in _wrap(paragraph_line.strip(), BODY_SIZE, width):
+                lines.append(("F1", BODY_SIZE, wrapped, gap))
+                gap = 0
+
+    pages: List[bytes] = []
+    stream: List[bytes] = []
+    y = PAGE_HEIGHT - MARGIN
+    for font, size, text, space in lines:
+        step = space + size * LEADING
+        if y - step < MARGIN and stream:
+            pages.append(b"\n".join(stream))
+            stream, y = [], PAGE_HEIGHT - MARGIN
+            step = size * LEADING
+        y -= step
+        if text:
+            stream.append(b"BT /%s %g Tf %d %.2f Td %s Tj ET" % (font.encode(), size, MARGIN, y, _pdf_string(text)))
+    pages.append(b"\n".join(stream))
+
+    # Objects: 1 catalog, 2 page tree, 3-4 fonts, then a page and its content stream per page.
+    page_ids = [5 + 2 * i for i in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(pages)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    for page_id, content in zip(page_ids, pages):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                       % (PAGE_WIDTH, PAGE_HEIGHT, page_id + 1))
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+# --- DOCX ---
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+# Characters XML 1.0 does not allow, even escaped.
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _paragraph(text: str, size_half_points: int, bold: bool = False, space_before: int = 0) -> str:
+    properties = ("<w:b/>" if bold else "") + f'<w:sz w:val="{size_half_points}"/>'
+    runs = "<w:br/>".join(f'<w:t xml:space="preserve">{escape(_XML_INVALID.sub("", line.strip()))}</w:t>' for line in text.split("\n"))
+    spacing = f'<w:pPr><w:spacing w:before="{space_before}"/></w:pPr>' if space_before else ""
+    return f"<w:p>{spacing}<w:r><w:rPr>{properties}</w:rPr>{runs}</w:r></w:p>"
+
+def render_docx(document: Document) -> bytes:
+    body = []
+    if document.title:
+        body.append(_paragraph(document.title, TITLE_SIZE * 2, bold=True))
+    for heading, text in document.sections:
+        if heading:
+            body.append(_paragraph(heading, HEADING_SIZE * 2, bold=True, space_before=240))
+        body.append(_paragraph(text, int(BODY_SIZE * 2), space_before=0 if heading else 160))
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        + "".join(body)
+        + '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/><w:pgMar w:top="1134" w:right="1134" w:bottom="1134" w:left="1134"'
+        ' w:header="708" w:footer="708" w:gutter="0"/></w:sectPr></w:body></w:document>'
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as package:
+        # A fixed timestamp keeps the bytes a function of the content alone.
+        for name, data in (("[Content_Types].xml", _CONTENT_TYPES), ("_rels/.rels", _RELATIONSHIPS), ("word/document.xml", xml)):
+            package.writestr(zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), data, zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+RENDERERS = {"pdf": render_pdf, "docx": render_docx}
+
+def render(fmt: str, document: Document) -> Tuple[bytes, float]:
+    """The rendered file and the seconds it took; what document_export runs in its worker processes."""
+    start = time.perf_counter()
+    content = RENDERERS[fmt](document)
+    return content, time.perf_counter() - start
+
+def warm_up() -> int:
+    """Run by document_export on each new worker, so this module is imported before the first render; the worker's pid."""
+    return os.getpid()
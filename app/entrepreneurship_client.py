@@ -2,6 +2,8 @@
 import asyncio
 from typing import List, Optional
 
+from . import event_log, metrics
+
 # --- High-Quality Mock Database of Real, Relevant Entrepreneurship Guides ---
 # This list is manually curated to provide real value to users in the pilot program.
 MOCK_ENTREPRENEURSHIP_LIST = [
@@ -27,17 +29,19 @@ async def fetch_entrepreneurship_guides(keyword: str) -> Optional[List[str]]:
     """
     Simulates fetching entrepreneurship guides based on a keyword search.
     """
-    await asyncio.sleep(1) # Simulate network latency
-    
-    try:
-        # A simple keyword search logic
-        keyword = keyword.lower()
-        results = [
-            guide for guide in MOCK_ENTREPRENEURSHIP_LIST 
-            if keyword in guide.lower()
-        ]
-        return results if results else []
-    except Exception as e:
-        print(f"Error fetching entrepreneurship data: {e}")
-        return None
+    with metrics.span("catalog_guides"):
+        await asyncio.sleep(1) # Simulate network latency
+
+        try:
+            # A simple keyword search logic
+            keyword = keyword.lower()
+            results = [
+                guide for guide in MOCK_ENTREPRENEURSHIP_LIST 
+                if keyword in guide.lower()
+            ]
+            event_log.add("catalog_hits", len(results))
+            return results if results else []
+        except Exception as e:
+            print(f"Error fetching entrepreneurship data: {e}")
+            return None
 
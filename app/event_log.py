@@ -0,0 +1,207 @@
+# app/event_log.py
+"""
+Append-only log of conversation turns, for funnels and latency analysis.
+
+The webhook wraps each turn in record_turn(); code further down adds to the
+turn's event through the module functions (note, add, timed) without having
+the event passed to it, and does nothing when no turn is being recorded.
+Finished events are queued on EVENT_LOG, which never awaits the database in
+the turn itself; a background task writes the queue in batches to the
+conversation_events table.
+
+Events carry a keyed hash of the phone number, never the number itself.
+The key is EVENT_LOG_HASH_KEY or, when that is empty, a random key generated
+once and kept in EVENT_LOG_HASH_KEY_FILE; without a key the hash of a phone
+number could be found by hashing every possible number.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from . import models, sharding
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Stages the latency of a turn is broken down into; anything else is "other".
+STAGES = ("db", "ai", "send")
+COUNTERS = ("ai_calls", "ai_tokens", "catalog_hits", "retries")
+
+_current_event: ContextVar[Optional["TurnEvent"]] = ContextVar("current_event", default=None)
+
+@lru_cache(maxsize=1)
+def hash_key() -> bytes:
+    """
+    EVENT_LOG_HASH_KEY, or else the key in EVENT_LOG_HASH_KEY_FILE, which the
+    first process to need it generates. The file is written aside and linked
+    into place, so workers starting together all read the same whole key.
+    """
+    if settings.EVENT_LOG_HASH_KEY:
+        return settings.EVENT_LOG_HASH_KEY.encode("utf-8")[:64]
+    path = settings.EVENT_LOG_HASH_KEY_FILE
+    if not os.path.exists(path):
+        pending = f"{path}.{os.getpid()}.{secrets.token_hex(4)}"
+        fd = os.open(pending, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            os.link(pending, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(pending)
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"The phone number hash key file {path} is empty")
+    return key.encode("utf-8")[:64]
+
+def phone_hash(phone_number: str) -> str:
+    """A stable, keyed 16-character hash of a phone number."""
+    return hashlib.blake2b(phone_number.encode("utf-8"), key=hash_key(), digest_size=8).hexdigest()
+
+class TurnEvent:
+    """One conversation turn, as it will be stored."""
+
+    __slots__ = ("phone_number", "created_at", "menu_before", "menu_after", "intent", "step", "error",
+                 "stage_seconds", "counters", "_start")
+
+    def __init__(self, phone_number: str):
+        self.phone_number = phone_number
+        self.created_at = datetime.now(timezone.utc)
+        self.menu_before: Optional[str] = None
+        self.menu_after: Optional[str] = None
+        self.intent: Optional[str] = None
+        self.step: Optional[str] = None
+        self.error = False
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._start = time.perf_counter()
+
+    def row(self, total_seconds: float) -> Dict[str, Any]:
+        """The conversation_events row for this turn."""
+        menu_before, menu_after = self.menu_before or "main", self.menu_after or "main"
+        return {
+            "created_at": self.created_at,
+            "phone_hash": phone_hash(self.phone_number),
+            "menu_before": menu_before,
+            "menu_after": menu_after,
+            # A turn that does not name its intent is about the flow it entered, or the one it finished.
+            "intent": self.intent or (menu_after if menu_after != "main" else menu_before),
+            "step": self.step,
+            "error": self.error,
+            "total_ms": round(total_seconds * 1000),
+            **{f"{stage}_ms": round(seconds * 1000) for stage, seconds in self.stage_seconds.items()},
+            **self.counters,
+        }
+
+@contextmanager
+def record_turn(phone_number: str):
+    """Records the turn run inside the block and queues its event on EVENT_LOG."""
+    if not settings.EVENT_LOG_ENABLED:
+        yield None
+        return
+    event = TurnEvent(phone_number)
+    token = _current_event.set(event)
+    try:
+        yield event
+    except BaseException:
+        event.error = True
+        raise
+    finally:
+        _current_event.reset(token)
+        EVENT_LOG.submit(event.row(time.perf_counter() - event._start), phone_number)
+
+def note(**fields):
+    """Sets fields (intent, step, menu_before, menu_after) on the turn being recorded."""
+    event = _current_event.get()
+    if event is not None:
+        for name, value in fields.items():
+            setattr(event, name, value)
+
+def add(counter: str, amount: int = 1):
+    """Adds to one of COUNTERS on the turn being recorded."""
+    event = _current_event.get()
+    if event is not None:
+        event.counters[counter] += amount
+
+@contextmanager
+def timed(stage: str):
+    """Adds the time spent in the block to one of STAGES on the turn being recorded."""
+    event = _current_event.get()
+    if event is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        event.stage_seconds[stage] += time.perf_counter() - start
+
+class EventLogWriter:
+    """
+    Queues turn events in memory and appends them to conversation_events in
+    batches. submit() is synchronous and O(1); once max_pending events are
+    waiting (the database is down or too slow) the oldest are dropped and
+    counted rather than slowing turns down. A batch that fails to write is
+    dropped as well: the log is for analytics, not an audit trail.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int, batch_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Deque[Tuple[Dict[str, Any], str]] = deque(maxlen=max_pending)
+        self._flush_lock = asyncio.Lock()
+        self.stats: Dict[str, int] = {"submitted": 0, "written": 0, "dropped": 0, "flushes": 0}
+
+    def submit(self, row: Dict[str, Any], phone_number: str):
+        """Queues an event row; phone_number only picks the shard and is not stored."""
+        self.stats["submitted"] += 1
+        if len(self._pending) == self._pending.maxlen:
+            self.stats["dropped"] += 1
+        self._pending.append((row, phone_number))
+
+    async def flush(self):
+        """Writes everything queued so far, batch_size rows per INSERT."""
+        async with self._flush_lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    self.stats["dropped"] += len(batch)
+                    logger.error(f"Failed to write {len(batch)} conversation events: {e}", exc_info=True)
+                    return
+                self.stats["written"] += len(batch)
+                self.stats["flushes"] += 1
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], str]]):
+        by_shard: Dict[Optional[str], List[Tuple[Dict[str, Any], str]]] = {}
+        for row, phone_number in batch:
+            by_shard.setdefault(sharding.shard_for(phone_number) if sharding.is_sharded() else None, []).append((row, phone_number))
+        async with AsyncSessionLocal() as db:
+            for shard_batch in by_shard.values():
+                with sharding.route(shard_batch[0][1]):
+                    await db.execute(models.ConversationEvent.__table__.insert(), [row for row, _ in shard_batch])
+            with sharding.route(batch[0][1]):
+                await db.commit()
+
+    async def run_flusher(self):
+        """Writes queued events every flush_interval seconds until cancelled."""
+        if self.flush_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+EVENT_LOG = EventLogWriter(settings.EVENT_LOG_FLUSH_INTERVAL_SECONDS, settings.EVENT_LOG_MAX_PENDING, settings.EVENT_LOG_BATCH_SIZE)
@@ -0,0 +1,62 @@
+# app/feedback_writer.py
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from . import crud
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class FeedbackWriter:
+    """
+    Buffers completed feedback forms and writes them in batches.
+
+    A submission costs the webhook turn no database round trip. A background
+    task flushes the buffer every flush_interval seconds, or sooner once
+    batch_size forms are waiting. Each flush is one transaction that also
+    updates the daily aggregates behind the admin analytics.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self.stats: Dict[str, int] = {"submitted": 0, "flushes": 0, "rows_written": 0, "failures": 0}
+
+    async def submit(self, user_phone_number: str, feedback_data: Dict[str, Any]):
+        """Queues one completed feedback form; writes straight away if buffering is disabled or the batch is full."""
+        self.stats["submitted"] += 1
+        self._pending.append(crud.feedback_row(user_phone_number, feedback_data))
+        if self.flush_interval <= 0 or len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Writes every buffered form in one transaction."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            try:
+                async with AsyncSessionLocal() as db:
+                    await crud.save_feedback(db, pending)
+            except Exception as e:
+                # Kept for the next flush, ahead of anything submitted meanwhile.
+                self._pending[:0] = pending
+                self.stats["failures"] += 1
+                logger.error(f"Failed to write {len(pending)} feedback responses: {e}", exc_info=True)
+                return
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(pending)
+
+    async def run_flusher(self):
+        """Flushes buffered feedback every flush_interval seconds until cancelled."""
+        if self.flush_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+FEEDBACK_WRITER = FeedbackWriter(settings.FEEDBACK_FLUSH_INTERVAL_SECONDS, settings.FEEDBACK_BATCH_SIZE)
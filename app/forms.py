@@ -0,0 +1,224 @@
+# app/forms.py
+"""
+A shared engine for the question-and-answer forms: the CV builder, the cover
+letter and feedback.
+
+A form is declared as a tuple of Fields. Each turn the engine stores the
+answer to the question it asked, optionally asks the user to confirm it, and
+asks the next question. The next question is looked up from the one just
+answered, through a table built when the form is declared, rather than by
+scanning the questions for the first one without an answer.
+
+Where a form allows it, a user can also send every answer in one message,
+one per line ("Email: jane@example.com"). Lines are matched to fields by
+label, or by pattern for lines without one (an email address, a phone
+number), entirely locally. The engine then asks only for what is missing
+and shows everything for one confirmation at the end, instead of one per
+answer.
+
+The engine keeps its place in session_data under keys named after the form's
+prefix: "awaiting_<prefix>_answer_for" holds the field being asked (or
+REVIEW/EDIT), "awaiting_<prefix>_confirmation" with "field_to_confirm" a
+single answer waiting for yes/no, and "awaiting_<prefix>_review" marks a form
+filled in one go, which is confirmed once at the end.
+"""
+import re
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from . import event_log
+
+YES = ("yes", "correct", "y")
+NO = ("no", "change", "n")
+
+# Values of the answer key that are not field keys.
+REVIEW = "review"
+EDIT = "edit"
+
+class Field(NamedTuple):
+    key: str
+    question: str
+    # What a user may write before the value when sending several answers at once; the first is the field's title.
+    labels: Tuple[str, ...] = ()
+    # Turns an answer into the stored value, or raises ValueError with the message to send back.
+    parse: Optional[Callable[[str], Any]] = None
+    # Stored when the user answers 'skip'; None means the field cannot be skipped.
+    skip_value: Optional[str] = None
+    # Recognises an unlabelled line as this field when answers come in one message.
+    pattern: Optional[re.Pattern] = None
+
+    @property
+    def title(self) -> str:
+        return (self.labels[0] if self.labels else self.key.replace("_", " ")).capitalize()
+
+class Form:
+    """A declared form and the engine that runs it; see the module docstring."""
+
+    def __init__(self, prefix: str, fields: Tuple[Field, ...], confirm: bool = True, bulk: bool = False):
+        self.fields = fields
+        self.keys = tuple(field.key for field in fields)
+        self.confirm = confirm
+        self.bulk = bulk
+        self.answer_key = f"awaiting_{prefix}_answer_for"
+        self.confirm_key = f"awaiting_{prefix}_confirmation"
+        self.review_key = f"awaiting_{prefix}_review"
+        self._fields: Dict[str, Field] = {field.key: field for field in fields}
+        self._next: Dict[Optional[str], Optional[str]] = dict(zip((None,) + self.keys, self.keys + (None,)))
+        labels: Dict[str, str] = {}
+        for field in fields:
+            for label in field.labels:
+                if label in labels:
+                    raise ValueError(f"Label {label!r} is used for both {labels[label]} and {field.key}")
+                labels[label] = field.key
+        self._labels = labels
+        # "Email: x", "*Full name* - x", "skills = x"; the longest label wins.
+        alternatives = "|".join(re.escape(label) for label in sorted(labels, key=len, reverse=True))
+        self._label_line = re.compile(rf"^[\s*_-]*({alternatives})[\s*_]*[:=\-–]\s*(.*)$", re.IGNORECASE) if labels else None
+
+    def step(self, state: Dict[str, Any]) -> Optional[str]:
+        """Where the form is waiting, for the event log: a field key, REVIEW or EDIT."""
+        return state.get(self.answer_key) or state.get("field_to_confirm")
+
+    def clear(self, state: Dict[str, Any]):
+        for key in (self.answer_key, self.confirm_key, self.review_key, "field_to_confirm"):
+            state.pop(key, None)
+
+    def bulk_hint(self) -> str:
+        """How to send every answer at once, shown with the first question."""
+        lines = "\n".join(f"{field.title}: ..." for field in self.fields if field.labels)
+        return f"💡 Have your details ready? Send them all in one message, one per line:\n\n{lines}"
+
+    def handle(self, state: Dict[str, Any], data: Dict[str, Any], message_text: str) -> Tuple[Optional[str], bool]:
+        """
+        Takes the user's message and returns the reply, or (None, True) once
+        every field in data is answered and confirmed.
+        """
+        answer = message_text.strip()
+        command = answer.lower()
+        pending = state.get(self.answer_key)
+
+        if state.get(self.confirm_key):
+            field_key = state.get("field_to_confirm")
+            if command in NO and field_key:
+                data.pop(field_key, None)
+                next_key = field_key
+            elif command in YES:
+                next_key = self._next_missing(data, field_key)
+            else:
+                return self._retry("Please reply with 'yes' or 'no'.")
+            state.pop(self.confirm_key, None)
+            state.pop("field_to_confirm", None)
+            return self._ask(state, data, next_key)
+
+        if pending == REVIEW:
+            if command in YES:
+                self.clear(state)
+                return None, True
+            if command in NO:
+                state[self.answer_key] = EDIT
+                example = next(field for field in self.fields if field.labels)
+                return f"No problem. Send just the details to change, one per line, e.g. '{example.title}: ...'", False
+            return self._retry("Please reply with 'yes' or 'no'.")
+
+        if pending == EDIT or (pending and self.bulk):
+            values, errors = self.parse_bulk(answer)
+            if pending == EDIT or len(values) + len(errors) > 1:
+                if not values and not errors:
+                    return self._retry(f"I couldn't find any details in that. Please send them one per line, e.g. '{self.fields[0].title}: ...'")
+                data.update(values)
+                state[self.review_key] = True
+                reply, is_complete = self._ask(state, data, self._next_missing(data, None))
+                if errors:
+                    event_log.add("retries")
+                    reply = "\n".join(errors) + "\n\n" + reply
+                elif pending != EDIT and state.get(self.answer_key) != REVIEW:
+                    reply = f"Got it, I've filled in {len(values)} of {len(self.fields)} details.\n\n{reply}"
+                return reply, is_complete
+
+        if pending:
+            field = self._fields[pending]
+            if command == "skip" and field.skip_value is not None:
+                value = field.skip_value
+            else:
+                try:
+                    value = field.parse(answer) if field.parse else answer
+                except ValueError as e:
+                    return self._retry(str(e))
+            data[pending] = value
+            state.pop(self.answer_key, None)
+            if self.confirm and not state.get(self.review_key):
+                state[self.confirm_key] = True
+                state["field_to_confirm"] = pending
+                return f"I have this down as:\n\n_{value}_\n\nIs that correct? (yes/no)", False
+            return self._ask(state, data, self._next_missing(data, pending))
+
+        return self._ask(state, data, self._next_missing(data, None))
+
+    @staticmethod
+    def _retry(reply: str) -> Tuple[str, bool]:
+        """Asks again after an answer that could not be used, counting the retry on the turn's event."""
+        event_log.add("retries")
+        return reply, False
+
+    def parse_bulk(self, text: str) -> Tuple[Dict[str, Any], list]:
+        """
+        The answers in a message that gives several at once, by label or by
+        pattern, and a message for each one that did not validate.
+        """
+        raw: Dict[str, str] = {}
+        current: Optional[str] = None
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            match = self._label_line.match(line) if self._label_line else None
+            if match:
+                current = self._labels[match.group(1).lower()]
+                raw[current] = match.group(2).strip()
+                continue
+            field = next((field for field in self.fields if field.pattern and field.key not in raw and field.pattern.fullmatch(line)), None)
+            if field:
+                raw[field.key], current = line, None
+            elif current:
+                # A value that runs over several lines.
+                raw[current] = f"{raw[current]}\n{line}".strip()
+
+        values, errors = {}, []
+        for key, answer in raw.items():
+            field = self._fields[key]
+            if not answer:
+                continue
+            if answer.lower() == "skip" and field.skip_value is not None:
+                values[key] = field.skip_value
+                continue
+            try:
+                values[key] = field.parse(answer) if field.parse else answer
+            except ValueError as e:
+                errors.append(f"{field.title}: {e}")
+        return values, errors
+
+    def _next_missing(self, data: Dict[str, Any], after: Optional[str]) -> Optional[str]:
+        """The field after `after` still to be answered. Only a form filled in one go has any to step over."""
+        key = self._next[after]
+        while key is not None and key in data:
+            key = self._next[key]
+        if key is None and after is not None:
+            # Nothing after it; an earlier answer may still be missing.
+            return self._next_missing(data, None)
+        return key
+
+    def _ask(self, state: Dict[str, Any], data: Dict[str, Any], key: Optional[str]) -> Tuple[Optional[str], bool]:
+        if key is None:
+            if state.get(self.review_key):
+                state[self.answer_key] = REVIEW
+                return self.summary(data) + "\n\nIs everything correct? (yes/no)", False
+            self.clear(state)
+            return None, True
+        state[self.answer_key] = key
+        question = self._fields[key].question
+        if self.bulk and not data and key == self.keys[0]:
+            question = f"{question}\n\n{self.bulk_hint()}"
+        return question, False
+
+    def summary(self, data: Dict[str, Any]) -> str:
+        """Every answer, titled, for the one confirmation of a form filled in one go."""
+        return "Here's what I have:\n\n" + "\n".join(f"*{field.title}:* {data.get(field.key, 'N/A')}" for field in self.fields)
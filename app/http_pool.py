@@ -0,0 +1,29 @@
+# app/http_pool.py
+"""
+The outbound HTTP client shared by the WhatsApp and Gemini calls.
+
+A client per call set up a new connection pool, TLS context and handshake
+for every message sent. One client for the process keeps connections to
+graph.facebook.com and the Gemini API open between turns. It is created by
+the startup warm-up (loading the CA bundle off the event loop), or on first
+use, and closed at shutdown; a call after that gets a fresh one.
+
+Calls pass their own timeout, as they did with their own clients.
+"""
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+def client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient()
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
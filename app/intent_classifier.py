@@ -0,0 +1,148 @@
+# app/intent_classifier.py
+"""
+An on-box classifier for free-text messages the intent router cannot place,
+such as "nataka kazi ya driver" or "help me write a CV".
+
+A multinomial naive Bayes model over character n-grams (within words) and
+whole words, trained on first use from app/data/intent_phrases.tsv, which
+covers English, Swahili and Sheng. Character n-grams make it tolerant of
+spelling variants and Sheng inflections ("kazi", "kazini", "makazi").
+
+The model is kept as one dict per class from feature to log-probability, so
+classifying is a set of dict lookups summed in C: well under a millisecond,
+with no network and no dependencies beyond the standard library.
+
+Slots (the job role, skill, field or business area) come from the phrases
+that carry a {placeholder}: each becomes an anchored template. A message that
+fits one exactly ("nataka kazi ya driver") takes the template's intent and
+slot without consulting the model, so the role words, which the model has
+never seen, cannot pull it towards another intent. A slot made only of
+NOT_SLOTS words ("kozi za bure", free courses) names no role or skill, so the
+message is left to the model, and to INTENT_MIN_CONFIDENCE, instead.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .config import settings
+
+PHRASES_PATH = Path(__file__).resolve().parent / "data" / "intent_phrases.tsv"
+NGRAM_SIZES = (2, 3, 4)
+ALPHA = 0.5
+# Naive Bayes posteriors are near 0 or 1 for any text with many features,
+# in-domain or not. Confidence is computed from the average log-probability
+# per feature instead, scaled by this factor, so it reflects how strongly
+# each part of the message points at the intent rather than how long it is.
+SHARPNESS = 8.0
+
+# Words that qualify or question what is asked for rather than name it.
+NOT_SLOTS = frozenset((
+    "bure", "free", "mzuri", "nzuri", "bora", "poa", "fiti", "safi", "good", "best",
+    "online", "mtandaoni", "karibu", "hapa", "near", "nearby", "rahisi", "bei", "cheap",
+    "yoyote", "zozote", "wowote", "any", "gani", "nini", "what", "which", "nyingi", "more",
+))
+
+_WORD = re.compile(r"[a-z0-9']+")
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+class Prediction(NamedTuple):
+    intent: str
+    confidence: float
+    slot: Optional[str] = None
+
+def features(text: str) -> List[str]:
+    """Word tokens, as "[word]", plus the character n-grams of each word padded with spaces."""
+    feats = []
+    for word in _WORD.findall(text.lower()):
+        feats.append(f"[{word}]")
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            feats.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+    return feats
+
+def load_phrases(path: Path = PHRASES_PATH) -> List[Tuple[str, str]]:
+    """(intent, phrase) pairs from a tab-separated phrase file; # starts a comment."""
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            intent, phrase = line.split("\t", 1)
+            pairs.append((intent.strip(), phrase.strip()))
+    return pairs
+
+def _template(phrase: str) -> re.Pattern:
+    """'nataka kazi ya {role}' -> an anchored pattern capturing the role."""
+    pieces = [r"(?P<slot>.+?)" if _PLACEHOLDER.fullmatch(token) else re.escape(token) for token in phrase.split()]
+    return re.compile("^" + r"\s+".join(pieces) + r"[\s.!?]*$", re.IGNORECASE)
+
+class IntentClassifier:
+    """Multinomial naive Bayes over features(); see the module docstring."""
+
+    def __init__(self, phrases: Iterable[Tuple[str, str]], alpha: float = ALPHA):
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        documents: Counter = Counter()
+        self._templates: List[Tuple[re.Pattern, str]] = []
+        for intent, phrase in phrases:
+            documents[intent] += 1
+            counts[intent].update(features(_PLACEHOLDER.sub(" ", phrase)))
+            if _PLACEHOLDER.search(phrase):
+                self._templates.append((_template(phrase), intent))
+        # The most specific template (most fixed text) is tried first.
+        self._templates.sort(key=lambda template: len(template[0].pattern), reverse=True)
+
+        self.intents: Tuple[str, ...] = tuple(sorted(documents))
+        self.vocabulary = frozenset(feature for counter in counts.values() for feature in counter)
+        total_documents = sum(documents.values())
+        self._priors = [math.log(documents[intent] / total_documents) for intent in self.intents]
+        self._log_probs: List[Dict[str, float]] = []
+        for intent in self.intents:
+            counter = counts[intent]
+            denominator = math.log(sum(counter.values()) + alpha * len(self.vocabulary))
+            self._log_probs.append({feature: math.log(counter[feature] + alpha) - denominator for feature in self.vocabulary})
+
+    def scores(self, text: str) -> Tuple[List[float], List[str]]:
+        """
+        Unnormalised log-posteriors in the order of self.intents, and the
+        text's features the model knows. Unseen features are ignored.
+        """
+        known = [feature for feature in features(text) if feature in self.vocabulary]
+        return [prior + sum(map(log_probs.__getitem__, known)) for prior, log_probs in zip(self._priors, self._log_probs)], known
+
+    def classify(self, text: str) -> Prediction:
+        """
+        The intent, a confidence in [0, 1] and the slot, if any. A message that
+        fits a slot template exactly takes the template's intent; otherwise the
+        model decides, and a message with no word it has seen is "other".
+        """
+        text = " ".join(text.split())
+        for template, intent in self._templates:
+            match = template.match(text)
+            if match:
+                slot = match.group("slot").strip(" .,!?")
+                if not set(_WORD.findall(slot.lower())) <= NOT_SLOTS:
+                    return Prediction(intent, 1.0, slot)
+
+        scores, known = self.scores(text)
+        if not any(feature.startswith("[") for feature in known):
+            return Prediction("other", 0.0)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        confidence = 1.0 / sum(math.exp((score - top) / len(known) * SHARPNESS) for score in scores)
+        return Prediction(self.intents[best], confidence)
+
+@lru_cache(maxsize=None)
+def model() -> IntentClassifier:
+    """The shared model, trained on first use (or by the startup warm-up, see app/startup.py)."""
+    return IntentClassifier(load_phrases())
+
+def classify(text: str) -> Prediction:
+    """Classifies text with the shared model; intents below INTENT_MIN_CONFIDENCE come back as "other"."""
+    prediction = model().classify(text)
+    if prediction.confidence < settings.INTENT_MIN_CONFIDENCE:
+        return Prediction("other", prediction.confidence)
+    return prediction
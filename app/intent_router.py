@@ -0,0 +1,128 @@
+# app/intent_router.py
+"""
+Routes an incoming message to an intent.
+
+The route table below is data: whole-message commands, keywords matched
+anywhere in the message, and the numbered menu choices. At import it is
+compiled into lookup tables: commands and (menu choice, current menu) pairs
+resolve with one dict lookup each, and the keywords are grouped by intent in
+priority order, so a message is checked against each keyword at most once
+and only against the groups that can still apply in the user's menu.
+Adding a Sheng keyword means adding it to KEYWORDS.
+
+Keywords are tested with str's substring search rather than a combined regex
+or an automaton: for a few dozen short keywords it is the faster of the
+three in CPython (see benchmarks/bench_intent_router.py).
+
+resolve() returns an intent: "greeting", "sheng_greeting", "reset",
+"locale" (a language name, see templates.LOCALE_NAMES), "export" (a
+document format), "feedback", the name of a menu flow (see FLOWS), or "unknown".
+
+The language names and document formats are also answers a flow may be
+waiting for ("English" as a skill to learn, "Word" as a CV skill), so they
+are commands only from the main menu with no question pending, which is
+also where a finished CV or cover letter leaves the user. Anywhere else a
+language is switched with "lang english".
+"""
+from typing import Dict, NamedTuple, Tuple
+
+# Messages that are a command only when they are the whole message.
+COMMANDS: Dict[str, str] = {
+    "hi": "greeting", "hello": "greeting", "start": "greeting", "menu": "greeting",
+    "0": "reset",
+    "english": "locale", "kiswahili": "locale", "swahili": "locale", "sheng": "locale",
+    "pdf": "export", "docx": "export", "word": "export",
+    "feedback": "feedback", "maoni": "feedback",
+}
+# Commands that are also plausible answers; see the module docstring.
+MENU_COMMANDS = frozenset(("locale", "export"))
+LOCALE_PREFIX = "lang "
+
+# Keywords matched anywhere in the message. Greetings apply in any menu; the
+# flow keywords only from the main menu, and the first flow listed wins.
+KEYWORDS: Dict[str, tuple] = {
+    "sheng_greeting": ("niaje", "sasa", "vipi", "habari", "mambo"),
+    "jobs": ("kazi", "ajira", "wera", "mboka", "works"),
+    "training": ("mafunzo", "jifunza", "kusoma"),
+    "mentorship": ("ushauri",),
+    "entrepreneurship": ("biashara",),
+}
+
+# The main menu: choice -> flow. The order is the order of the menu.
+FLOWS: Dict[str, str] = {
+    "1": "jobs",
+    "2": "training",
+    "3": "mentorship",
+    "4": "entrepreneurship",
+    "5": "resume_builder",
+    "6": "interview_practice",
+    "7": "cover_letter",
+    "8": "cv_optimizer",
+    "9": "skills_analyzer",
+}
+CHOICES: Dict[str, str] = {flow: choice for choice, flow in FLOWS.items()}
+_FLOW_ORDER: Dict[str, int] = {flow: index for index, flow in enumerate(FLOWS.values())}
+
+class Route(NamedTuple):
+    intent: str
+    # The message as the flow should see it: a flow keyword is replaced by its menu choice.
+    text: str
+
+def _compile_keywords(keywords: Dict[str, tuple]) -> Tuple[tuple, Tuple[Tuple[str, tuple], ...]]:
+    """Splits KEYWORDS into the greeting words and the (flow, words) groups, refusing a keyword listed twice."""
+    seen: Dict[str, str] = {}
+    for intent, words in keywords.items():
+        for word in words:
+            if word in seen:
+                raise ValueError(f"Keyword {word!r} is listed for both {seen[word]} and {intent}")
+            seen[word] = intent
+    flows = tuple((intent, tuple(words)) for intent, words in keywords.items() if intent in CHOICES)
+    return tuple(keywords.get("sheng_greeting", ())), flows
+
+def _compile_dispatch() -> Dict[Tuple[str, str], str]:
+    """
+    The flow for a menu choice sent from inside a flow. The two can disagree;
+    the flow that comes first in the menu wins, as it always has.
+    """
+    return {
+        (choice, menu): min(flow, menu, key=_FLOW_ORDER.__getitem__)
+        for choice, flow in FLOWS.items()
+        for menu in _FLOW_ORDER
+    }
+
+_GREETING_WORDS, _FLOW_KEYWORDS = _compile_keywords(KEYWORDS)
+_DISPATCH = _compile_dispatch()
+
+def _contains_any(text: str, words: tuple) -> bool:
+    for word in words:
+        if word in text:
+            return True
+    return False
+
+def resolve(text: str, current_menu: str, waiting: bool = False) -> Route:
+    """
+    Routes a stripped, lower-cased message sent while the user is in
+    current_menu; waiting says a flow has asked a question the message may answer.
+    """
+    if _contains_any(text, _GREETING_WORDS):
+        return Route("sheng_greeting", text)
+    if text.startswith(LOCALE_PREFIX) and COMMANDS.get(text[len(LOCALE_PREFIX):]) == "locale":
+        return Route("locale", text[len(LOCALE_PREFIX):])
+    command = COMMANDS.get(text)
+    if command in MENU_COMMANDS and (current_menu != "main" or waiting):
+        command = None
+    if command in ("greeting", "reset", "locale", "export"):
+        return Route(command, text)
+    if command == "feedback" or current_menu == "feedback":
+        return Route("feedback", text)
+
+    if current_menu == "main" and text not in FLOWS:
+        for flow, words in _FLOW_KEYWORDS:
+            if _contains_any(text, words):
+                text = CHOICES[flow]
+                break
+
+    intent = _DISPATCH.get((text, current_menu))
+    if intent is None:
+        intent = current_menu if current_menu in _FLOW_ORDER else FLOWS.get(text, "unknown")
+    return Route(intent, text)
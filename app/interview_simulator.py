@@ -1,65 +1,149 @@
 # app/interview_simulator.py
-from typing import Tuple, List, Optional
-from . import models
-import random
-
-# --- Mock Interview Question Database ---
-INTERVIEW_QUESTIONS = {
-    "general": [
-        "Tell me about yourself.",
-        "What are your biggest strengths?",
-        "What is your biggest weakness?",
-        "Where do you see yourself in 5 years?",
-        "Why do you want to work for this company?",
-    ],
-    "accountant": [
-        "Can you describe your experience with financial reporting software like QuickBooks or SAP?",
-        "How do you ensure accuracy and attention to detail in your work?",
-        "Tell me about a time you identified a significant cost-saving opportunity.",
-    ],
-    "sales": [
-        "How do you handle rejection from a potential customer?",
-        "Describe your process for qualifying a new lead.",
-        "Tell me about your most successful sale and what made it a success.",
-    ],
-    "software developer": [
-        "Can you describe a challenging technical problem you solved on a recent project?",
-        "How do you stay up-to-date with new technologies and programming languages?",
-        "Explain a complex project you worked on in simple terms.",
-    ],
+import json
+import logging
+import re
+from typing import Tuple, List, Optional, Dict, Any, Sequence
+from . import models, ai_client, question_bank
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_PER_INTERVIEW = 5
+
+def get_questions_for_role(role: str, seen: Sequence[int] = ()) -> List[question_bank.Question]:
+    """Picks questions for a role from the question bank, avoiding the ones in seen where it can."""
+    return question_bank.bank().select(role, QUESTIONS_PER_INTERVIEW, seen=seen)
+
+# --- Instant local scoring ---
+# Cues for the parts of a STAR answer (Situation, Task, Action, Result).
+STAR_CUES = {
+    "situation": ("when i", "at my", "in my previous", "in my last", "while working", "situation", "once", "last year"),
+    "task": ("my role", "i was responsible", "responsible for", "my task", "i needed to", "i had to", "the goal", "challenge"),
+    "action": ("i led", "i built", "i created", "i organised", "i organized", "i decided", "i implemented", "i introduced",
+               "i set up", "i trained", "i worked with", "i took", "i designed", "i negotiated", "i called"),
+    "result": ("as a result", "result", "which led", "increased", "reduced", "saved", "improved", "achieved", "grew", "cut "),
 }
+NUMBER_PATTERN = re.compile(r"\d|percent|\bkes\b|\bksh", re.IGNORECASE)
 
-def get_questions_for_role(role: str) -> List[str]:
-    """Selects relevant questions for a given role, including general questions."""
-    role_key = role.lower()
-    questions = list(INTERVIEW_QUESTIONS.get("general", [])) # Start with a copy of general questions
-    
-    # Find the best matching role-specific questions
-    best_match_key = None
-    for key in INTERVIEW_QUESTIONS:
-        if key in role_key:
-            best_match_key = key
-            break
-    
-    if best_match_key:
-        questions.extend(INTERVIEW_QUESTIONS[best_match_key])
-        
-    random.shuffle(questions)
-    return questions[:5] # Return a random set of 5 questions
+def score_answer(answer: str) -> Tuple[int, str]:
+    """
+    A quick 1-5 score for an answer from its length, STAR structure and use of
+    numbers, with a tip for the weakest part. Local, so it is instant; the AI
+    grades the whole interview at the end.
+    """
+    text = answer.lower()
+    words = len(text.split())
+    parts = [part for part, cues in STAR_CUES.items() if any(cue in text for cue in cues)]
+    has_number = bool(NUMBER_PATTERN.search(text))
+
+    score = 1
+    score += 2 if 30 <= words <= 150 else 1 if words >= 8 else 0
+    score += len(parts) // 2
+    score += 1 if has_number else 0
+    score = min(score, 5)
+
+    if words < 8:
+        tip = "Add more detail: aim for 4-6 sentences."
+    elif words > 150:
+        tip = "Try to keep it shorter and focused on one example."
+    elif "result" not in parts:
+        tip = "End with the result of what you did."
+    elif "action" not in parts:
+        tip = "Say what *you* did, e.g. 'I organised...'."
+    elif not has_number:
+        tip = "Add a number to show your impact (e.g., 'cut costs by 10%')."
+    else:
+        tip = "Strong structure. Keep practising it out loud!"
+    return score, tip
 
 def format_feedback(interview_data: dict) -> str:
-    """Formats the collected answers into a summary for the user."""
+    """Formats the collected answers, with their quick scores, into a summary for the user."""
     feedback = "*--- Your Interview Practice Summary ---*\n\n"
     answers = interview_data.get("answers", {})
     
     for question, answer in answers.items():
+        score, tip = score_answer(answer)
         feedback += f"*Question:* {question}\n"
-        feedback += f"*Your Answer:* {answer}\n\n"
+        feedback += f"*Your Answer:* {answer}\n"
+        feedback += f"*Quick score:* {score}/5. {tip}\n\n"
         
     feedback += "*--------------------*\n"
     feedback += "Well done! Reviewing your answers is a great way to prepare."
     return feedback.strip()
 
+# --- AI grading, one call per interview ---
+def is_finished(interview_data: dict) -> bool:
+    """Whether every question of the interview has an answer."""
+    questions = interview_data.get("questions", [])
+    return bool(questions) and len(interview_data.get("answers", {})) == len(questions)
+
+def _parse_grades(ai_response: str, count: int) -> Optional[List[Optional[Dict[str, Any]]]]:
+    """
+    The per-question grades in the AI's JSON reply, in question order; None if
+    the reply is not the JSON asked for. A question the AI skipped is None.
+    """
+    start, end = ai_response.find("["), ai_response.rfind("]")
+    if start < 0 or end < start:
+        return None
+    try:
+        items = json.loads(ai_response[start:end + 1])
+    except ValueError:
+        return None
+    grades: List[Optional[Dict[str, Any]]] = [None] * count
+    for item in items:
+        try:
+            index = int(item["question"]) - 1
+            score = min(max(int(item["score"]), 1), 5)
+            tip = str(item.get("tip", "")).strip()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < count:
+            grades[index] = {"score": score, "tip": tip}
+    return grades if any(grades) else None
+
+async def grade_answers(interview_data: dict) -> Optional[List[Optional[Dict[str, Any]]]]:
+    """
+    Grades every answer of a finished interview in a single AI call, returning
+    a score (1-5) and a tip per question, or None if the AI is unavailable.
+    """
+    answers = list(interview_data.get("answers", {}).items())
+    if not answers:
+        return None
+    role = interview_data.get("role", "the role")
+
+    system_prompt = (
+        "You are KaziLeo, a friendly and honest interview coach in Kenya. Grade each answer from a practice interview. "
+        "Judge relevance to the question, structure (Situation, Task, Action, Result), specific evidence and numbers, and clarity. "
+        "Respond ONLY with a JSON array with one object per question, in order, like: "
+        '[{"question": 1, "score": 3, "tip": "One specific sentence on how to improve this answer."}]. '
+        "score is an integer from 1 (weak) to 5 (excellent)."
+    )
+    qa_text = "\n\n".join(f"Question {number}: {question}\nAnswer {number}: {answer}" for number, (question, answer) in enumerate(answers, 1))
+    user_prompt = f"The role is: {role}\n\n{qa_text}\n\nGrade all {len(answers)} answers."
+
+    ai_response = await ai_client.get_ai_response(system_prompt, user_prompt, json_response=True)
+    if not ai_response:
+        return None
+    grades = _parse_grades(ai_response, len(answers))
+    if grades is None:
+        logger.error("Could not parse interview grades from the AI response", extra={"body": ai_response})
+    return grades
+
+def format_ai_feedback(interview_data: dict, grades: List[Optional[Dict[str, Any]]]) -> str:
+    """Formats the AI's grades into the detailed feedback message."""
+    questions = list(interview_data.get("answers", {}))
+    feedback = "*--- AI Coach Feedback ---*\n\n"
+    scored = [grade["score"] for grade in grades if grade]
+    for number, (question, grade) in enumerate(zip(questions, grades), 1):
+        if grade is None:
+            continue
+        feedback += f"*Q{number}:* {question}\n"
+        feedback += f"*Score:* {grade['score']}/5\n"
+        if grade["tip"]:
+            feedback += f"*Tip:* {grade['tip']}\n"
+        feedback += "\n"
+    feedback += f"*Overall:* {sum(scored) / len(scored):.1f}/5"
+    return feedback
+
 def handle_interview_conversation(session: models.UserSession, message_text: str) -> Tuple[str, bool]:
     """
     Manages the interview simulation conversation.
@@ -71,7 +155,10 @@ def handle_interview_conversation(session: models.UserSession, message_text: str
     # --- Start of the flow: Get the job role ---
     if not interview_data.get("questions"):
         role = message_text
-        questions = get_questions_for_role(role)
+        seen = question_bank.decode_seen(session.interview_history)
+        picked = get_questions_for_role(role, seen)
+        session.interview_history = question_bank.encode_seen(seen + [question.id for question in picked])
+        questions = [question.text for question in picked]
         interview_data["role"] = role
         interview_data["questions"] = questions
         interview_data["answers"] = {}
@@ -79,7 +166,7 @@ def handle_interview_conversation(session: models.UserSession, message_text: str
         
         first_question = questions[0]
         state["awaiting_interview_answer"] = True
-        return f"Great! Let's practice for a *{role}* interview. We'll go through 5 questions.\n\nHere's your first one:\n\n_{first_question}_", False
+        return f"Great! Let's practice for a *{role}* interview. We'll go through {len(questions)} questions.\n\nHere's your first one:\n\n_{first_question}_", False
 
     # --- During the flow: Process an answer and ask the next question ---
     if state.get("awaiting_interview_answer"):
@@ -96,7 +183,8 @@ def handle_interview_conversation(session: models.UserSession, message_text: str
         
         if next_index < len(questions):
             next_question = questions[next_index]
-            return f"Good answer. Here is question {next_index + 1} of {len(questions)}:\n\n_{next_question}_", False
+            score, tip = score_answer(message_text)
+            return f"Quick score: {score}/5. {tip}\n\nHere is question {next_index + 1} of {len(questions)}:\n\n_{next_question}_", False
         else:
             # All questions have been answered
             state.pop("awaiting_interview_answer", None)
@@ -1,7 +1,14 @@
 # app/job_client.py
 import httpx
 import logging
-from typing import List, Optional
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from . import event_log, metrics
+
+logger = logging.getLogger(__name__)
 
 # --- Uncategorized Mock Job Database with REAL Data ---
 # This is now a single list, allowing for more flexible keyword searching.
@@ -33,7 +40,7 @@ MOCK_JOBS_LIST = [
     "*Operations and Administration Assistant* at WUSC - https://www.fuzu.com/kenya/jobs/operations-and-administration-assistant-wusc-nairobi",
     "*Personal Assistant, Finance & Operations Administrator* at The Nairobi Women's Hospital - https://www.fuzu.com/kenya/jobs/personal-assistant-finance-operations-administrator",
     "*Operations Assistant* at EmpowerU HR Solutions- https://www.myjobmag.co.ke/job/operations-assistant-empoweru-hr-solutions",
-    "*Executive Assistant* at INUA AI - https://www.myjobmag.co.ke/job/executive-assistant-inua-ai"
+    "*Executive Assistant* at INUA AI - https://www.myjobmag.co.ke/job/executive-assistant-inua-ai",
 
 
     #Technical
@@ -56,21 +63,176 @@ MOCK_JOBS_LIST = [
     "*Front Office Assistant* at Marriott - https://www.myjobmag.co.ke/job/front-office-assistant-marriott"
 ]
 
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NO_TOKENS: Set[str] = frozenset()
+
+# When the curated list below was last checked; its listings age from then like any feed listing.
+MOCK_JOBS_POSTED_AT = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+def _trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+_LISTING_RE = re.compile(r"\*(?P<title>.+?)\*\s+at\s+(?P<company>.+?)\s*-\s*(?P<url>https?://\S+)$")
+
+class JobIndex:
+    """
+    An in-memory search index over job listings that can be updated one listing
+    at a time, so feed ingestion never has to rebuild it.
+
+    Listings are keyed by a stable id (the canonical URL hash from job_feed).
+    Searches keep the original substring semantics of the mock list, but only
+    verify the listings whose words could contain every query word: the words
+    containing a query word are found through a trigram index over the
+    vocabulary rather than by scanning it. A query word under three
+    characters is left to the final substring check, or, when it is all the
+    query has, matched against every word.
+    """
+
+    def __init__(self):
+        self._listings: Dict[str, str] = {}
+        self._text: Dict[str, str] = {}
+        self._posted_at: Dict[str, datetime] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # trigram -> the indexed words containing it
+        self._grams: Dict[str, Set[str]] = {}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        self._fingerprints: Dict[str, str] = {}
+        self._fingerprint_of: Dict[str, str] = {}
+        # Feeds are ingested off the event loop while searches keep running on it.
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def __contains__(self, listing_id: str) -> bool:
+        return listing_id in self._listings
+
+    def id_for_fingerprint(self, fingerprint: str) -> Optional[str]:
+        """Returns the id of the indexed listing with this title+company fingerprint, if any."""
+        return self._fingerprints.get(fingerprint)
+
+    def upsert(self, listing_id: str, listing: str, posted_at: Optional[datetime] = None, fingerprint: Optional[str] = None):
+        """Adds a listing, or replaces it (and refreshes its age) if the id is already indexed."""
+        with self._lock:
+            if listing_id in self._listings:
+                self.remove(listing_id)
+            text = listing.lower()
+            self._listings[listing_id] = listing
+            self._text[listing_id] = text
+            self._posted_at[listing_id] = posted_at or datetime.now(timezone.utc)
+            self._order[listing_id] = self._next_order
+            self._next_order += 1
+            if fingerprint:
+                self._fingerprints[fingerprint] = listing_id
+                self._fingerprint_of[listing_id] = fingerprint
+            for token in set(_TOKEN_RE.findall(text)):
+                ids = self._postings.get(token)
+                if ids is None:
+                    ids = self._postings[token] = set()
+                    for gram in _trigrams(token):
+                        self._grams.setdefault(gram, set()).add(token)
+                ids.add(listing_id)
 
+    def remove(self, listing_id: str) -> bool:
+        """Drops a listing from the index. Returns False if it was not indexed."""
+        with self._lock:
+            text = self._text.pop(listing_id, None)
+            if text is None:
+                return False
+            del self._listings[listing_id]
+            del self._posted_at[listing_id]
+            del self._order[listing_id]
+            fingerprint = self._fingerprint_of.pop(listing_id, None)
+            if fingerprint is not None:
+                self._fingerprints.pop(fingerprint, None)
+            for token in set(_TOKEN_RE.findall(text)):
+                ids = self._postings.get(token)
+                if ids is not None:
+                    ids.discard(listing_id)
+                    if not ids:
+                        del self._postings[token]
+                        for gram in _trigrams(token):
+                            tokens = self._grams[gram]
+                            tokens.discard(token)
+                            if not tokens:
+                                del self._grams[gram]
+            return True
+
+    def expire_before(self, cutoff: datetime) -> List[str]:
+        """Removes every listing posted before the cutoff and returns their ids."""
+        with self._lock:
+            expired = [listing_id for listing_id, posted_at in self._posted_at.items() if posted_at < cutoff]
+            for listing_id in expired:
+                self.remove(listing_id)
+            return expired
+
+    def _containing(self, query_token: str) -> Set[str]:
+        """The ids of the listings with a word that contains query_token."""
+        grams = _trigrams(query_token)
+        if grams:
+            token_sets = sorted((self._grams.get(gram, _NO_TOKENS) for gram in grams), key=len)
+            tokens = token_sets[0].intersection(*token_sets[1:])
+        else:
+            # Too short to have a trigram: every word is checked.
+            tokens = self._postings.keys()
+        matches: Set[str] = set()
+        for token in tokens:
+            if query_token in token:
+                matches |= self._postings[token]
+        return matches
+
+    def _candidates(self, query_tokens: Iterable[str]) -> Optional[Set[str]]:
+        candidates: Optional[Set[str]] = None
+        # Longest first; once a word has narrowed the candidates, short words are left to the substring check.
+        for query_token in sorted(query_tokens, key=len, reverse=True):
+            if candidates is not None and len(query_token) < 3:
+                break
+            matches = self._containing(query_token)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return set()
+        return candidates
+
+    def search(self, search_term: str) -> List[str]:
+        """Returns listings containing the search term, in the order they were indexed."""
+        search_term = search_term.lower()
+        with self._lock:
+            candidates = self._candidates(_TOKEN_RE.findall(search_term))
+            if candidates is None:
+                return [self._listings[listing_id] for listing_id in self._listings if search_term in self._text[listing_id]]
+            # Checked before sorting: usually far fewer listings match than are candidates.
+            found = [listing_id for listing_id in candidates if search_term in self._text[listing_id]]
+            return [self._listings[listing_id] for listing_id in sorted(found, key=self._order.__getitem__)]
+
+def _seed_index() -> JobIndex:
+    """Builds the live index from the curated mock list."""
+    from . import job_feed
+
+    index = JobIndex()
+    for listing in MOCK_JOBS_LIST:
+        match = _LISTING_RE.match(listing)
+        if match:
+            index.upsert(job_feed.url_hash(match.group("url")), listing, MOCK_JOBS_POSTED_AT,
+                         fingerprint=job_feed.fingerprint(match.group("title"), match.group("company")))
+        else:
+            index.upsert(job_feed.url_hash(listing), listing, MOCK_JOBS_POSTED_AT)
+    return index
+
+# The live index that fetch_jobs searches and job_feed ingestion updates.
+JOB_INDEX = _seed_index()
 
 async def fetch_jobs(job_title: str) -> Optional[List[str]]:
     """
-    Fetches job listings by performing a keyword search on the mock database.
+    Fetches job listings by performing a keyword search on the live job index.
     """
-    logging.info(f"Fetching mock jobs for keyword: '{job_title}'")
-    
-    search_term = job_title.lower()
-    
-    # Find all jobs in the list that contain the search term
-    found_jobs = [job for job in MOCK_JOBS_LIST if search_term in job.lower()]
-    
+    logger.info("Fetching jobs", extra={"body": job_title})
+
+    with metrics.span("catalog_jobs"):
+        found_jobs = JOB_INDEX.search(job_title)
+    event_log.add("catalog_hits", len(found_jobs))
+
     if not found_jobs:
-        logging.warning(f"No mock jobs found for keyword '{job_title}'")
+        logger.warning("No jobs found", extra={"body": job_title})
         return []
-        
+
     return found_jobs
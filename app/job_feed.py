@@ -0,0 +1,282 @@
+# app/job_feed.py
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .config import settings
+
+if TYPE_CHECKING:
+    from .job_client import JobIndex
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from and never identify a listing.
+TRACKING_PARAMS = {"ref", "source", "src", "fbclid", "gclid", "mc_cid", "mc_eid"}
+
+# Partner feeds name the same field differently; the first key present wins.
+FIELD_ALIASES = {
+    "title": ("title", "job_title", "position", "name"),
+    "company": ("company", "company_name", "employer", "organization", "hiring_organization", "author", "creator", "source"),
+    "url": ("url", "link", "apply_url", "job_url", "guid", "id"),
+    "posted_at": ("posted_at", "date_posted", "published", "pubdate", "date", "updated", "created_at"),
+    "status": ("status", "state"),
+}
+
+READ_CHUNK_SIZE = 64 * 1024
+
+class FeedListing(NamedTuple):
+    title: str
+    company: str
+    url: str
+    posted_at: Optional[datetime]
+    expired: bool
+
+def canonical_url(url: str) -> str:
+    """Normalises a listing URL so the same job posted via different links compares equal."""
+    parts = urlsplit(url.strip())
+    host = parts.hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host.lower(), path, urlencode(query), ""))
+
+def url_hash(url: str) -> str:
+    """The stable listing id used by the job index: a short hash of the canonical URL."""
+    return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:16]
+
+def fingerprint(title: str, company: str) -> str:
+    """Hashes the normalised title and company, catching the same job cross-posted on two boards."""
+    words = re.findall(r"[a-z0-9]+", f"{title}|{company}".lower())
+    return hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()[:16]
+
+def format_listing(listing: FeedListing) -> str:
+    """Renders a listing in the same '*Title* at Company - URL' form as the curated list."""
+    return f"*{listing.title}* at {listing.company} - {listing.url}"
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    try:
+        if isinstance(value, (int, float)) or str(value).isdigit():
+            return datetime.fromtimestamp(float(value), tz=timezone.utc)
+        text = str(value).strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _pick(record: Dict[str, Any], field: str) -> Any:
+    for key in FIELD_ALIASES[field]:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+def normalise(record: Dict[str, Any]) -> Optional[FeedListing]:
+    """Maps one raw feed record onto a FeedListing, or returns None if it cannot be listed."""
+    record = {str(key).lower(): value for key, value in record.items()}
+    title = str(_pick(record, "title") or "").strip()
+    company = str(_pick(record, "company") or "").strip()
+    url = str(_pick(record, "url") or "").strip()
+
+    # RSS boards usually put the employer in the title: "Accountant at Tatu City".
+    if not company and " at " in title:
+        title, company = (part.strip() for part in title.rsplit(" at ", 1))
+
+    if not title or not url.startswith(("http://", "https://")):
+        return None
+
+    status = str(_pick(record, "status") or "").lower()
+    expired = status in ("expired", "closed", "filled", "deleted") or str(record.get("expired", "")).lower() in ("1", "true", "yes")
+    return FeedListing(title, company or "Unknown employer", url, _parse_date(_pick(record, "posted_at")), expired)
+
+def _iter_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open(newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+def _iter_json(path: Path) -> Iterator[Dict[str, Any]]:
+    """Streams either a JSON array of objects or JSON Lines without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with path.open(encoding="utf-8") as f:
+        buffer = ""
+        eof = False
+        while True:
+            buffer = buffer.lstrip(" \t\r\n,[]")
+            if not buffer:
+                if eof:
+                    return
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer = chunk
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    logger.warning(f"Truncated JSON record at end of feed {path}")
+                    return
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            if isinstance(record, dict):
+                yield record
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+def _iter_xml(path: Path) -> Iterator[Dict[str, Any]]:
+    """Streams RSS <item> and Atom <entry> elements, clearing each one once it is read."""
+    parents = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if _local_name(elem.tag) not in ("item", "entry"):
+            continue
+        record: Dict[str, Any] = {}
+        for child in elem:
+            name = _local_name(child.tag)
+            if name == "link" and child.get("href"):
+                record.setdefault("link", child.get("href"))
+            elif name == "author" and len(child):
+                record.setdefault("author", (child[0].text or "").strip())
+            elif child.text and child.text.strip():
+                record.setdefault(name, child.text.strip())
+        yield record
+        if parents:
+            parents[-1].remove(elem)
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields raw records from a CSV, JSON/JSON Lines or RSS/Atom feed file, one at a time."""
+    feed = Path(path)
+    suffix = feed.suffix.lower()
+    if suffix == ".csv":
+        return _iter_csv(feed)
+    if suffix in (".json", ".jsonl", ".ndjson"):
+        return _iter_json(feed)
+    if suffix in (".xml", ".rss", ".atom"):
+        return _iter_xml(feed)
+    raise ValueError(f"Unsupported job feed format: {feed.name}")
+
+def ingest_feed(
+    path: str,
+    index: Optional["JobIndex"] = None,
+    max_age_days: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    Streams a partner feed into the live job index.
+
+    New listings are added, re-posted ones refresh their age, duplicates (same
+    canonical URL, or same title and company under another URL) are dropped,
+    listings the feed marks as expired are removed, and finally anything older
+    than the configured age is expired from the index.
+    """
+    from . import job_client  # job_client seeds its index with this module's hashes
+
+    index = index if index is not None else job_client.JOB_INDEX
+    max_age = timedelta(days=max_age_days if max_age_days is not None else settings.JOB_FEED_MAX_AGE_DAYS)
+    cutoff = (now or datetime.now(timezone.utc)) - max_age
+    stats = {"read": 0, "added": 0, "updated": 0, "duplicates": 0, "removed": 0, "skipped": 0, "expired": 0}
+    seen_this_feed = set()
+
+    for record in iter_records(path):
+        stats["read"] += 1
+        listing = normalise(record)
+        if listing is None:
+            stats["skipped"] += 1
+            continue
+
+        if listing.expired:
+            if index.remove(url_hash(listing.url)):
+                stats["removed"] += 1
+            continue
+        if listing.posted_at is not None and listing.posted_at < cutoff:
+            stats["skipped"] += 1
+            continue
+
+        listing_id = url_hash(listing.url)
+        if listing_id in seen_this_feed:
+            stats["duplicates"] += 1
+            continue
+
+        listing_fingerprint = fingerprint(listing.title, listing.company)
+        existing_id = index.id_for_fingerprint(listing_fingerprint)
+        if existing_id is not None and existing_id != listing_id:
+            stats["duplicates"] += 1
+            continue
+
+        stats["updated" if listing_id in index else "added"] += 1
+        index.upsert(listing_id, format_listing(listing), listing.posted_at, fingerprint=listing_fingerprint)
+        seen_this_feed.add(listing_id)
+
+    stats["expired"] = len(index.expire_before(cutoff))
+    logger.info(f"Ingested job feed {path}: {stats}")
+    return stats
+
+def ingest_configured_feeds() -> None:
+    """Ingests every feed listed in settings.JOB_FEED_PATHS (comma-separated)."""
+    for path in filter(None, (p.strip() for p in settings.JOB_FEED_PATHS.split(","))):
+        try:
+            ingest_feed(path)
+        except Exception as e:
+            logger.error(f"Failed to ingest job feed {path}: {e}", exc_info=True)
+
+class FeedRefresher:
+    """
+    Re-reads the partner feeds every interval, so a long-running worker picks
+    up new, re-posted and closed listings, and expires listings older than
+    JOB_FEED_MAX_AGE_DAYS from the live index even when no feed is configured.
+    The startup warm-up does the first read.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stats: Dict[str, float] = {"refreshes": 0, "expired": 0, "last_refresh_ms": 0.0}
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """Ingests every configured feed, then expires old listings; returns how many expired."""
+        from . import job_client
+
+        start = time.perf_counter()
+        ingest_configured_feeds()
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=settings.JOB_FEED_MAX_AGE_DAYS)
+        expired = len(job_client.JOB_INDEX.expire_before(cutoff))
+        self.stats["refreshes"] += 1
+        self.stats["expired"] += expired
+        self.stats["last_refresh_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return expired
+
+    async def run_refresher(self):
+        """Refreshes every interval seconds, off the event loop, until cancelled."""
+        if self.interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.refresh)
+            except Exception as e:
+                logger.error(f"Job feed refresh failed: {e}", exc_info=True)
+
+FEED_REFRESHER = FeedRefresher(settings.JOB_FEED_REFRESH_SECONDS)
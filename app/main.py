@@ -1,32 +1,78 @@
+import asyncio
+import json
 import logging
-from fastapi import FastAPI, Request, Response, HTTPException, Depends
-from fastapi.responses import FileResponse, JSONResponse
-from sqlalchemy.orm import Session
+import secrets
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, Request, Response, HTTPException, Depends, Header, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 # Import modules from our application structure
-from . import models, crud, services, whatsapp_client
-from .database import engine, get_db
+from . import crud, services, text_responses, whatsapp_client, feedback_handler, event_log, http_pool, metrics
+from .campaigns import CAMPAIGNS
+from .document_export import EXPORTER
+from .feedback_writer import FEEDBACK_WRITER
+from .job_feed import FEED_REFRESHER
+from .session_cache import SESSION_CACHE
+from .session_sweeper import SESSION_SWEEPER
+from .shared_state import STATE
+from .startup import STARTUP
+from .structured_logging import logging_stats, setup_logging, stop_logging
+from .turn_profiler import TURN_PROFILER
+from .database import AsyncSessionLocal, async_schema_engines, describe_engine_profile, get_db
 from .config import settings
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
-models.Base.metadata.create_all(bind=engine)
-
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="KaziLeo WhatsApp Bot")
-
 # --- Pydantic Models for WhatsApp Webhook Validation ---
 class TextMessage(BaseModel):
     body: str
 
+class ButtonReply(BaseModel):
+    id: str
+    title: str
+
+class ListReply(BaseModel):
+    id: str
+    title: str
+    description: Optional[str] = None
+
+class InteractiveReply(BaseModel):
+    type: str
+    button_reply: Optional[ButtonReply] = None
+    list_reply: Optional[ListReply] = None
+
+class QuickReplyButton(BaseModel):
+    text: str
+    payload: Optional[str] = None
+
 class Message(BaseModel):
     id: str
     from_number: str = Field(..., alias='from')
     timestamp: str
     type: str
     text: Optional[TextMessage] = None
+    # A tapped reply button or list row (see whatsapp_client.send_whatsapp_buttons / send_whatsapp_list).
+    interactive: Optional[InteractiveReply] = None
+    # A tapped quick-reply button on a template message.
+    button: Optional[QuickReplyButton] = None
+
+    @property
+    def content(self) -> str:
+        """What the user said: the text typed, or the id of the button or row tapped, which is the text it stands for."""
+        if self.text:
+            return self.text.body
+        if self.interactive:
+            reply = self.interactive.button_reply or self.interactive.list_reply
+            return reply.id if reply else ""
+        if self.button:
+            return self.button.payload or self.button.text
+        return ""
 
 class Profile(BaseModel):
     name: str
@@ -53,11 +99,94 @@ class WebhookRequest(BaseModel):
     object: str
     entry: List[Entry]
 
+# --- Pydantic Models for the Admin API ---
+class CampaignRequest(BaseModel):
+    """
+    A broadcast and who gets it; filters left out match everyone (see
+    campaigns.recipients_query). It is sent as the approved WhatsApp template
+    template_name, its body filled in from template_params; message is what
+    the template says, kept with the campaign.
+    """
+    message: str = Field(..., min_length=1, max_length=4096)
+    template_name: str = Field(..., min_length=1, max_length=512)
+    template_language: str = Field("en", min_length=2, max_length=16)
+    template_params: List[str] = Field(default_factory=list, max_length=20)
+    job_interest: Optional[str] = None
+    training_interest: Optional[str] = None
+    active_since: Optional[datetime] = None
+    active_before: Optional[datetime] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the background writers and the warm-up (see app/startup.py); the
+    app serves while warm-up runs, and /readyz says when it is done. On
+    shutdown the writers are stopped and what they still hold is written.
+    """
+    logger.info(f"Database engine profile: {describe_engine_profile()}")
+    # Read (or generated) before the first turn, so a missing key file fails startup, not a turn.
+    event_log.hash_key()
+    if not settings.EVENT_LOG_HASH_KEY:
+        logger.warning(f"EVENT_LOG_HASH_KEY is not set; phone numbers are hashed with the key in {settings.EVENT_LOG_HASH_KEY_FILE}")
+    # Dirty cached sessions, buffered feedback and queued events are written in the background.
+    app.state.session_flusher = asyncio.create_task(SESSION_CACHE.run_flusher())
+    app.state.feedback_writer = asyncio.create_task(FEEDBACK_WRITER.run_flusher())
+    app.state.event_log = asyncio.create_task(event_log.EVENT_LOG.run_flusher())
+    app.state.session_sweeper = asyncio.create_task(SESSION_SWEEPER.run_sweeper())
+    app.state.campaign_sender = asyncio.create_task(CAMPAIGNS.run_sender())
+    app.state.feed_refresher = asyncio.create_task(FEED_REFRESHER.run_refresher())
+    app.state.warm_up = asyncio.create_task(STARTUP.warm_up())
+    yield
+
+    app.state.warm_up.cancel()
+    app.state.session_sweeper.cancel()
+    logger.info(f"Session sweeper stats: {SESSION_SWEEPER.stats}")
+    app.state.feed_refresher.cancel()
+    logger.info(f"Job feed refresher stats: {FEED_REFRESHER.stats}")
+
+    # Awaited, so a campaign being sent is checkpointed and released before the engines go.
+    app.state.campaign_sender.cancel()
+    await asyncio.gather(app.state.campaign_sender, return_exceptions=True)
+    logger.info(f"Campaign sender stats: {CAMPAIGNS.stats}")
+
+    app.state.feedback_writer.cancel()
+    await FEEDBACK_WRITER.flush()
+    logger.info(f"Feedback writer stats: {FEEDBACK_WRITER.stats}")
+
+    app.state.event_log.cancel()
+    await event_log.EVENT_LOG.flush()
+    logger.info(f"Event log stats: {event_log.EVENT_LOG.stats}")
+
+    EXPORTER.shutdown()
+    logger.info(f"Document export stats: {EXPORTER.report()}")
+    await http_pool.aclose()
+
+    app.state.session_flusher.cancel()
+    await SESSION_CACHE.flush()
+    logger.info(f"Session cache stats: {SESSION_CACHE.stats}")
+    # Pooled aiosqlite connections each hold a thread that would keep the process alive.
+    for engine in async_schema_engines():
+        await engine.dispose()
+
+    # Last, so the lines above are written too.
+    logger.info(f"Logging stats: {logging_stats()}")
+    stop_logging()
+
+app = FastAPI(title="KaziLeo WhatsApp Bot", lifespan=lifespan)
+
 # --- API Endpoints ---
 @app.get("/", response_class=FileResponse)
 def read_root():
     return "index.html"
 
+@app.get("/documents/{media_id}", tags=["Web"])
+async def download_document(media_id: str):
+    """A CV or cover letter exported for a web user (see whatsapp_client.upload_media)."""
+    path = whatsapp_client.local_media_path(media_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return FileResponse(path, filename=path.name)
+
 @app.get("/webhook", tags=["Webhook"])
 async def verify_webhook(request: Request):
     mode = request.query_params.get("hub.mode")
@@ -72,36 +201,185 @@ async def verify_webhook(request: Request):
         raise HTTPException(status_code=403, detail="Verification failed")
 
 @app.post("/webhook", tags=["Webhook"])
-async def handle_webhook(request: WebhookRequest, db: Session = Depends(get_db)):
-    try:
-        change = request.entry[0].changes[0]
-        value = change.value
-
-        if value.messages and value.contacts:
-            message = value.messages[0]
-            contact = value.contacts[0]
-            
-            from_number = message.from_number
-            user_name = contact.profile.name
-            message_text = message.text.body if message.text else ""
-
-            # Clear any old replies for this user
-            if from_number in whatsapp_client.WEB_REPLIES:
-                whatsapp_client.WEB_REPLIES.pop(from_number)
-
-            session, is_new = crud.get_or_create_session(db, phone_number=from_number, user_name=user_name)
-            await services.process_message(db, session, message_text, is_new_user=is_new)
-            crud.update_session(db, session)
-
-            # --- THE FIX FOR THE WEB ---
-            # If this was a web user, retrieve and return the stored replies
-            if from_number.startswith("web-"):
-                replies = whatsapp_client.WEB_REPLIES.pop(from_number, [])
-                return JSONResponse(content={"replies": replies})
-
-    except Exception as e:
-        logger.error(f"Error handling webhook: {e}", exc_info=True)
-    
+async def handle_webhook(raw_request: Request, db: AsyncSession = Depends(get_db)):
+    with metrics.turn() as trace:
+        with metrics.span("parse"):
+            try:
+                request = WebhookRequest.model_validate_json(await raw_request.body())
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+        try:
+            change = request.entry[0].changes[0]
+            value = change.value
+
+            if value.messages and value.contacts:
+                message = value.messages[0]
+                contact = value.contacts[0]
+
+                from_number = message.from_number
+                user_name = contact.profile.name
+                message_text = message.content
+
+                # One turn per user at a time, across every worker: a second message
+                # waits, so replies are not mixed up and session changes are not lost.
+                async with AsyncExitStack() as turn:
+                    try:
+                        await turn.enter_async_context(STATE.lock(f"turn:{from_number}"))
+                    except TimeoutError:
+                        # The previous turn is still running; say so rather than drop the message.
+                        trace.fail()
+                        logger.warning("Timed out waiting for the previous turn", extra={"phone": from_number})
+                        busy = text_responses.get_message("turn_busy")
+                        if from_number.startswith("web-"):
+                            return JSONResponse(content={"replies": [busy]})
+                        await whatsapp_client.send_whatsapp_message(from_number, busy)
+                        return Response(status_code=200)
+
+                    # Clear any old replies for this user
+                    if from_number.startswith("web-"):
+                        await whatsapp_client.pop_web_replies(from_number)
+
+                    with event_log.record_turn(from_number):
+                        with event_log.timed("db"), metrics.span("session_load"):
+                            session, is_new = await SESSION_CACHE.get_or_create(db, phone_number=from_number, user_name=user_name)
+                        menu_before = session.current_menu
+                        event_log.note(menu_before=menu_before)
+                        try:
+                            with TURN_PROFILER.profile(session, message_text):
+                                await services.process_message(db, session, message_text, is_new_user=is_new)
+                        finally:
+                            event_log.note(menu_after=session.current_menu)
+                            # Labelled by the flow the turn ran in: the one it entered, or the one it just left.
+                            trace.flow = session.current_menu if session.current_menu != "main" else menu_before
+                            # The cached session is the source of truth, so even a failed turn's changes are kept.
+                            with event_log.timed("db"), metrics.span("session_update"):
+                                await SESSION_CACHE.mark_dirty(session)
+
+                    # --- THE FIX FOR THE WEB ---
+                    # If this was a web user, retrieve and return the stored replies
+                    if from_number.startswith("web-"):
+                        replies = await whatsapp_client.pop_web_replies(from_number)
+                        return JSONResponse(content={"replies": replies})
+
+        except Exception as e:
+            trace.fail()
+            logger.error(f"Error handling webhook: {e}", exc_info=True)
+
     # For regular WhatsApp messages, just return OK
     return Response(status_code=200)
 
+@app.get("/metrics", tags=["Monitoring"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Turn and span latencies of this worker process, in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz", tags=["Monitoring"])
+async def healthz():
+    """Liveness: answers while the event loop does, warmed up or not."""
+    return {"status": "ok", "uptime_seconds": round(time.perf_counter() - STARTUP.started, 1)}
+
+@app.get("/readyz", tags=["Monitoring"])
+async def readyz():
+    """Readiness: 503 until this worker has warmed up and while its database does not answer."""
+    report = await STARTUP.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# --- Admin Endpoints ---
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allows the request only if it carries settings.ADMIN_TOKEN; with no token configured, nothing is allowed."""
+    if not settings.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.get("/admin/feedback/analytics", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def feedback_analytics(
+    days: int = Query(30, ge=1, le=366),
+    recent: int = Query(20, ge=0, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    # This worker's buffered feedback is written first so the numbers include it.
+    await FEEDBACK_WRITER.flush()
+    return await crud.feedback_analytics(db, days=days, recent=recent)
+
+@app.get("/admin/feedback/export", tags=["Admin"], response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def export_feedback(limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_db)):
+    await FEEDBACK_WRITER.flush()
+    responses = await crud.recent_feedback(db, limit=limit)
+    return "\n\n".join(f"{response['timestamp']}\n{feedback_handler.format_feedback_summary(response)}" for response in responses)
+
+@app.get("/admin/exports/stats", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def export_stats():
+    """Render times and worker pool load of this process's document exporter."""
+    return EXPORTER.report()
+
+@app.get("/admin/profiles", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Slow and captured turn profiles kept by this process, newest first."""
+    return {"profiler": TURN_PROFILER.report(), "profiles": TURN_PROFILER.summaries()}
+
+@app.post("/admin/profiles/capture", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def capture_profiles(phone_number: str, turns: int = Query(1, ge=0, le=100)):
+    """Profiles the user's next turns whatever their latency (0 cancels). Only the worker that serves them captures."""
+    TURN_PROFILER.capture(phone_number, turns)
+    return TURN_PROFILER.report()
+
+@app.get("/admin/profiles/{profile_id}", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: int, format: str = Query("text", pattern="^(text|prof)$")):
+    """A kept profile as a pstats text report, or as a .prof file for pstats, snakeviz and the like."""
+    profile = TURN_PROFILER.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if format == "prof":
+        return Response(profile["_prof"], media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="turn-{profile_id}.prof"'})
+    return PlainTextResponse(profile["_report"])
+
+@app.get("/admin/events/export", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def export_events(since: Optional[datetime] = None):
+    """Streams the conversation event log as JSON lines, oldest first (per shard in sharded mode)."""
+    async def lines():
+        # Its own session: the request's is closed before a streamed body is sent.
+        async with AsyncSessionLocal() as db:
+            async for event in crud.iter_events(db, since=since):
+                yield json.dumps(event, default=str) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/admin/events/funnel", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def event_funnel(flow: str = "resume_builder", days: int = Query(7, ge=1, le=366), db: AsyncSession = Depends(get_db)):
+    if flow not in crud.FLOW_STEPS:
+        raise HTTPException(status_code=404, detail=f"Unknown flow: {flow}")
+    await event_log.EVENT_LOG.flush()
+    return await crud.flow_funnel(db, flow, since=datetime.now(timezone.utc) - timedelta(days=days))
+
+@app.get("/admin/events/intents", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def event_intents(days: int = Query(1, ge=1, le=366), db: AsyncSession = Depends(get_db)):
+    await event_log.EVENT_LOG.flush()
+    return await crud.intent_summary(db, since=datetime.now(timezone.utc) - timedelta(days=days))
+
+@app.post("/admin/campaigns", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def create_campaign(request: CampaignRequest, dry_run: bool = False):
+    """Queues a broadcast to the users matching the filters, with how many they are now; dry_run only counts them."""
+    recipients = await CAMPAIGNS.count_recipients(request)
+    if dry_run:
+        return {"recipients": recipients}
+    return {**await CAMPAIGNS.create(**request.model_dump()), "recipients": recipients}
+
+@app.get("/admin/campaigns", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def list_campaigns(limit: int = Query(20, ge=1, le=200)):
+    """The newest campaigns, with how far each has got."""
+    return await CAMPAIGNS.recent(limit=limit)
+
+@app.get("/admin/campaigns/{campaign_id}", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_campaign(campaign_id: int):
+    campaign = await CAMPAIGNS.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return campaign
+
+@app.post("/admin/campaigns/{campaign_id}/cancel", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def cancel_campaign(campaign_id: int):
+    """Stops a campaign that has not finished; the worker sending it stops at its next checkpoint."""
+    if not await CAMPAIGNS.cancel(campaign_id):
+        raise HTTPException(status_code=409, detail="Campaign not found or already finished")
+    return await CAMPAIGNS.get(campaign_id)
@@ -2,6 +2,8 @@
 import asyncio
 from typing import List, Optional
 
+from . import event_log, metrics
+
 # --- High-Quality Mock Database of Real, Relevant Mentorship Resources ---
 # This list is manually curated to provide real value to users in the pilot program.
 # It links to public profiles and content from respected Kenyan professionals.
@@ -29,17 +31,19 @@ async def fetch_mentors(keyword: str) -> Optional[List[str]]:
     """
     Simulates fetching mentorship resources based on a keyword search.
     """
-    await asyncio.sleep(1) # Simulate network latency
-    
-    try:
-        # A simple keyword search logic
-        keyword = keyword.lower()
-        results = [
-            mentor for mentor in MOCK_MENTORS_LIST 
-            if keyword in mentor.lower()
-        ]
-        return results if results else []
-    except Exception as e:
-        print(f"Error fetching mentor data: {e}")
-        return None
+    with metrics.span("catalog_mentors"):
+        await asyncio.sleep(1) # Simulate network latency
+
+        try:
+            # A simple keyword search logic
+            keyword = keyword.lower()
+            results = [
+                mentor for mentor in MOCK_MENTORS_LIST 
+                if keyword in mentor.lower()
+            ]
+            event_log.add("catalog_hits", len(results))
+            return results if results else []
+        except Exception as e:
+            print(f"Error fetching mentor data: {e}")
+            return None
 
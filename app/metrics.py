@@ -0,0 +1,171 @@
+# app/metrics.py
+"""
+In-process latency tracing and Prometheus metrics.
+
+The webhook wraps each request in turn(); code further down times itself
+with span("name") without being passed anything. A span inside a turn is
+kept on the turn's trace and observed when the turn ends, labelled with the
+flow the turn ran in, which is only known then. A span outside any turn
+(the session flusher) is observed straight away under flow="none".
+
+Everything is kept in this process, in a few dicts of bucket counts, and
+rendered in the Prometheus text format by render() for GET /metrics; each
+worker process serves its own numbers, which Prometheus sums.
+
+With METRICS_ENABLED off, turn() and span() hand back one shared object
+whose enter and exit do nothing, so instrumented code costs a function call
+and a ContextVar lookup.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+
+# Upper bounds of the latency buckets, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket latency histograms, one per label set."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        # label values -> [count per bucket (not cumulative), +Inf included], sum
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, label_values: Tuple[str, ...], seconds: float):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(BUCKETS) + 1), 0.0]
+        series[0][bisect_left(BUCKETS, seconds)] += 1
+        series[1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], int] = {}
+
+    def add(self, label_values: Tuple[str, ...]):
+        self.values[label_values] = self.values.get(label_values, 0) + 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+# Requests handled per flow are the _count series of the turn histogram.
+TURN_SECONDS = Histogram("kazileo_turn_duration_seconds", "Time to handle one webhook request, by flow.", ("flow",))
+SPAN_SECONDS = Histogram("kazileo_span_duration_seconds", "Time spent in each traced step of a turn, by flow.", ("span", "flow"))
+ERRORS = Counter("kazileo_turn_errors_total", "Webhook requests that failed, by flow.", ("flow",))
+IN_FLIGHT = Gauge("kazileo_turns_in_flight", "Webhook requests being handled right now.")
+METRICS = (TURN_SECONDS, SPAN_SECONDS, ERRORS, IN_FLIGHT)
+
+class Trace:
+    """The spans of one turn, observed together when it ends."""
+
+    __slots__ = ("flow", "spans", "failed", "_start", "_token")
+
+    def __init__(self):
+        self.flow = "none"
+        self.spans: List[Tuple[str, float]] = []
+        self.failed = False
+
+    def fail(self):
+        """Counts the turn as an error even though the handler caught what went wrong."""
+        self.failed = True
+
+    def __enter__(self) -> "Trace":
+        IN_FLIGHT.value += 1
+        self._token = _current_trace.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        _current_trace.reset(self._token)
+        IN_FLIGHT.value -= 1
+        flow = self.flow
+        if exc_type is not None or self.failed:
+            ERRORS.add((flow,))
+        TURN_SECONDS.observe((flow,), seconds)
+        observe = SPAN_SECONDS.observe
+        for name, span_seconds in self.spans:
+            observe((name, flow), span_seconds)
+        return False
+
+class Span:
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.name, seconds))
+        else:
+            SPAN_SECONDS.observe((self.name, "none"), seconds)
+        return False
+
+class _NoOp:
+    """What turn() and span() return with metrics off."""
+
+    __slots__ = ("flow",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def fail(self):
+        pass
+
+_NOOP = _NoOp()
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+def turn():
+    """Traces the webhook request run inside the block; set .flow on what it returns to label it, and call .fail() on errors it handles."""
+    return Trace() if settings.METRICS_ENABLED else _NOOP
+
+def span(name: str):
+    """Times the block as one step of the current turn (or on its own outside a turn)."""
+    return Span(name) if settings.METRICS_ENABLED else _NOOP
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
@@ -1,9 +1,10 @@
-from sqlalchemy import Integer, String, JSON, DateTime, func, Text, ForeignKey
+from sqlalchemy import Boolean, Float, Index, Integer, String, JSON, Date, DateTime, func, Text, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import datetime
+from datetime import date, datetime
 from typing import Dict, Any, Optional, List
 
 from .database import Base
+from .session_state import SessionStateType
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
@@ -18,22 +19,73 @@ class UserSession(Base):
     mentorship_interest: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     entrepreneurship_interest: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
-    # --- Feature-Specific Data ---
-    resume_data: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
-    interview_data: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
-    cover_letter_data: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
-
     # --- Session State ---
     current_menu: Mapped[str] = mapped_column(String, default="main")
-    session_data: Mapped[Dict[str, Any]] = mapped_column(JSON, default={})
+    # The language replies are written in; see app/templates.py.
+    locale: Mapped[str] = mapped_column(String(8), default="en", server_default="en")
+    # Stored in the compact encoding from app/session_state.py; handlers see a plain dict.
+    session_data: Mapped[Dict[str, Any]] = mapped_column(SessionStateType, default={})
     
     # --- Timestamps ---
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
-    last_active: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Indexed for the expiry sweeper (app/session_sweeper.py).
+    last_active: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     
     # --- Relationship to Feedback ---
     feedbacks: Mapped[List["Feedback"]] = relationship(back_populates="user_session")
 
+    # --- Feature-Specific Data (cold, see UserDocuments) ---
+    # Never lazy-loaded: flows that need the documents call crud.load_documents first.
+    documents: Mapped[Optional["UserDocuments"]] = relationship(lazy="raise")
+
+    @property
+    def resume_data(self) -> Dict[str, Any]:
+        return self.documents.resume_data
+
+    @resume_data.setter
+    def resume_data(self, value: Dict[str, Any]):
+        self.documents.resume_data = value
+
+    @property
+    def cover_letter_data(self) -> Dict[str, Any]:
+        return self.documents.cover_letter_data
+
+    @cover_letter_data.setter
+    def cover_letter_data(self, value: Dict[str, Any]):
+        self.documents.cover_letter_data = value
+
+    @property
+    def interview_data(self) -> Dict[str, Any]:
+        return self.documents.interview_data
+
+    @interview_data.setter
+    def interview_data(self, value: Dict[str, Any]):
+        self.documents.interview_data = value
+
+    @property
+    def interview_history(self) -> str:
+        return self.documents.interview_history
+
+    @interview_history.setter
+    def interview_history(self, value: str):
+        self.documents.interview_history = value
+
+
+# --- CV / COVER LETTER / INTERVIEW DOCUMENTS ---
+class UserDocuments(Base):
+    """
+    The large, rarely-used documents behind a session, kept out of the
+    user_sessions row so ordinary turns neither load nor rewrite them.
+    """
+    __tablename__ = "user_documents"
+
+    user_session_id: Mapped[int] = mapped_column(Integer, ForeignKey("user_sessions.id", ondelete="CASCADE"), primary_key=True)
+    resume_data: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    cover_letter_data: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    interview_data: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    # Interview questions already asked, packed by app/question_bank.py; kept after the interview ends.
+    interview_history: Mapped[str] = mapped_column(Text, default="", server_default="")
+
 
 # --- NEW FEEDBACK TABLE ---
 class Feedback(Base):
@@ -55,3 +107,105 @@ class Feedback(Base):
     # Relationship back to UserSession
     user_session: Mapped["UserSession"] = relationship(back_populates="feedbacks")
 
+
+# --- FEEDBACK AGGREGATES ---
+class FeedbackDailyStats(Base):
+    """
+    Per-day feedback counts, folded in by crud.save_feedback as each batch is
+    written, so the admin analytics never scan the feedback table.
+    """
+    __tablename__ = "feedback_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    responses: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_1: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_2: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_3: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_4: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_5: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+# --- CONVERSATION EVENT LOG ---
+class ConversationEvent(Base):
+    """
+    One conversation turn, appended by app/event_log.py. Rows are never
+    updated; phone numbers are stored only as a keyed hash.
+    """
+    __tablename__ = "conversation_events"
+    # Funnels and intent summaries filter on intent over a time window.
+    __table_args__ = (Index("ix_conversation_events_intent_created_at", "intent", "created_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    phone_hash: Mapped[str] = mapped_column(String(16), nullable=False)
+    menu_before: Mapped[str] = mapped_column(String(32), nullable=False)
+    menu_after: Mapped[str] = mapped_column(String(32), nullable=False)
+    intent: Mapped[str] = mapped_column(String(32), nullable=False)
+    step: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    error: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    # Latency breakdown (see event_log.STAGES) and per-turn counters
+    total_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+    db_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    ai_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    send_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    ai_calls: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    ai_tokens: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    catalog_hits: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Turns spent asking again after an answer the flow could not use.
+    retries: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+
+# --- SHARED STATE ---
+class SharedStateEntry(Base):
+    """
+    A key of app/shared_state.py's database backend: web replies, counters,
+    locks and session versions shared by every worker. version changes on
+    every write, so read-modify-write updates can check nothing came between.
+    """
+    __tablename__ = "shared_state"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    value: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Unix time after which the key reads as missing; None never expires.
+    expires_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True, index=True)
+
+
+# --- BROADCAST CAMPAIGNS ---
+class Campaign(Base):
+    """
+    A message broadcast to the users matching its filters, sent by
+    app/campaigns.py. The sender checkpoints its position here, so a campaign
+    whose worker died is resumed by another from after the last recipient
+    every earlier one was sent to.
+    """
+    __tablename__ = "campaigns"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+    # The approved WhatsApp template it is sent as and the values for its body's {{1}}, {{2}}, ...;
+    # message is then what the template says, for the record. Without one, message is sent as text.
+    template_name: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+    template_language: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    template_params: Mapped[Optional[List[str]]] = mapped_column(JSON, nullable=True)
+    # Recipient filters, see campaigns.recipients_query.
+    job_interest: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    training_interest: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    active_since: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    active_before: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # pending, running, done or cancelled
+    status: Mapped[str] = mapped_column(String(16), default="pending", nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # The worker sending it, and until when it counts as alive; renewed at every checkpoint.
+    owner: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    lease_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Checkpoint: every recipient up to after_id on shard_id (None unsharded) has been sent to.
+    shard_id: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    after_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,247 @@
+# app/question_bank.py
+"""
+The interview practice question bank.
+
+Questions live in tab-separated files under app/data/interview_questions
+(plus any listed in INTERVIEW_QUESTION_PATHS), one per line, tagged with a
+role, a seniority (any, junior, mid or senior) and a competency. Growing the
+bank means adding lines or files; nothing in the code lists questions.
+
+When first loaded, the bank is indexed by (role, seniority) into per-competency
+lists, and the role aliases in app/data/interview_roles.tsv (titles, Swahili
+and Sheng names) into a phrase table. A role typed by the user resolves
+with a dict lookup per phrase of up to a few words, with typos corrected
+against the alias vocabulary through a character trigram index, so
+"Senior sofware developer" and "mhasibu" both find their role. Selection
+then takes one question per competency, at random, skipping questions the
+user has been asked before: each question has a stable id (a hash of its
+text), and the ids a user has seen are kept as a short packed string on
+their documents.
+"""
+import base64
+import difflib
+import hashlib
+import random
+import re
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .config import settings
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+QUESTIONS_DIR = DATA_DIR / "interview_questions"
+ROLES_PATH = DATA_DIR / "interview_roles.tsv"
+
+GENERAL = "general"
+SENIORITIES = ("any", "junior", "mid", "senior")
+# Words in a typed role that say how senior it is rather than what it is.
+SENIORITY_WORDS = {
+    "junior": "junior", "intern": "junior", "internship": "junior", "graduate": "junior", "entry": "junior",
+    "trainee": "junior", "attachment": "junior", "assistant": "junior",
+    "mid": "mid", "intermediate": "mid", "experienced": "mid",
+    "senior": "senior", "lead": "senior", "head": "senior", "principal": "senior", "chief": "senior",
+}
+# How many general questions an interview for a known role includes.
+GENERAL_QUESTIONS = 2
+# Question ids are this many bytes of a hash of the text; a user's history keeps the most recent SEEN_LIMIT.
+ID_BYTES = 5
+SEEN_LIMIT = 200
+FUZZY_CUTOFF = 0.8
+
+_WORD = re.compile(r"[a-z0-9&']+")
+
+class Question(NamedTuple):
+    id: int
+    role: str
+    seniority: str
+    competency: str
+    text: str
+
+class RoleMatch(NamedTuple):
+    roles: Tuple[str, ...]
+    seniority: Optional[str]
+
+def question_id(text: str) -> int:
+    """A stable id for a question, so a user's history survives edits elsewhere in the bank."""
+    return int.from_bytes(hashlib.blake2b(text.strip().lower().encode("utf-8"), digest_size=ID_BYTES).digest(), "big")
+
+def encode_seen(ids: Sequence[int]) -> str:
+    """Packs the most recent SEEN_LIMIT question ids into a short string (ID_BYTES each, base64)."""
+    return base64.b64encode(b"".join(i.to_bytes(ID_BYTES, "big") for i in ids[-SEEN_LIMIT:])).decode("ascii")
+
+def decode_seen(packed: Optional[str]) -> List[int]:
+    raw = base64.b64decode(packed or "")
+    return [int.from_bytes(raw[i:i + ID_BYTES], "big") for i in range(0, len(raw) - ID_BYTES + 1, ID_BYTES)]
+
+def _tsv_rows(path: Path) -> Iterable[Tuple[int, List[str]]]:
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if line.strip() and not line.startswith("#"):
+                yield number, [cell.strip() for cell in line.split("\t")]
+
+def load_questions(paths: Iterable[Path]) -> List[Question]:
+    """Questions from .tsv files and directories of them, refusing a row with an unknown seniority."""
+    questions = []
+    for path in paths:
+        for file in sorted(path.glob("*.tsv")) if path.is_dir() else [path]:
+            for number, cells in _tsv_rows(file):
+                if len(cells) != 4 or cells[1] not in SENIORITIES:
+                    raise ValueError(f"{file}:{number}: expected role, seniority ({', '.join(SENIORITIES)}), competency and question")
+                role, seniority, competency, text = cells
+                questions.append(Question(question_id(text), role, seniority, competency, text))
+    return questions
+
+def load_roles(path: Path = ROLES_PATH) -> Dict[str, str]:
+    """Alias -> role from the roles file, refusing an alias given for two roles."""
+    aliases: Dict[str, str] = {}
+    for number, cells in _tsv_rows(path):
+        role, names = cells[0], cells[1] if len(cells) > 1 else ""
+        for alias in [role.replace("_", " ")] + names.split(","):
+            alias = " ".join(_WORD.findall(alias.lower()))
+            if not alias:
+                continue
+            if aliases.get(alias, role) != role:
+                raise ValueError(f"{path}:{number}: alias {alias!r} is listed for both {aliases[alias]} and {role}")
+            aliases[alias] = role
+    return aliases
+
+def _trigrams(word: str) -> Set[str]:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class QuestionBank:
+    """An indexed question bank; see the module docstring."""
+
+    def __init__(self, questions: Iterable[Question], aliases: Dict[str, str]):
+        by_id: Dict[int, Question] = {}
+        for question in questions:
+            by_id.setdefault(question.id, question)
+        self.questions = list(by_id.values())
+
+        # (role, seniority or None) -> [(competency, questions)]: a level takes its own questions and
+        # those for "any"; a role typed without a level takes only the latter.
+        grouped: Dict[Tuple[str, Optional[str]], Dict[str, List[Question]]] = defaultdict(lambda: defaultdict(list))
+        for question in self.questions:
+            for level in (None,) + SENIORITIES[1:]:
+                if question.seniority in ("any", level):
+                    grouped[(question.role, level)][question.competency].append(question)
+        self._pools = {key: list(competencies.items()) for key, competencies in grouped.items()}
+
+        self.roles = frozenset(question.role for question in self.questions) - {GENERAL}
+        self._aliases = {alias: role for alias, role in aliases.items() if role in self.roles}
+        self._max_alias_words = max((len(alias.split()) for alias in self._aliases), default=1)
+        self._vocabulary = {word for alias in self._aliases for word in alias.split()} | set(SENIORITY_WORDS)
+        self._trigram_index: Dict[str, List[str]] = defaultdict(list)
+        for word in self._vocabulary:
+            for trigram in _trigrams(word):
+                self._trigram_index[trigram].append(word)
+        # Users type the same few roles over and over.
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def _correct(self, word: str) -> str:
+        """The alias word closest to a misspelt one, or the word itself."""
+        if word in self._vocabulary or len(word) < 4:
+            return word
+        overlap: Dict[str, int] = defaultdict(int)
+        for trigram in _trigrams(word):
+            for candidate in self._trigram_index.get(trigram, ()):
+                overlap[candidate] += 1
+        best, best_ratio = word, FUZZY_CUTOFF
+        for candidate in sorted(overlap, key=overlap.__getitem__, reverse=True)[:8]:
+            ratio = difflib.SequenceMatcher(None, word, candidate).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = candidate, ratio
+        return best
+
+    def _resolve(self, role_text: str) -> RoleMatch:
+        """
+        The roles named in a typed role, in the order they appear, and its
+        seniority if it says. The longest alias wins at each position, so
+        "sales accountant" is both sales and accountant.
+        """
+        words = [self._correct(word) for word in _WORD.findall(role_text.lower())]
+        roles: List[str] = []
+        seniority = None
+        i = 0
+        while i < len(words):
+            for size in range(min(self._max_alias_words, len(words) - i), 0, -1):
+                role = self._aliases.get(" ".join(words[i:i + size]))
+                if role:
+                    if role not in roles:
+                        roles.append(role)
+                    i += size
+                    break
+            else:
+                seniority = SENIORITY_WORDS.get(words[i], seniority)
+                i += 1
+        return RoleMatch(tuple(roles), seniority)
+
+    def _competencies(self, role: str, seniority: Optional[str], rng: random.Random) -> List[Tuple[str, List[Question]]]:
+        pools = list(self._pools.get((role, seniority), ()))
+        rng.shuffle(pools)
+        return pools
+
+    def select(self, role_text: str, count: int, seen: Iterable[int] = (), rng: Optional[random.Random] = None) -> List[Question]:
+        """
+        count questions for a typed role: GENERAL_QUESTIONS general ones first,
+        then the role's, one competency at a time (several roles take turns),
+        preferring questions not in seen. Unknown roles get general questions.
+        """
+        rng = rng or random
+        match = self.resolve(role_text)
+        avoid = set(seen)
+        general = self._competencies(GENERAL, match.seniority, rng)
+        role_pools = [self._competencies(role, match.seniority, rng) for role in match.roles]
+        role_order = [pools[i] for i in range(max(map(len, role_pools), default=0)) for pools in role_pools if i < len(pools)]
+
+        chosen: List[Question] = []
+        general_wanted = min(GENERAL_QUESTIONS, count) if role_order else count
+        # Unseen questions first; repeats only once the user has seen everything that fits.
+        for allow_seen in (False, True):
+            self._take(general, general_wanted - sum(question.role == GENERAL for question in chosen), chosen, avoid, allow_seen, rng)
+            self._take(role_order, count - len(chosen), chosen, avoid, allow_seen, rng)
+            # Too few role questions left: general ones make up the number.
+            self._take(general, count - len(chosen), chosen, avoid, allow_seen, rng)
+            if len(chosen) >= count:
+                break
+        return chosen
+
+    def _take(self, pools: List[Tuple[str, List[Question]]], wanted: int, chosen: List[Question], avoid: Set[int],
+              allow_seen: bool, rng: random.Random):
+        """Adds up to `wanted` questions to chosen, cycling through the competency pools."""
+        taken_ids = {question.id for question in chosen}
+        while wanted > 0 and pools:
+            progress = False
+            for _, questions in pools:
+                if wanted <= 0:
+                    break
+                question = self._pick(questions, taken_ids if allow_seen else taken_ids | avoid, rng)
+                if question is not None:
+                    chosen.append(question)
+                    taken_ids.add(question.id)
+                    wanted -= 1
+                    progress = True
+            if not progress:
+                return
+
+    @staticmethod
+    def _pick(questions: List[Question], exclude: Set[int], rng: random.Random) -> Optional[Question]:
+        """A random question not in exclude: a few random probes, then a scan of what is left."""
+        for _ in range(4):
+            question = questions[rng.randrange(len(questions))]
+            if question.id not in exclude:
+                return question
+        remaining = [question for question in questions if question.id not in exclude]
+        return rng.choice(remaining) if remaining else None
+
+def _paths() -> List[Path]:
+    extra = [Path(path.strip()) for path in settings.INTERVIEW_QUESTION_PATHS.split(",") if path.strip()]
+    return [QUESTIONS_DIR] + extra
+
+@lru_cache(maxsize=None)
+def bank() -> QuestionBank:
+    """The shared bank, loaded on first use (or by the startup warm-up, see app/startup.py)."""
+    return QuestionBank(load_questions(_paths()), load_roles())
@@ -1,27 +1,50 @@
 # app/resume_builder.py
+import re
 from typing import Tuple
-from . import models
+from . import documents, forms, models
 
 # --- ATS-Friendly Questions ---
 # These questions are designed to prompt users for specific, keyword-rich, and quantifiable information.
-CV_QUESTIONS = [
-    ("full_name", "Of course. Let's build a CV that gets noticed. First, what is your full name?"),
-    ("email", "Got it. What's a professional email address for employers to contact you? (e.g., jane.doe@email.com)"),
-    ("phone", "Perfect. And your phone number?"),
-    ("links", "Great! Please share any professional links you'd like to include (e.g., LinkedIn, portfolio website, Github)."),
-    ("summary", 
-     "Next, let's write a powerful Professional Summary. Describe your main role and top achievement. "
-     "For example: 'Detail-oriented Accountant with 3 years of experience who saved a company KES 500,000 by optimizing budgets.'"),
-    ("experience", 
-     "Now for your Work Experience. Please list your most recent job title, the company, and one key achievement with a number. "
-     "For example: 'Accountant, XYZ Corp (2022-2024) - Reduced monthly reporting errors by 15%.'\n\n(Type 'skip' if you have no formal work experience)"),
-    ("skills", 
-     "Great. Now, list your most important technical and soft skills, separated by commas. Think about keywords from job descriptions. "
-     "For example: 'QuickBooks, Financial Reporting, Budgeting, Microsoft Excel, Communication, Problem-Solving'"),
-    ("education", 
-     "Almost done! What is your highest qualification and where did you get it? "
-     "For example: 'Bachelor of Commerce in Finance, University of Nairobi, 2021-2025'"),
-]
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+PHONE_PATTERN = re.compile(r"\+?[\d\s()-]{9,20}")
+LINK_PATTERN = re.compile(r"\S*(https?://|www\.|linkedin\.com/|github\.com/)\S*", re.IGNORECASE)
+
+def parse_email(answer: str) -> str:
+    if not EMAIL_PATTERN.fullmatch(answer):
+        raise ValueError("That doesn't look like an email address. Please check it and send it again (e.g., jane.doe@email.com).")
+    return answer
+
+def parse_phone(answer: str) -> str:
+    if not PHONE_PATTERN.fullmatch(answer) or not 9 <= sum(c.isdigit() for c in answer) <= 15:
+        raise ValueError("That doesn't look like a phone number. Please check it and send it again (e.g., 0712 345 678).")
+    return answer
+
+CV_FORM = forms.Form("cv", (
+    forms.Field("full_name", "Of course. Let's build a CV that gets noticed. First, what is your full name?",
+                labels=("name", "full name")),
+    forms.Field("email", "Got it. What's a professional email address for employers to contact you? (e.g., jane.doe@email.com)",
+                labels=("email", "e-mail"), parse=parse_email, pattern=EMAIL_PATTERN),
+    forms.Field("phone", "Perfect. And your phone number?",
+                labels=("phone", "phone number", "tel", "mobile"), parse=parse_phone, pattern=PHONE_PATTERN),
+    forms.Field("links", "Great! Please share any professional links you'd like to include (e.g., LinkedIn, portfolio website, Github).\n\n(Type 'skip' if you have none)",
+                labels=("links", "link", "linkedin", "portfolio"), skip_value="N/A", pattern=LINK_PATTERN),
+    forms.Field("summary",
+                "Next, let's write a powerful Professional Summary. Describe your main role and top achievement. "
+                "For example: 'Detail-oriented Accountant with 3 years of experience who saved a company KES 500,000 by optimizing budgets.'",
+                labels=("summary", "professional summary", "profile")),
+    forms.Field("experience",
+                "Now for your Work Experience. Please list your most recent job title, the company, and one key achievement with a number. "
+                "For example: 'Accountant, XYZ Corp (2022-2024) - Reduced monthly reporting errors by 15%.'\n\n(Type 'skip' if you have no formal work experience)",
+                labels=("experience", "work experience", "work"), skip_value="No formal work experience."),
+    forms.Field("skills",
+                "Great. Now, list your most important technical and soft skills, separated by commas. Think about keywords from job descriptions. "
+                "For example: 'QuickBooks, Financial Reporting, Budgeting, Microsoft Excel, Communication, Problem-Solving'",
+                labels=("skills",)),
+    forms.Field("education",
+                "Almost done! What is your highest qualification and where did you get it? "
+                "For example: 'Bachelor of Commerce in Finance, University of Nairobi, 2021-2025'",
+                labels=("education", "qualification", "qualifications")),
+), bulk=True)
 
 def format_cv(cv_data: dict) -> str:
     """Formats the collected data into a clean, ATS-friendly text CV."""
@@ -51,59 +74,28 @@ This CV is optimized for automated systems. You can now copy this text and use i
 """
     return cv.strip()
 
+def cv_document(cv_data: dict) -> documents.Document:
+    """The CV as a document for PDF/DOCX export, with the sections of format_cv."""
+    contact = [cv_data.get(key) for key in ("email", "phone", "links")]
+    return documents.Document(
+        filename=f"CV - {cv_data.get('full_name', 'KaziLeo')}",
+        title=cv_data.get('full_name', 'N/A'),
+        sections=(
+            (None, " | ".join(value for value in contact if value and value != "N/A")),
+            ("Professional Summary", cv_data.get('summary', 'N/A')),
+            ("Work Experience", cv_data.get('experience', 'N/A')),
+            ("Skills", cv_data.get('skills', 'N/A')),
+            ("Education", cv_data.get('education', 'N/A')),
+        ),
+    )
+
 def handle_resume_conversation(session: models.UserSession, message_text: str) -> Tuple[str, bool]:
     """
     Manages the CV building conversation with a review-and-edit loop.
     Returns the reply message and a boolean indicating if the flow is complete.
     """
-    cv_data = session.resume_data
-    state = session.session_data
-    
-    # --- Handle the Review/Edit Step ---
-    if state.get("awaiting_cv_confirmation"):
-        field_to_confirm = state.get("field_to_confirm")
-        if message_text in ["yes", "correct", "y"]:
-            state.pop("awaiting_cv_confirmation", None)
-            state.pop("field_to_confirm", None)
-            # Fall through to ask the next question
-        elif message_text in ["no", "change", "n"]:
-            if field_to_confirm:
-                cv_data.pop(field_to_confirm, None)
-            state.pop("awaiting_cv_confirmation", None)
-            state.pop("field_to_confirm", None)
-            # Fall through to re-ask the same question
-        else:
-            return "Please reply with 'yes' or 'no'.", False
-
-    # --- Handle a new answer from the user ---
-    previous_question_key = state.get("awaiting_cv_answer_for")
-    if previous_question_key and not state.get("awaiting_cv_confirmation"):
-        if message_text.lower() == 'skip' and previous_question_key == 'experience':
-            cv_data[previous_question_key] = "No formal work experience."
-        else:
-            cv_data[previous_question_key] = message_text
-        
-        state["awaiting_cv_confirmation"] = True
-        state["field_to_confirm"] = previous_question_key
-        state.pop("awaiting_cv_answer_for", None)
-        confirmation_text = f"I have this down as:\n\n_{cv_data[previous_question_key]}_\n\nIs that correct? (yes/no)"
-        return confirmation_text, False
-
-    # --- Find and ask the next question ---
-    next_question_key = None
-    for key, _ in CV_QUESTIONS:
-        if key not in cv_data:
-            next_question_key = key
-            break
-            
-    if next_question_key:
-        _, question_text = next((q for q in CV_QUESTIONS if q[0] == next_question_key))
-        state["awaiting_cv_answer_for"] = next_question_key
-        return question_text, False
-    else:
+    reply, is_complete = CV_FORM.handle(session.session_data, session.resume_data, message_text)
+    if is_complete:
         # All questions are answered and confirmed, format and return the CV
-        state.pop("awaiting_cv_answer_for", None)
-        state.pop("awaiting_cv_confirmation", None)
-        state.pop("field_to_confirm", None)
-        final_cv = format_cv(cv_data)
-        return final_cv, True
+        return format_cv(session.resume_data), True
+    return reply, False
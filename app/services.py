@@ -1,330 +1,492 @@
 # app/services.py
-from sqlalchemy.orm import Session
+import re
+from typing import Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, whatsapp_client, job_client, training_client, entrepreneurship_client, mentorship_client, resume_builder, interview_simulator, cover_letter_generator, ai_client, skills_analyzer, feedback_handler, crud
-from . import text_responses
+from . import text_responses, templates, forms, documents, event_log, intent_router, intent_classifier
+from .document_export import EXPORTER
+from .feedback_writer import FEEDBACK_WRITER
 
-async def process_message(db: Session, session: models.UserSession, message_text: str, is_new_user: bool):
+async def process_message(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
     """
     Main business logic handler for processing user messages with persistence.
+
+    The message is routed once by intent_router; commands are handled first,
+    then any pending confirmation in STATE_HANDLERS, then the flow the route
+    names, through the dicts below. Free text sent from the main menu is
+    placed by intent_classifier first (see _classify).
     """
     message_text_original = message_text # Keep original case for saving, but use lower for logic
     message_text = message_text.strip().lower()
     state = session.session_data
 
-    def reset_flags():
-        for key in list(state.keys()):
-            if key.startswith("awaiting_"):
-                state[key] = False
-
-    # --- Universal Commands (Highest Priority) ---
-    sheng_greetings = ["niaje", "sasa", "vipi", "habari", "mambo"]
-    if message_text in ["hi", "hello", "start", "menu"] or any(greeting in message_text for greeting in sheng_greetings):
-        session.current_menu = "main"
-        reset_flags()
-        if any(greeting in message_text for greeting in sheng_greetings):
-            await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_sheng_greeting_response())
-        greeting, introduction = text_responses.get_greeting_parts(session.user_name, is_new_user=is_new_user)
-        await whatsapp_client.send_whatsapp_message(session.phone_number, greeting)
-        if introduction:
-            await whatsapp_client.send_whatsapp_message(session.phone_number, introduction)
-        await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
+    waiting = any(key.startswith("awaiting_") and value for key, value in state.items())
+    route = intent_router.resolve(message_text, session.current_menu, waiting)
+    event_log.note(intent=route.intent)
+    if route.intent in COMMAND_HANDLERS:
+        await COMMAND_HANDLERS[route.intent](db, session, route.text, is_new_user)
         return
 
-    if message_text == "0":
-        session.current_menu = "main"
-        reset_flags()
-        session.session_data = {}
-        reply = "👋🏾 Your session has been reset. Type 'hi' to start again with a fresh menu."
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
-        
-    # --- Feedback Flow ---
-    if message_text in ["feedback", "maoni"] or session.current_menu == "feedback":
-        if message_text in ["feedback", "maoni"] and session.current_menu != "feedback":
-            session.current_menu = "feedback"
-            state.clear()
-            message_text = "" 
-
-        reply, feedback_data, is_complete = feedback_handler.handle_feedback_conversation(session, message_text)
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
+    # --- Specialized Handlers (Second Priority) ---
+    for flag, handler in STATE_HANDLERS.items():
+        if state.get(flag):
+            await handler(db, session, route.text, message_text_original)
+            return
 
-        if is_complete:
-            # THE FIX IS HERE: We now reliably call the save function.
-            crud.save_feedback(db, user_phone_number=session.phone_number, feedback_data=feedback_data or {})
-            session.current_menu = "main"
-            state.clear()
-            await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
-        return
+    if route.intent == "unknown" or route.text != message_text:
+        route, message_text_original = _classify(session, route, message_text_original)
 
-    # # --- Keyword-based Routing (Hybrid NLP Model) ---
-    if session.current_menu == "main":
-        if "kazi" in message_text or "ajira" in message_text or "wera" in message_text or "mboka" in message_text or "works" in message_text: message_text = "1"
-        elif "mafunzo" in message_text or "jifunza" in message_text or "kusoma" in message_text: message_text = "2"
-        elif "ushauri" in message_text: message_text = "3"
-        elif "biashara" in message_text: message_text = "4"
+    # --- Sequential Conversation Flow Handlers ---
+    await FLOW_HANDLERS.get(route.intent, _fallback)(db, session, route.text, message_text_original)
 
-    # --- Specialized Handlers (Second Priority) ---
-    if state.get("awaiting_training_suggestion_confirm"):
-        skill_to_learn = state.get("skill_suggestion")
-        if message_text in ["yes", "y"] and skill_to_learn:
-            session.current_menu = "training"; session.training_interest = skill_to_learn; reset_flags()
-            listings = await training_client.fetch_trainings(skill_to_learn)
-            reply = text_responses.get_empathetic_response("training_found" if listings else "no_training_found", listings=listings or [], interest=skill_to_learn)
-        else:
-            reply = "No problem! You can always come back and search for training later."
-        session.current_menu = "main"; reset_flags()
-        reply += f"\n\n{text_responses.get_main_menu()}"
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
-        
-    if state.get("awaiting_similar_jobs_confirm"):
-        job_role = session.cover_letter_data.get("job_role") if session.cover_letter_data else None
-        if message_text in ["yes", "y"] and job_role:
-            session.job_interest = job_role
-            await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_empathetic_response("searching", interest=job_role))
-            listings = await job_client.fetch_jobs(job_role)
-            reply = text_responses.get_empathetic_response("jobs_found" if listings else "no_jobs_found", listings=listings or [], interest=job_role)
-        else:
-            reply = "No problem! Let me know what you'd like to do next."
-        session.current_menu = "main"; reset_flags()
-        reply += f"\n\n{text_responses.get_main_menu()}"
+def _classify(session: models.UserSession, route: intent_router.Route, message_text_original: str) -> Tuple[intent_router.Route, str]:
+    """
+    Places free text the router could not, or could only place by a keyword,
+    with the local intent classifier. When the message already names what a
+    search flow would ask for ("nataka kazi ya driver"), the flow is entered
+    waiting for it and handed the slot, saving the user a round trip. A
+    keyword match the classifier disagrees with keeps the keyword's route.
+    """
+    prediction = intent_classifier.classify(message_text_original)
+    if prediction.intent not in FLOW_HANDLERS or route.intent not in ("unknown", prediction.intent):
+        return route, message_text_original
+    event_log.note(intent=prediction.intent)
+    if prediction.slot and prediction.intent in SLOT_STATES:
+        _reset_flags(session.session_data)
+        session.session_data[SLOT_STATES[prediction.intent]] = True
+        return intent_router.Route(prediction.intent, prediction.slot.lower()), prediction.slot
+    return intent_router.Route(prediction.intent, intent_router.CHOICES[prediction.intent]), message_text_original
+
+async def _send(session: models.UserSession, reply: str):
+    """
+    Sends a reply, interactively where WhatsApp allows: one that ends with the
+    main menu as a list to pick from, one that ends asking yes or no with Yes
+    and No buttons. A tap comes back as the text the flow already expects
+    ("1", "yes"), so no handler needs to know how its question was asked.
+    Web users get the text as it is.
+    """
+    menu = text_responses.get_main_menu(session.locale)
+    if reply.endswith(menu):
+        preface = reply[:-len(menu)].rstrip()
+        body = f"{preface}\n\n{text_responses.get_message('menu_title', session.locale)}".lstrip()
+        await whatsapp_client.send_whatsapp_list(
+            session.phone_number, body, text_responses.get_message("menu_button", session.locale),
+            text_responses.get_menu_choices(session.locale), fallback=reply,
+        )
+    elif YES_NO_QUESTION.search(reply):
+        await whatsapp_client.send_whatsapp_buttons(session.phone_number, reply, text_responses.get_yes_no_choices(session.locale))
+    else:
         await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
+
+def _retry(reply: str) -> str:
+    """Counts a turn spent asking again because the answer could not be used (see crud.intent_summary)."""
+    event_log.add("retries")
+    return reply
+
+def _reset_flags(state: dict):
+    for key in list(state.keys()):
+        if key.startswith("awaiting_"):
+            del state[key]
+
+# --- Universal Commands (Highest Priority) ---
+async def _greeting(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
+    session.current_menu = "main"
+    _reset_flags(session.session_data)
+    greeting, introduction = text_responses.get_greeting_parts(session.user_name, is_new_user=is_new_user, locale=session.locale)
+    await _send(session, greeting)
+    if introduction:
+        await _send(session, introduction)
+    await _send(session, text_responses.get_main_menu(session.locale))
+
+async def _sheng_greeting(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
+    await _send(session, text_responses.get_sheng_greeting_response(session.locale))
+    await _greeting(db, session, message_text, is_new_user)
+
+async def _reset(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
+    session.current_menu = "main"
+    session.session_data = {}
+    reply = text_responses.get_message("session_reset", session.locale)
+    await _send(session, reply)
+
+async def _locale(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
+    session.locale = templates.LOCALE_NAMES[message_text]
+    reply = f"{text_responses.get_message('locale_set', session.locale)}\n\n{text_responses.get_main_menu(session.locale)}"
+    await _send(session, reply)
+
+async def _export(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
+    """Sends the cover letter the user finished last, or else their CV, as a PDF or Word document."""
+    await crud.load_documents(db, session)
+    if session.session_data.get("last_document") == "cover_letter" and _is_filled(cover_letter_generator.COVER_LETTER_FORM, session.cover_letter_data):
+        document = cover_letter_generator.cover_letter_document(session.cover_letter_data, session.resume_data)
+    elif _is_filled(resume_builder.CV_FORM, session.resume_data):
+        document = resume_builder.cv_document(session.resume_data)
+    else:
+        await _send(session, text_responses.get_message("export_needs_cv", session.locale))
         return
+    await _send_document(session, document, EXPORT_FORMATS[message_text])
 
-    # --- Sequential Conversation Flow Handlers ---
-    if message_text == "1" or session.current_menu == "jobs":
-        session.current_menu = "jobs"
-        if state.get("awaiting_job_role"):
-            if message_text.isdigit():
-                reply = "🔎 Which type of job are you interested in? (e.g., Software Developer, Accountant)"
+def _is_filled(form: forms.Form, data: dict) -> bool:
+    return bool(data) and all(key in data for key in form.keys)
+
+async def _send_document(session: models.UserSession, document: documents.Document, fmt: str):
+    """Renders and sends a document message; rendering runs in the exporter's worker processes."""
+    caption = text_responses.get_message("export_docx_caption", session.locale) if fmt == "pdf" else ""
+    if not await EXPORTER.export(session.phone_number, document, fmt, caption=caption):
+        await _send(session, text_responses.get_message("export_failed", session.locale))
+
+async def _feedback(db: AsyncSession, session: models.UserSession, message_text: str, is_new_user: bool):
+    state = session.session_data
+    if message_text in ["feedback", "maoni"] and session.current_menu != "feedback":
+        session.current_menu = "feedback"
+        state.clear()
+        message_text = "" 
+
+    reply, feedback_data, is_complete = feedback_handler.handle_feedback_conversation(session, message_text)
+    event_log.note(step="complete" if is_complete else feedback_handler.FEEDBACK_FORM.step(state))
+    await _send(session, reply)
+
+    if is_complete:
+        # Buffered and written in batches by the feedback writer.
+        await FEEDBACK_WRITER.submit(session.phone_number, feedback_data or {})
+        session.current_menu = "main"
+        state.clear()
+        await _send(session, text_responses.get_main_menu(session.locale))
+
+# --- Pending Confirmations ---
+async def _training_suggestion_confirm(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    state = session.session_data
+    skill_to_learn = state.get("skill_suggestion")
+    if message_text in ["yes", "y"] and skill_to_learn:
+        session.current_menu = "training"; session.training_interest = skill_to_learn; _reset_flags(state)
+        listings = await training_client.fetch_trainings(skill_to_learn)
+        reply = text_responses.get_empathetic_response("training_found" if listings else "no_training_found", listings=listings or [], interest=skill_to_learn, locale=session.locale)
+    else:
+        reply = "No problem! You can always come back and search for training later."
+    session.current_menu = "main"; _reset_flags(state)
+    reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+    await _send(session, reply)
+
+async def _similar_jobs_confirm(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    state = session.session_data
+    await crud.load_documents(db, session)
+    job_role = session.cover_letter_data.get("job_role") if session.cover_letter_data else None
+    if message_text in ["yes", "y"] and job_role:
+        session.job_interest = job_role
+        await _send(session, text_responses.get_empathetic_response("searching", interest=job_role, locale=session.locale))
+        listings = await job_client.fetch_jobs(job_role)
+        reply = text_responses.get_empathetic_response("jobs_found" if listings else "no_jobs_found", listings=listings or [], interest=job_role, locale=session.locale)
+    else:
+        reply = "No problem! Let me know what you'd like to do next."
+    session.current_menu = "main"; _reset_flags(state)
+    reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+    await _send(session, reply)
+
+# --- Menu Flows ---
+async def _jobs(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """Job search: asks for a role, or offers the saved one again."""
+    state = session.session_data
+    session.current_menu = "jobs"
+    if state.get("awaiting_job_role"):
+        if message_text.isdigit():
+            reply = _retry("🔎 Which type of job are you interested in? (e.g., Software Developer, Accountant)")
+        else:
+            session.job_interest = message_text_original
+            await _send(session, text_responses.get_empathetic_response("searching", interest=session.job_interest, locale=session.locale))
+            listings = await job_client.fetch_jobs(message_text)
+            reply = text_responses.get_empathetic_response("interest_saved_and_jobs_found" if listings else "no_jobs_found", listings=listings or [], interest=session.job_interest, locale=session.locale)
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+    elif state.get("awaiting_job_confirm"):
+        if message_text in ["yes", "y"]:
+            if session.job_interest:
+                await _send(session, text_responses.get_empathetic_response("searching", interest=session.job_interest, locale=session.locale))
+                listings = await job_client.fetch_jobs(session.job_interest)
+                reply = text_responses.get_empathetic_response("jobs_found" if listings else "no_jobs_found", listings=listings or [], interest=session.job_interest, locale=session.locale)
             else:
-                session.job_interest = message_text_original
-                await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_empathetic_response("searching", interest=session.job_interest))
-                listings = await job_client.fetch_jobs(message_text)
-                reply = text_responses.get_empathetic_response("interest_saved_and_jobs_found" if listings else "no_jobs_found", listings=listings or [], interest=session.job_interest)
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-        elif state.get("awaiting_job_confirm"):
-            if message_text in ["yes", "y"]:
-                if session.job_interest:
-                    await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_empathetic_response("searching", interest=session.job_interest))
-                    listings = await job_client.fetch_jobs(session.job_interest)
-                    reply = text_responses.get_empathetic_response("jobs_found" if listings else "no_jobs_found", listings=listings or [], interest=session.job_interest)
-                else:
-                    reply = "Hmm! 🤔 Something seems to have gone wrong. What job are you looking for?"; state["awaiting_job_role"] = True
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-            elif message_text in ["no", "n"]:
-                state.pop("awaiting_job_confirm", None); state["awaiting_job_role"] = True
-                reply = "👍🏾 No problem. What new job role are you looking for?"
-            else: reply = "Please answer with 'yes' or 'no'."
+                reply = "Hmm! 🤔 Something seems to have gone wrong. What job are you looking for?"; state["awaiting_job_role"] = True
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+        elif message_text in ["no", "n"]:
+            state.pop("awaiting_job_confirm", None); state["awaiting_job_role"] = True
+            reply = "👍🏾 No problem. What new job role are you looking for?"
+        else: reply = _retry("Please answer with 'yes' or 'no'.")
+    else:
+        _reset_flags(state)
+        if session.job_interest: state["awaiting_job_confirm"] = True; reply = f"I remember you were interested in *{session.job_interest}* jobs. Shall I search for those again? (yes/no)"
+        else: state["awaiting_job_role"] = True; reply = "🔎 Sounds good! Which type of job are you interested in? (e.g., Software Developer, Accountant)"
+    await _send(session, reply)
+
+async def _training(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """Training search: asks for a skill, or offers the saved one again."""
+    state = session.session_data
+    session.current_menu = "training"
+    if state.get("awaiting_training_role"):
+        if message_text.isdigit():
+            reply = _retry("Please type in a skill (e.g., 'Digital Skills'), not a number.")
         else:
-            reset_flags()
-            if session.job_interest: state["awaiting_job_confirm"] = True; reply = f"I remember you were interested in *{session.job_interest}* jobs. Shall I search for those again? (yes/no)"
-            else: state["awaiting_job_role"] = True; reply = "🔎 Sounds good! Which type of job are you interested in? (e.g., Software Developer, Accountant)"
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
+            session.training_interest = message_text_original
+            listings = await training_client.fetch_trainings(message_text)
+            reply = text_responses.get_empathetic_response("interest_saved_and_training_found" if listings else "no_training_found", listings=listings or [], interest=session.training_interest, locale=session.locale)
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+    elif state.get("awaiting_training_confirm"):
+        if message_text in ["yes", "y"]:
+            if session.training_interest:
+                listings = await training_client.fetch_trainings(session.training_interest)
+                reply = text_responses.get_empathetic_response("training_found" if listings else "no_training_found", listings=listings or [], interest=session.training_interest, locale=session.locale)
+            else: reply = "Ooh! I don't have a saved training interest for you 😕. What skill would you like to learn? 📚"; state["awaiting_training_role"] = True
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+        elif message_text in ["no", "n"]:
+            state.pop("awaiting_training_confirm", None); state["awaiting_training_role"] = True
+            reply = "Sounds good. What new skill are you interested in learning today?"
+        else: reply = _retry("Please answer with 'yes' or 'no'.")
+    else:
+        _reset_flags(state)
+        if session.training_interest: state["awaiting_training_confirm"] = True; reply = f"Last time you were looking into *{session.training_interest}* training. Should we look for more courses on that? (yes/no)"
+        else: state["awaiting_training_role"] = True; reply = "📚 Happy to help! What new skill are you interested in learning? (e.g., AI, Digital Skills)"
+    await _send(session, reply)
 
-    elif message_text == "2" or session.current_menu == "training":
-        session.current_menu = "training"
-        if state.get("awaiting_training_role"):
-            if message_text.isdigit():
-                reply = "Please type in a skill (e.g., 'Digital Skills'), not a number."
-            else:
-                session.training_interest = message_text_original
-                listings = await training_client.fetch_trainings(message_text)
-                reply = text_responses.get_empathetic_response("interest_saved_and_training_found" if listings else "no_training_found", listings=listings or [], interest=session.training_interest)
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-        elif state.get("awaiting_training_confirm"):
-            if message_text in ["yes", "y"]:
-                if session.training_interest:
-                    listings = await training_client.fetch_trainings(session.training_interest)
-                    reply = text_responses.get_empathetic_response("training_found" if listings else "no_training_found", listings=listings or [], interest=session.training_interest)
-                else: reply = "Ooh! I don't have a saved training interest for you 😕. What skill would you like to learn? 📚"; state["awaiting_training_role"] = True
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-            elif message_text in ["no", "n"]:
-                state.pop("awaiting_training_confirm", None); state["awaiting_training_role"] = True
-                reply = "Sounds good. What new skill are you interested in learning today?"
-            else: reply = "Please answer with 'yes' or 'no'."
+async def _mentorship(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """Mentor search: asks for a field, or offers the saved one again."""
+    state = session.session_data
+    session.current_menu = "mentorship"
+    if state.get("awaiting_mentorship_role"):
+        if message_text.isdigit():
+            reply = _retry("Please type a field (e.g., 'Tech'), not a number.")
         else:
-            reset_flags()
-            if session.training_interest: state["awaiting_training_confirm"] = True; reply = f"Last time you were looking into *{session.training_interest}* training. Should we look for more courses on that? (yes/no)"
-            else: state["awaiting_training_role"] = True; reply = "📚 Happy to help! What new skill are you interested in learning? (e.g., AI, Digital Skills)"
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
+            session.mentorship_interest = message_text_original
+            listings = await mentorship_client.fetch_mentors(message_text)
+            reply = text_responses.get_empathetic_response("interest_saved_and_mentors_found" if listings else "no_mentors_found", listings=listings or [], interest=session.mentorship_interest, locale=session.locale)
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+    elif state.get("awaiting_mentorship_confirm"):
+        if message_text in ["yes", "y"]:
+            if session.mentorship_interest:
+                listings = await mentorship_client.fetch_mentors(session.mentorship_interest)
+                reply = text_responses.get_empathetic_response("mentors_found" if listings else "no_mentors_found", listings=listings or [], interest=session.mentorship_interest, locale=session.locale)
+            else: reply = "I don't seem to have a saved mentorship interest for you. What field are you looking for? 🤔"; state["awaiting_mentorship_role"] = True
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+        elif message_text in ["no", "n"]:
+            state.pop("awaiting_mentorship_confirm", None); state["awaiting_mentorship_role"] = True
+            reply = "It's not a problem 😀. What new field are you interested in finding a mentor for?"
+        else: reply = _retry("Please answer with 'yes' or 'no'.")
+    else:
+        _reset_flags(state)
+        if session.mentorship_interest: state["awaiting_mentorship_confirm"] = True; reply = f"I remember you were looking for a mentor in *{session.mentorship_interest}*. Shall we search for experts in that field again? (yes/no)"
+        else: state["awaiting_mentorship_role"] = True; reply = "Connecting with a mentor is a great idea! What field are you looking for guidance in? (e.g., Tech, Business)"
+    await _send(session, reply)
 
-    elif message_text == "3" or session.current_menu == "mentorship":
-        session.current_menu = "mentorship"
-        if state.get("awaiting_mentorship_role"):
-            if message_text.isdigit():
-                reply = "Please type a field (e.g., 'Tech'), not a number."
-            else:
-                session.mentorship_interest = message_text_original
-                listings = await mentorship_client.fetch_mentors(message_text)
-                reply = text_responses.get_empathetic_response("interest_saved_and_mentors_found" if listings else "no_mentors_found", listings=listings or [], interest=session.mentorship_interest)
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-        elif state.get("awaiting_mentorship_confirm"):
-            if message_text in ["yes", "y"]:
-                if session.mentorship_interest:
-                    listings = await mentorship_client.fetch_mentors(session.mentorship_interest)
-                    reply = text_responses.get_empathetic_response("mentors_found" if listings else "no_mentors_found", listings=listings or [], interest=session.mentorship_interest)
-                else: reply = "I don't seem to have a saved mentorship interest for you. What field are you looking for? 🤔"; state["awaiting_mentorship_role"] = True
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-            elif message_text in ["no", "n"]:
-                state.pop("awaiting_mentorship_confirm", None); state["awaiting_mentorship_role"] = True
-                reply = "It's not a problem 😀. What new field are you interested in finding a mentor for?"
-            else: reply = "Please answer with 'yes' or 'no'."
+async def _entrepreneurship(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """Business guides: asks for an area, or offers the saved one again."""
+    state = session.session_data
+    session.current_menu = "entrepreneurship"
+    if state.get("awaiting_entrepreneurship_role"):
+        if message_text.isdigit():
+            reply = _retry("Please type a business area (e.g., 'Agribusiness'), not a number.")
         else:
-            reset_flags()
-            if session.mentorship_interest: state["awaiting_mentorship_confirm"] = True; reply = f"I remember you were looking for a mentor in *{session.mentorship_interest}*. Shall we search for experts in that field again? (yes/no)"
-            else: state["awaiting_mentorship_role"] = True; reply = "Connecting with a mentor is a great idea! What field are you looking for guidance in? (e.g., Tech, Business)"
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
-        
-    elif message_text == "4" or session.current_menu == "entrepreneurship":
-        session.current_menu = "entrepreneurship"
-        if state.get("awaiting_entrepreneurship_role"):
-            if message_text.isdigit():
-                reply = "Please type a business area (e.g., 'Agribusiness'), not a number."
-            else:
-                session.entrepreneurship_interest = message_text_original
-                listings = await entrepreneurship_client.fetch_entrepreneurship_guides(message_text)
-                reply = text_responses.get_empathetic_response("interest_saved_and_guides_found" if listings else "no_guides_found", listings=listings or [], interest=session.entrepreneurship_interest)
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-        elif state.get("awaiting_entrepreneurship_confirm"):
-            if message_text in ["yes", "y"]:
-                if session.entrepreneurship_interest:
-                    listings = await entrepreneurship_client.fetch_entrepreneurship_guides(session.entrepreneurship_interest)
-                    reply = text_responses.get_empathetic_response("guides_found" if listings else "no_guides_found", listings=listings or [], interest=session.entrepreneurship_interest)
-                else: reply = "Hmm! 🤔, I don't seem to have a saved business interest for you. What business idea are you exploring?"; state["awaiting_entrepreneurship_role"] = True
-                session.current_menu = "main"; reset_flags()
-                reply += f"\n\n{text_responses.get_main_menu()}"
-            elif message_text in ["no", "n"]:
-                state.pop("awaiting_entrepreneurship_confirm", None); state["awaiting_entrepreneurship_role"] = True
-                reply = "No worries! What new business idea are you thinking about?"
-            else: reply = "Please answer with 'yes' or 'no'."
+            session.entrepreneurship_interest = message_text_original
+            listings = await entrepreneurship_client.fetch_entrepreneurship_guides(message_text)
+            reply = text_responses.get_empathetic_response("interest_saved_and_guides_found" if listings else "no_guides_found", listings=listings or [], interest=session.entrepreneurship_interest, locale=session.locale)
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+    elif state.get("awaiting_entrepreneurship_confirm"):
+        if message_text in ["yes", "y"]:
+            if session.entrepreneurship_interest:
+                listings = await entrepreneurship_client.fetch_entrepreneurship_guides(session.entrepreneurship_interest)
+                reply = text_responses.get_empathetic_response("guides_found" if listings else "no_guides_found", listings=listings or [], interest=session.entrepreneurship_interest, locale=session.locale)
+            else: reply = "Hmm! 🤔, I don't seem to have a saved business interest for you. What business idea are you exploring?"; state["awaiting_entrepreneurship_role"] = True
+            session.current_menu = "main"; _reset_flags(state)
+            reply += f"\n\n{text_responses.get_main_menu(session.locale)}"
+        elif message_text in ["no", "n"]:
+            state.pop("awaiting_entrepreneurship_confirm", None); state["awaiting_entrepreneurship_role"] = True
+            reply = "No worries! What new business idea are you thinking about?"
+        else: reply = _retry("Please answer with 'yes' or 'no'.")
+    else:
+        _reset_flags(state)
+        if session.entrepreneurship_interest: state["awaiting_entrepreneurship_confirm"] = True; reply = f"Last time we were looking at guides for *{session.entrepreneurship_interest}*. Want to explore that again? (yes/no)"
+        else: state["awaiting_entrepreneurship_role"] = True; reply = "💡 Awesome! Exploring a business idea is a great step. What field are you interested in? (e.g., Agribusiness, E-commerce)"
+    await _send(session, reply)
+
+async def _resume_builder(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """The CV builder conversation."""
+    state = session.session_data
+    await crud.load_documents(db, session)
+    if message_text == "5" and session.current_menu == "main":
+        session.current_menu = "resume_builder"; session.resume_data = {}; _reset_flags(state); message_text_original = ""
+    # Answers keep the user's casing; the form matches yes/no and labels case-insensitively.
+    reply, is_complete = resume_builder.handle_resume_conversation(session, message_text_original)
+    event_log.note(step="complete" if is_complete else resume_builder.CV_FORM.step(state))
+    await _send(session, reply)
+    if is_complete:
+        state["last_document"] = "cv"
+        await _send_document(session, resume_builder.cv_document(session.resume_data), "pdf")
+        session.current_menu = "main"; await _send(session, text_responses.get_main_menu(session.locale))
+
+async def _interview_practice(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """Interview practice: confirms the role, then runs the simulator."""
+    state = session.session_data
+    await crud.load_documents(db, session)
+    if state.get("awaiting_interview_role_confirm"):
+        if message_text in ["yes", "y"] and session.job_interest:
+            message_text = session.job_interest; _reset_flags(state)
+        elif message_text in ["no", "n"]:
+            state.pop("awaiting_interview_role_confirm", None); state["awaiting_interview_role"] = True
+            reply = "Okay, what job role would you like to practice for instead?"
+            await _send(session, reply)
+            return
         else:
-            reset_flags()
-            if session.entrepreneurship_interest: state["awaiting_entrepreneurship_confirm"] = True; reply = f"Last time we were looking at guides for *{session.entrepreneurship_interest}*. Want to explore that again? (yes/no)"
-            else: state["awaiting_entrepreneurship_role"] = True; reply = "💡 Awesome! Exploring a business idea is a great step. What field are you interested in? (e.g., Agribusiness, E-commerce)"
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
+            reply = _retry("Please answer with 'yes' or 'no'."); await _send(session, reply)
+            return
 
-    elif message_text == "5" or session.current_menu == "resume_builder":
-        if message_text == "5" and session.current_menu == "main":
-            session.current_menu = "resume_builder"; session.resume_data = {}; reset_flags(); message_text = "" 
-        reply, is_complete = resume_builder.handle_resume_conversation(session, message_text)
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        if is_complete:
-            session.current_menu = "main"; await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
-        return
+    if (message_text == "6" and session.current_menu == "main") or state.get("awaiting_interview_role"):
+        session.current_menu = "interview_practice"
+        if not state.get("awaiting_interview_role"): # First time entry
+            _reset_flags(state)
+            if session.job_interest: reply = f"Let's practice for an interview! I see your saved interest is *{session.job_interest}*. Would you like to practice for that role? (yes/no)"; state["awaiting_interview_role_confirm"] = True
+            else: reply = "Let's practice for an interview! What job role are you preparing for? (e.g., Accountant, Sales)"; state["awaiting_interview_role"] = True
+            await _send(session, reply)
+            return
 
-    elif message_text == "6" or session.current_menu == "interview_practice":
-        if state.get("awaiting_interview_role_confirm"):
-            if message_text in ["yes", "y"] and session.job_interest:
-                message_text = session.job_interest; reset_flags()
-            elif message_text in ["no", "n"]:
-                state.pop("awaiting_interview_role_confirm", None); state["awaiting_interview_role"] = True
-                reply = "Okay, what job role would you like to practice for instead?"
-                await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-                return
+    reply, is_complete = interview_simulator.handle_interview_conversation(session, message_text)
+    await _send(session, reply)
+    if is_complete:
+        # The summary with quick local scores is already out; the AI grades every answer in one call.
+        if interview_simulator.is_finished(session.interview_data):
+            await _send(session, "🧠 Your AI coach is now reviewing all your answers together...")
+            grades = await interview_simulator.grade_answers(session.interview_data)
+            if grades:
+                await _send(session, interview_simulator.format_ai_feedback(session.interview_data, grades))
             else:
-                reply = "Please answer with 'yes' or 'no'."; await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-                return
-        
-        if (message_text == "6" and session.current_menu == "main") or state.get("awaiting_interview_role"):
-            session.current_menu = "interview_practice"
-            if not state.get("awaiting_interview_role"): # First time entry
-                reset_flags()
-                if session.job_interest: reply = f"Let's practice for an interview! I see your saved interest is *{session.job_interest}*. Would you like to practice for that role? (yes/no)"; state["awaiting_interview_role_confirm"] = True
-                else: reply = "Let's practice for an interview! What job role are you preparing for? (e.g., Accountant, Sales)"; state["awaiting_interview_role"] = True
-                await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-                return
-
-        reply, is_complete = interview_simulator.handle_interview_conversation(session, message_text)
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        if is_complete:
-            session.current_menu = "main"; await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
-        return
+                await _send(session, "Sorry, I couldn't get detailed AI feedback right now. Your quick scores above are a good guide!")
+        # Cleared so the next practice starts fresh.
+        session.interview_data = {}
+        session.current_menu = "main"; await _send(session, text_responses.get_main_menu(session.locale))
 
-    elif message_text == "7" or session.current_menu == "cover_letter":
-        if message_text == "7" and session.current_menu == "main":
-            if not session.resume_data or not session.resume_data.get('full_name'):
-                reply = "It's best to build a CV first so I have your details. Please choose option 5 from the menu to create your CV, then come back here!"
-                await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-                return
-            session.current_menu = "cover_letter"; session.cover_letter_data = {}; reset_flags(); message_text = "" 
-        reply, is_complete = cover_letter_generator.handle_cover_letter_conversation(session, message_text)
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        if is_complete: pass
-        return
-        
-    elif message_text == "8" or session.current_menu == "cv_optimizer":
-        if state.get("awaiting_rewrite_confirm"):
-            if message_text in ["yes", "y"]:
-                await whatsapp_client.send_whatsapp_message(session.phone_number, "Perfect! I'll get to work on rewriting those sections. This is an advanced AI task, so it might take up to a minute...")
-                if session.resume_data:
-                    cv_text = resume_builder.format_cv(session.resume_data)
-                    job_description = state.get("last_jd_for_opt", ""); feedback = state.get("last_cv_feedback", "")
-                    rewritten_sections = await ai_client.rewrite_cv_sections(cv_text, job_description, feedback)
-                    if rewritten_sections: await whatsapp_client.send_whatsapp_message(session.phone_number, rewritten_sections)
-                    else: await whatsapp_client.send_whatsapp_message(session.phone_number, "Sorry, I wasn't able to rewrite the sections at this time.")
-            else: await whatsapp_client.send_whatsapp_message(session.phone_number, "No problem! You can apply the feedback manually. Let me know what you'd like to do next.")
-            session.current_menu = "main"; reset_flags(); await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
-        elif state.get("awaiting_job_description_for_opt"):
-            job_description = message_text
-            await whatsapp_client.send_whatsapp_message(session.phone_number, "Analyzing your CV against the job description... This might take a moment.")
+async def _cover_letter(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """The cover letter conversation; needs a CV first."""
+    state = session.session_data
+    await crud.load_documents(db, session)
+    if message_text == "7" and session.current_menu == "main":
+        if not session.resume_data or not session.resume_data.get('full_name'):
+            reply = "It's best to build a CV first so I have your details. Please choose option 5 from the menu to create your CV, then come back here!"
+            await _send(session, reply)
+            return
+        session.current_menu = "cover_letter"; session.cover_letter_data = {}; _reset_flags(state); message_text_original = ""
+    reply, is_complete = cover_letter_generator.handle_cover_letter_conversation(session, message_text_original)
+    event_log.note(step="complete" if is_complete else cover_letter_generator.COVER_LETTER_FORM.step(state))
+    await _send(session, reply)
+    if is_complete:
+        state["last_document"] = "cover_letter"
+        await _send_document(session, cover_letter_generator.cover_letter_document(session.cover_letter_data, session.resume_data), "pdf")
+
+async def _cv_optimizer(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """AI CV optimisation against a pasted job description, with an optional rewrite."""
+    state = session.session_data
+    await crud.load_documents(db, session)
+    if state.get("awaiting_rewrite_confirm"):
+        if message_text in ["yes", "y"]:
+            await _send(session, "Perfect! I'll get to work on rewriting those sections. This is an advanced AI task, so it might take up to a minute...")
             if session.resume_data:
                 cv_text = resume_builder.format_cv(session.resume_data)
-                feedback = await ai_client.optimize_resume(cv_text, job_description)
-                if feedback:
-                    await whatsapp_client.send_whatsapp_message(session.phone_number, feedback)
-                    state["last_cv_feedback"] = feedback; state["last_jd_for_opt"] = job_description; state["awaiting_rewrite_confirm"] = True
-                    reply = "Would you like me to try and rewrite your CV summary and experience sections based on this feedback for you? (yes/no)"
-                    await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-                else:
-                    await whatsapp_client.send_whatsapp_message(session.phone_number, "Sorry, I couldn't get feedback for you right now. Please try again later.")
-                    session.current_menu = "main"; await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
-            reset_flags()
-        else:
-            session.current_menu = "cv_optimizer"; reset_flags()
-            if not session.resume_data or not session.resume_data.get('full_name'):
-                reply = "To optimize your CV, I need your details first. Please use option 5 to build your CV, and then come right back!"; session.current_menu = "main"
+                job_description = state.get("last_jd_for_opt", ""); feedback = state.get("last_cv_feedback", "")
+                rewritten_sections = await ai_client.rewrite_cv_sections(cv_text, job_description, feedback)
+                if rewritten_sections: await _send(session, rewritten_sections)
+                else: await _send(session, "Sorry, I wasn't able to rewrite the sections at this time.")
+        else: await _send(session, "No problem! You can apply the feedback manually. Let me know what you'd like to do next.")
+        session.current_menu = "main"; _reset_flags(state); await _send(session, text_responses.get_main_menu(session.locale))
+    elif state.get("awaiting_job_description_for_opt"):
+        job_description = message_text
+        await _send(session, "Analyzing your CV against the job description... This might take a moment.")
+        if session.resume_data:
+            cv_text = resume_builder.format_cv(session.resume_data)
+            feedback = await ai_client.optimize_resume(cv_text, job_description)
+            if feedback:
+                await _send(session, feedback)
+                state["last_cv_feedback"] = feedback; state["last_jd_for_opt"] = job_description; state["awaiting_rewrite_confirm"] = True
+                reply = "Would you like me to try and rewrite your CV summary and experience sections based on this feedback for you? (yes/no)"
+                await _send(session, reply)
             else:
-                reply = "Excellent! To get started, please paste the full job description for the role you're applying for."; state["awaiting_job_description_for_opt"] = True
-            await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
-
-    elif message_text == "9" or session.current_menu == "skills_analyzer":
-        if state.get("awaiting_jd_for_analysis"):
-            job_description = message_text
-            await whatsapp_client.send_whatsapp_message(session.phone_number, "Analyzing your skills against the job description... This AI-powered step might take a moment.")
-            if session.resume_data:
-                analysis, missing_skills = await skills_analyzer.analyze_skills_gap(session, job_description)
-                if analysis: await whatsapp_client.send_whatsapp_message(session.phone_number, analysis)
-                if missing_skills:
-                    skill_to_suggest = missing_skills[0]
-                    reply = f"The good news is you can learn these! Would you like me to search for training courses on *{skill_to_suggest}* right now? (yes/no)"
-                    state["awaiting_training_suggestion_confirm"] = True; state["skill_suggestion"] = skill_to_suggest; reset_flags()
-                    await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-                else:
-                    session.current_menu = "main"; reset_flags(); await whatsapp_client.send_whatsapp_message(session.phone_number, text_responses.get_main_menu())
+                await _send(session, "Sorry, I couldn't get feedback for you right now. Please try again later.")
+                session.current_menu = "main"; await _send(session, text_responses.get_main_menu(session.locale))
+        _reset_flags(state)
+    else:
+        session.current_menu = "cv_optimizer"; _reset_flags(state)
+        if not session.resume_data or not session.resume_data.get('full_name'):
+            reply = "To optimize your CV, I need your details first. Please use option 5 to build your CV, and then come right back!"; session.current_menu = "main"
         else:
-            session.current_menu = "skills_analyzer"; reset_flags()
-            if not session.resume_data or not session.resume_data.get('full_name'):
-                reply = "To analyze your skills gap, I need your CV details first. Please use option 5 to build your CV, then come right back!"; session.current_menu = "main"
-            else:
-                reply = "This is a powerful tool! To start, please paste the full job description you are targeting."; state["awaiting_jd_for_analysis"] = True
-            await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
-        return
+            reply = "Excellent! To get started, please paste the full job description for the role you're applying for."; state["awaiting_job_description_for_opt"] = True
+        await _send(session, reply)
 
-    # Fallback if no specific state was handled and not in a flow
+async def _skills_analyzer(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    """AI skills gap analysis against a pasted job description."""
+    state = session.session_data
+    await crud.load_documents(db, session)
+    if state.get("awaiting_jd_for_analysis"):
+        job_description = message_text
+        await _send(session, "Analyzing your skills against the job description... This AI-powered step might take a moment.")
+        if session.resume_data:
+            analysis, missing_skills = await skills_analyzer.analyze_skills_gap(session, job_description)
+            if analysis: await _send(session, analysis)
+            if missing_skills:
+                skill_to_suggest = missing_skills[0]
+                reply = f"The good news is you can learn these! Would you like me to search for training courses on *{skill_to_suggest}* right now? (yes/no)"
+                state["awaiting_training_suggestion_confirm"] = True; state["skill_suggestion"] = skill_to_suggest; _reset_flags(state)
+                await _send(session, reply)
+            else:
+                session.current_menu = "main"; _reset_flags(state); await _send(session, text_responses.get_main_menu(session.locale))
     else:
-        reply = f"❓ Sorry, I didn't quite get that. Here's the main menu again.\n\n{text_responses.get_main_menu()}"
-        await whatsapp_client.send_whatsapp_message(session.phone_number, reply)
+        session.current_menu = "skills_analyzer"; _reset_flags(state)
+        if not session.resume_data or not session.resume_data.get('full_name'):
+            reply = "To analyze your skills gap, I need your CV details first. Please use option 5 to build your CV, then come right back!"; session.current_menu = "main"
+        else:
+            reply = "This is a powerful tool! To start, please paste the full job description you are targeting."; state["awaiting_jd_for_analysis"] = True
+        await _send(session, reply)
+
+# Fallback if no specific state was handled and not in a flow
+async def _fallback(db: AsyncSession, session: models.UserSession, message_text: str, message_text_original: str):
+    reply = f"{text_responses.get_message('fallback', session.locale)}\n\n{text_responses.get_main_menu(session.locale)}"
+    await _send(session, reply)
+
+COMMAND_HANDLERS = {
+    "greeting": _greeting,
+    "sheng_greeting": _sheng_greeting,
+    "reset": _reset,
+    "locale": _locale,
+    "export": _export,
+    "feedback": _feedback,
+}
+
+# A reply ending like this asks for yes or no, and is sent with Yes/No buttons.
+YES_NO_QUESTION = re.compile(r"\(yes/no\)\s*$|'yes' or 'no'\.\s*$")
+
+# What a user types to get a document -> file format.
+EXPORT_FORMATS = {"pdf": "pdf", "docx": "docx", "word": "docx"}
+
+# Checked in order; the first flag set in session_data takes the turn.
+STATE_HANDLERS = {
+    "awaiting_training_suggestion_confirm": _training_suggestion_confirm,
+    "awaiting_similar_jobs_confirm": _similar_jobs_confirm,
+}
+
+# The flag each search flow sets while it waits for a role, skill, field or area.
+SLOT_STATES = {
+    "jobs": "awaiting_job_role",
+    "training": "awaiting_training_role",
+    "mentorship": "awaiting_mentorship_role",
+    "entrepreneurship": "awaiting_entrepreneurship_role",
+}
 
+FLOW_HANDLERS = {
+    "jobs": _jobs,
+    "training": _training,
+    "mentorship": _mentorship,
+    "entrepreneurship": _entrepreneurship,
+    "resume_builder": _resume_builder,
+    "interview_practice": _interview_practice,
+    "cover_letter": _cover_letter,
+    "cv_optimizer": _cv_optimizer,
+    "skills_analyzer": _skills_analyzer,
+}
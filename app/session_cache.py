@@ -0,0 +1,149 @@
+# app/session_cache.py
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, metrics, models, sharding
+from .config import settings
+from .database import AsyncSessionLocal
+from .shared_state import STATE
+
+logger = logging.getLogger(__name__)
+
+# A user's session version outlives any cached copy of the session.
+VERSION_TTL_SECONDS = 86400
+
+def _version_key(phone_number: str) -> str:
+    return f"session_version:{phone_number}"
+
+class SessionCache:
+    """
+    An in-process, write-behind cache of user sessions.
+
+    Cached sessions are detached ORM objects, so a returning user costs no
+    SELECT. After each turn the session is marked dirty; a background flusher
+    then writes only the columns whose content actually changed, coalescing
+    every turn a user took since the last flush into a single UPDATE.
+
+    With a shared STATE (several workers), another worker may have served
+    the user since we cached them. Each turn then writes through and bumps
+    the user's version in STATE; a cached session whose version is behind
+    is reloaded from the database.
+    """
+
+    def __init__(self, flush_interval: float, max_entries: int):
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, models.UserSession]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # phone number -> the STATE version the cached session was loaded at or written as.
+        self._versions: Dict[str, Optional[int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self.stats: Dict[str, int] = {"turns": 0, "hits": 0, "misses": 0, "stale": 0, "flushes": 0, "rows_written": 0, "bytes_written": 0}
+
+    async def get_or_create(self, db: AsyncSession, phone_number: str, user_name: str) -> Tuple[models.UserSession, bool]:
+        """Returns the cached session, loading (or creating) it through crud on a miss."""
+        session = self._entries.get(phone_number)
+        if session is not None and STATE.shared and phone_number not in self._dirty:
+            if await STATE.get(_version_key(phone_number)) != self._versions.get(phone_number):
+                self.stats["stale"] += 1
+                del self._entries[phone_number]
+                session = None
+        if session is not None:
+            self.stats["hits"] += 1
+            self._entries.move_to_end(phone_number)
+            now_utc = datetime.now(timezone.utc)
+            crud.apply_session_timeout(session, now_utc)
+            session.last_active = now_utc
+            return session, False
+
+        self.stats["misses"] += 1
+        if STATE.shared:
+            # Read before loading, so a write in between shows up as stale next turn.
+            self._versions[phone_number] = await STATE.get(_version_key(phone_number))
+        session, is_new = await crud.get_or_create_session(db, phone_number=phone_number, user_name=user_name)
+        db.expunge(session)
+        self._entries[phone_number] = session
+        return session, is_new
+
+    async def mark_dirty(self, session: models.UserSession):
+        """Queues the session for the next flush, or writes it now if write-behind is disabled or STATE is shared."""
+        self.stats["turns"] += 1
+        self._dirty.add(session.phone_number)
+        if STATE.shared:
+            await self.flush()
+            self._versions[session.phone_number] = await STATE.incr(_version_key(session.phone_number), ttl=VERSION_TTL_SECONDS)
+        elif self.flush_interval <= 0:
+            await self.flush()
+
+    async def flush(self):
+        """Writes the changed columns of every dirty session in one transaction."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            # Turns keep running while we await the database; they dirty a fresh set.
+            dirty, self._dirty = self._dirty, set()
+            pending = []
+            try:
+                async with AsyncSessionLocal() as db:
+                    for phone_number in dirty:
+                        session = self._entries.get(phone_number)
+                        if session is None:
+                            continue
+                        with sharding.route(phone_number):
+                            changed = crud.changed_columns(session)
+                            if changed:
+                                values = {column: getattr(session, column) for column in changed}
+                                await db.execute(update(models.UserSession).where(models.UserSession.id == session.id).values(**values))
+                                pending.append((session, changed))
+
+                            documents = crud.loaded_documents(session)
+                            changed_documents = crud.changed_columns(documents) if documents is not None else {}
+                            if changed_documents:
+                                values = {column: getattr(documents, column) for column in changed_documents}
+                                if crud.is_persisted(documents):
+                                    await db.execute(
+                                        update(models.UserDocuments)
+                                        .where(models.UserDocuments.user_session_id == documents.user_session_id)
+                                        .values(**values)
+                                    )
+                                else:
+                                    await db.execute(insert(models.UserDocuments).values(user_session_id=documents.user_session_id, **values))
+                                pending.append((documents, changed_documents))
+                    await db.commit()
+            except Exception as e:
+                self._dirty |= dirty
+                logger.error(f"Failed to flush {len(dirty)} cached sessions: {e}", exc_info=True)
+                return
+
+            for row, changed in pending:
+                crud.mark_persisted(row, changed)
+                self.stats["rows_written"] += 1
+                self.stats["bytes_written"] += crud.row_bytes(changed)
+            self.stats["flushes"] += 1
+            self._evict()
+
+    def _evict(self):
+        """Drops the least recently used clean sessions once the cache is over capacity."""
+        for phone_number in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            if phone_number not in self._dirty:
+                del self._entries[phone_number]
+                self._versions.pop(phone_number, None)
+
+    async def run_flusher(self):
+        """Flushes dirty sessions every flush_interval seconds until cancelled."""
+        if self.flush_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            with metrics.span("session_flush"):
+                await self.flush()
+
+SESSION_CACHE = SessionCache(settings.SESSION_FLUSH_INTERVAL_SECONDS, settings.SESSION_CACHE_MAX_ENTRIES)
@@ -0,0 +1,180 @@
+# app/session_state.py
+"""
+Compact storage encoding for UserSession.session_data.
+
+Handlers keep working with a plain dict of "awaiting_*" flags and values. Only
+the stored form changes:
+
+- the "awaiting_*" flags that are set collapse into a single state code, "s",
+  and flags that are False are dropped instead of accumulating row after row;
+- known payload keys are stored under short aliases, in "p";
+- large transient values (AI feedback, pasted job descriptions) are held
+  out of the row in a TTL store, with only a content hash kept, in "x".
+  The store is in this process, so with a shared SHARED_STATE_BACKEND,
+  where the user's next turn may be served by another worker, they are
+  kept in the row with the rest of the payload instead.
+
+{} is stored as {} so the sweeper and the upsert can still test for empty state.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.types import JSON, TypeDecorator
+
+from .config import settings
+
+ENCODING_VERSION = 1
+
+# Flow states by code. Append only: the codes are stored in existing rows.
+FLOW_STATES = (
+    "awaiting_job_role",
+    "awaiting_job_confirm",
+    "awaiting_similar_jobs_confirm",
+    "awaiting_training_role",
+    "awaiting_training_confirm",
+    "awaiting_training_suggestion_confirm",
+    "awaiting_mentorship_role",
+    "awaiting_mentorship_confirm",
+    "awaiting_entrepreneurship_role",
+    "awaiting_entrepreneurship_confirm",
+    "awaiting_interview_role",
+    "awaiting_interview_role_confirm",
+    "awaiting_interview_answer",
+    "awaiting_cv_confirmation",
+    "awaiting_cl_confirmation",
+    "awaiting_rewrite_confirm",
+    "awaiting_job_description_for_opt",
+    "awaiting_jd_for_analysis",
+    "awaiting_cv_review",
+    "awaiting_cl_review",
+)
+_STATE_CODES = {name: code for code, name in enumerate(FLOW_STATES)}
+
+# Small typed payload values, stored under short aliases.
+PAYLOAD_KEYS = {
+    "awaiting_cv_answer_for": "cq",
+    "awaiting_cl_answer_for": "lq",
+    "awaiting_feedback_answer_for": "bq",
+    "field_to_confirm": "f",
+    "skill_suggestion": "sk",
+    "feedback_step": "fs",
+    "feedback_data": "fd",
+    "last_cv_feedback": "cf",
+    "last_jd_for_opt": "jd",
+    "last_document": "ld",
+}
+_PAYLOAD_NAMES = {alias: name for name, alias in PAYLOAD_KEYS.items()}
+
+# Values only needed for the next turn or two; kept out of the row when only this process serves the user.
+TRANSIENT_KEYS = ("last_cv_feedback", "last_jd_for_opt")
+# Only the memory backend's state is not seen by other workers (see app/shared_state.py,
+# which cannot be imported here: it imports the models that use this module).
+HOLD_OUT_TRANSIENT = settings.SHARED_STATE_BACKEND == "memory"
+
+class TransientStore:
+    """
+    An in-process, content-addressed store for large transient session values.
+    Entries expire after ttl seconds; a value that has expired (or was stored by
+    another worker) simply reads back as missing, as if the flow had been reset.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> str:
+        key = hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            if len(self._entries) % 256 == 0:
+                self._purge(now)
+        return key
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _purge(self, now: float):
+        for key in [key for key, (expires, _) in self._entries.items() if expires < now]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+TRANSIENT_STORE = TransientStore(settings.SESSION_TRANSIENT_TTL_SECONDS)
+
+def _is_transient(name: str, value: Any) -> bool:
+    return name in TRANSIENT_KEYS or (isinstance(value, str) and len(value) > settings.SESSION_INLINE_MAX_CHARS)
+
+def encode_state(state: Optional[Dict[str, Any]], store: Optional[TransientStore] = TRANSIENT_STORE) -> Dict[str, Any]:
+    """
+    Converts a handler-facing state dict into its stored form. With store=None
+    transient values are dropped rather than held out of the row; with
+    HOLD_OUT_TRANSIENT off they stay in the row.
+    """
+    if not state or state.get("v") == ENCODING_VERSION:
+        return state or {}
+    flags, payload, transient = [], {}, {}
+    for name, value in state.items():
+        if value is None or value is False:
+            continue
+        if value is True and name in _STATE_CODES:
+            flags.append(_STATE_CODES[name])
+        elif HOLD_OUT_TRANSIENT and _is_transient(name, value):
+            if store is not None:
+                transient[PAYLOAD_KEYS.get(name, name)] = store.put(value)
+        else:
+            payload[PAYLOAD_KEYS.get(name, name)] = value
+    if not flags and not payload and not transient:
+        return {}
+    encoded: Dict[str, Any] = {"v": ENCODING_VERSION}
+    if flags:
+        # One flow step at a time is the norm; the odd combined step keeps a list.
+        encoded["s"] = flags[0] if len(flags) == 1 else sorted(flags)
+    if payload:
+        encoded["p"] = payload
+    if transient:
+        encoded["x"] = transient
+    return encoded
+
+def decode_state(stored: Optional[Dict[str, Any]], store: Optional[TransientStore] = TRANSIENT_STORE) -> Dict[str, Any]:
+    """Expands a stored state back into the dict handlers use. Rows not yet migrated pass through."""
+    if not stored or stored.get("v") != ENCODING_VERSION:
+        return dict(stored or {})
+    state: Dict[str, Any] = {}
+    codes = stored.get("s")
+    for code in codes if isinstance(codes, list) else ([] if codes is None else [codes]):
+        if 0 <= code < len(FLOW_STATES):
+            state[FLOW_STATES[code]] = True
+    for alias, value in stored.get("p", {}).items():
+        state[_PAYLOAD_NAMES.get(alias, alias)] = value
+    for alias, key in stored.get("x", {}).items():
+        value = store.get(key) if store is not None else None
+        if value is not None:
+            state[_PAYLOAD_NAMES.get(alias, alias)] = value
+    return state
+
+def stored_bytes(state: Optional[Dict[str, Any]], encoded: bool = True) -> int:
+    """How many bytes session_data takes in the row, encoded or as a plain JSON dict."""
+    value = encode_state(state) if encoded else (state or {})
+    return len(json.dumps(value).encode("utf-8"))
+
+class SessionStateType(TypeDecorator):
+    """A JSON column that stores session_data in the compact encoding above."""
+
+    impl = JSON
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_state(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_state(value)
@@ -0,0 +1,134 @@
+# app/session_sweeper.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import Text, cast, or_, select, update
+from sqlalchemy.sql import Select, Update
+
+from . import models, sharding
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+UserSession = models.UserSession
+UserDocuments = models.UserDocuments
+
+def _expire_candidates() -> Select:
+    """Idle sessions still holding a menu or flow state."""
+    return select(UserSession.id).where(
+        or_(UserSession.current_menu != "main", cast(UserSession.session_data, Text) != "{}")
+    )
+
+def _expire_update(ids, cutoff: datetime) -> Update:
+    # Re-checked so a user who wrote in since the SELECT keeps their state.
+    return (
+        update(UserSession)
+        .where(UserSession.id.in_(ids), UserSession.last_active < cutoff)
+        # last_active is kept as is; its onupdate would otherwise make the row look active.
+        .values(current_menu="main", session_data={}, last_active=UserSession.last_active)
+        .execution_options(synchronize_session=False)
+    )
+
+def _compact_candidates() -> Select:
+    """Long-idle sessions with an unfinished interview practice still stored."""
+    return (
+        select(UserSession.id)
+        .join(UserDocuments, UserDocuments.user_session_id == UserSession.id)
+        .where(cast(UserDocuments.interview_data, Text) != "{}")
+    )
+
+def _compact_update(ids, cutoff: datetime) -> Update:
+    still_idle = select(UserSession.id).where(UserSession.id.in_(ids), UserSession.last_active < cutoff)
+    return (
+        update(UserDocuments)
+        .where(UserDocuments.user_session_id.in_(still_idle))
+        .values(interview_data={})
+        .execution_options(synchronize_session=False)
+    )
+
+class SessionSweeper:
+    """
+    Periodically resets expired sessions in bulk so abandoned flows do not
+    keep their session_data forever.
+
+    Each pass walks the last_active index in batches, one short UPDATE and
+    commit per batch; rows drop out of the candidate query once reset. The
+    cutoff of the last completed pass is kept as a watermark, so the next pass
+    only looks at sessions that went idle since then. Optionally, sessions
+    idle for SESSION_COMPACT_AFTER_DAYS also have their interview state cleared.
+    """
+
+    def __init__(self, interval: float, batch_size: int, compact_after_days: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.compact_after_days = compact_after_days
+        self._watermarks: Dict[Tuple[str, Optional[str]], datetime] = {}
+        self.stats: Dict[str, float] = {"sweeps": 0, "batches": 0, "rows_expired": 0, "rows_compacted": 0, "last_sweep_ms": 0.0}
+
+    async def sweep(self, now_utc: datetime = None) -> Dict[str, int]:
+        """Runs one incremental pass over every shard; returns the rows reset and compacted."""
+        now_utc = now_utc or datetime.now(timezone.utc)
+        expire_cutoff = now_utc - timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
+        compact_cutoff = now_utc - timedelta(days=self.compact_after_days)
+        start = time.perf_counter()
+        swept = {"rows_expired": 0, "rows_compacted": 0}
+        for shard_id in sharding.shard_ids() if sharding.is_sharded() else [None]:
+            swept["rows_expired"] += await self._pass("expire", shard_id, expire_cutoff, _expire_candidates, _expire_update)
+            if self.compact_after_days > 0:
+                swept["rows_compacted"] += await self._pass("compact", shard_id, compact_cutoff, _compact_candidates, _compact_update)
+
+        self.stats["sweeps"] += 1
+        self.stats["rows_expired"] += swept["rows_expired"]
+        self.stats["rows_compacted"] += swept["rows_compacted"]
+        self.stats["last_sweep_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        if swept["rows_expired"] or swept["rows_compacted"]:
+            logger.info(f"Session sweep reset {swept['rows_expired']} and compacted {swept['rows_compacted']} sessions in {self.stats['last_sweep_ms']} ms")
+        return swept
+
+    async def _pass(self, kind: str, shard_id: Optional[str], cutoff: datetime,
+                    candidates: Callable[[], Select], apply: Callable[..., Update]) -> int:
+        """Batches through sessions idle before cutoff (and not before the last pass's cutoff)."""
+        # Lower bound on last_active: the previous pass's cutoff, then the last row of each batch.
+        # It is widened by a second because server-default timestamps are stored at second precision.
+        lower = self._watermarks.get((kind, shard_id))
+        bind_arguments = {"shard_id": shard_id} if shard_id else None
+        rows = 0
+        while True:
+            stmt = candidates().add_columns(UserSession.last_active).where(UserSession.last_active < cutoff)
+            if lower is not None:
+                stmt = stmt.where(UserSession.last_active >= lower - timedelta(seconds=1))
+            stmt = stmt.order_by(UserSession.last_active).limit(self.batch_size)
+            async with AsyncSessionLocal() as db:
+                batch = (await db.execute(stmt, bind_arguments=bind_arguments)).all()
+                if not batch:
+                    break
+                ids = [row.id for row in batch]
+                result = await db.execute(apply(ids, cutoff), bind_arguments=bind_arguments)
+                await db.commit()
+            self.stats["batches"] += 1
+            # Candidates that turned active in the meantime are left alone and now fall outside
+            # the cutoff; the pass still goes on past them, or the idle rows after them would
+            # end up below the watermark without ever being swept.
+            rows += result.rowcount
+            lower = batch[-1].last_active
+            # Let webhook turns in between batches.
+            await asyncio.sleep(0)
+        self._watermarks[(kind, shard_id)] = cutoff
+        return rows
+
+    async def run_sweeper(self):
+        """Sweeps every interval seconds until cancelled."""
+        if self.interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}", exc_info=True)
+
+SESSION_SWEEPER = SessionSweeper(settings.SESSION_SWEEP_INTERVAL_SECONDS, settings.SESSION_SWEEP_BATCH_SIZE, settings.SESSION_COMPACT_AFTER_DAYS)
@@ -0,0 +1,71 @@
+# app/sharding.py
+"""
+Optional sharded SQLite layout: with SQLITE_SHARD_COUNT > 1, every user's rows
+live in one of N database files chosen by a stable hash of their phone number,
+so commits for different users no longer queue behind one writer lock.
+
+crud wraps its work in route(phone_number); the chooser functions below then
+send every statement and flush of that block to the user's shard. Statements
+run outside a route (admin queries) fan out to all shards.
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+from .config import settings
+
+_current_shard: ContextVar[Optional[str]] = ContextVar("current_shard", default=None)
+
+def shard_count() -> int:
+    return max(settings.SQLITE_SHARD_COUNT, 1)
+
+def is_sharded() -> bool:
+    return shard_count() > 1
+
+def shard_ids(count: int = None) -> List[str]:
+    return [f"shard{index}" for index in range(count or shard_count())]
+
+def shard_for(phone_number: str, count: int = None) -> str:
+    """The shard a phone number lives on; stable across processes and restarts."""
+    digest = hashlib.sha1(phone_number.encode("utf-8")).digest()
+    return f"shard{int.from_bytes(digest[:8], 'big') % (count or shard_count())}"
+
+def shard_url(url: str, shard_id: str) -> str:
+    """sqlite:///./kazileo.db -> sqlite:///./kazileo.shard0.db"""
+    if not url.startswith("sqlite"):
+        raise ValueError(f"Sharded mode only supports SQLite, not {url}")
+    base, ext = os.path.splitext(url)
+    return f"{base}.{shard_id}{ext or '.db'}"
+
+@contextmanager
+def route(phone_number: str):
+    """Sends every statement in the block to the shard that owns phone_number."""
+    token = _current_shard.set(shard_for(phone_number) if is_sharded() else None)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+def current_shard() -> Optional[str]:
+    return _current_shard.get()
+
+# --- ShardedSession hooks ---
+
+def shard_chooser(mapper, instance: Any, clause=None) -> str:
+    """Picks the shard for an object being flushed, from its own phone number where it has one."""
+    phone_number = getattr(instance, "phone_number", None) or getattr(instance, "user_phone_number", None)
+    if phone_number:
+        return shard_for(phone_number)
+    if _current_shard.get() is not None:
+        return _current_shard.get()
+    raise RuntimeError(f"Cannot choose a shard for {mapper} outside sharding.route()")
+
+def identity_chooser(mapper, primary_key, **kw) -> List[str]:
+    """Primary keys are only unique within a shard, so look in the routed one if there is one."""
+    return [_current_shard.get()] if _current_shard.get() is not None else shard_ids()
+
+def execute_chooser(orm_context) -> List[str]:
+    """Routed statements hit one shard; anything else is merged across all of them."""
+    return [_current_shard.get()] if _current_shard.get() is not None else shard_ids()
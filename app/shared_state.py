@@ -0,0 +1,279 @@
+# app/shared_state.py
+"""
+State that every worker serving the bot must agree on.
+
+A dict at module level is only seen by the process that wrote it, so with
+several uvicorn workers, or several containers, a reply stored by one worker
+is missing from another and two workers can run the same user's turns at
+once. STATE is a small key/value interface (values are JSON-serialisable)
+with a time to live per key, counters, lists and per-key locks, under
+SHARED_STATE_BACKEND:
+
+- "memory": a dict and asyncio locks in this process. Right for a single
+  worker, and what the benchmarks use.
+- "database": the shared_state table, reached through the app's existing
+  SQLAlchemy engine (the first shard in sharded mode), so no extra service
+  is needed. Lists and counters are read-modify-write updates that check
+  the row's version and retry; a lock is a row holding a random token,
+  whose lease its holder renews while it holds it, taken over only once
+  that lease has run out (its holder died).
+
+Expired keys read as missing and are deleted every PURGE_EVERY writes.
+"""
+import asyncio
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import models
+from .config import settings
+from .database import async_schema_engines
+
+logger = logging.getLogger(__name__)
+
+PURGE_EVERY = 1000
+
+class SharedState:
+    """The interface both backends implement. shared says whether other processes see the same state."""
+
+    shared = False
+
+    async def get(self, key: str) -> Any:
+        """The key's value, or None if it is missing or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Stores value under key, expiring after ttl seconds (None keeps it)."""
+        raise NotImplementedError
+
+    async def pop(self, key: str) -> Any:
+        """Deletes the key and returns what it held, or None."""
+        raise NotImplementedError
+
+    async def append(self, key: str, item: Any, ttl: Optional[float] = None) -> int:
+        """Appends item to the list under key, creating it; the list's new length."""
+        raise NotImplementedError
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Adds amount to the counter under key, starting from 0; the new count."""
+        raise NotImplementedError
+
+    def lock(self, key: str, timeout: Optional[float] = None):
+        """
+        An async context manager holding key's lock, which no other holder in
+        any worker has meanwhile. Raises TimeoutError after timeout seconds
+        (SHARED_STATE_LOCK_TIMEOUT_SECONDS by default).
+        """
+        raise NotImplementedError
+
+class MemoryState(SharedState):
+    """SharedState in this process only."""
+
+    def __init__(self):
+        # key -> (monotonic expiry or None, value)
+        self._entries: Dict[str, Tuple[Optional[float], Any]] = {}
+        # key -> (lock, holders and waiters), dropped when nobody uses it.
+        self._locks: Dict[str, List[Any]] = {}
+        self._writes = 0
+
+    def _live(self, key: str) -> Optional[Tuple[Optional[float], Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _write(self, key: str, value: Any, ttl: Optional[float]):
+        self._entries[key] = (time.monotonic() + ttl if ttl else None, value)
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            now = time.monotonic()
+            for stale in [key for key, (expires, _) in self._entries.items() if expires is not None and expires < now]:
+                del self._entries[stale]
+
+    async def get(self, key: str) -> Any:
+        entry = self._live(key)
+        return entry[1] if entry is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._write(key, value, ttl)
+
+    async def pop(self, key: str) -> Any:
+        entry = self._live(key)
+        self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    async def append(self, key: str, item: Any, ttl: Optional[float] = None) -> int:
+        entry = self._live(key)
+        items = entry[1] if entry is not None else []
+        items.append(item)
+        self._write(key, items, ttl)
+        return len(items)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        entry = self._live(key)
+        count = (entry[1] if entry is not None else 0) + amount
+        self._write(key, count, ttl)
+        return count
+
+    @asynccontextmanager
+    async def lock(self, key: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].acquire(), timeout or settings.SHARED_STATE_LOCK_TIMEOUT_SECONDS)
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+class DatabaseState(SharedState):
+    """SharedState in the shared_state table, for every worker on the same database."""
+
+    shared = True
+
+    def __init__(self, engine: AsyncEngine, lease: float):
+        self.engine = engine
+        # How long a lock stays taken if its holder dies without releasing it;
+        # a live holder renews it every third of that.
+        self.lease = lease
+        self._writes = 0
+
+    def _insert(self):
+        """The dialect's INSERT, which supports ON CONFLICT."""
+        return (postgresql.insert if self.engine.dialect.name == "postgresql" else sqlite.insert)(models.SharedStateEntry)
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    @staticmethod
+    def _expired(expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at < time.time()
+
+    async def _wrote(self):
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            async with self.engine.begin() as connection:
+                await connection.execute(delete(models.SharedStateEntry).where(models.SharedStateEntry.expires_at < time.time()))
+
+    async def get(self, key: str) -> Any:
+        Entry = models.SharedStateEntry
+        async with self.engine.connect() as connection:
+            row = (await connection.execute(select(Entry.value, Entry.expires_at).where(Entry.key == key))).first()
+        return row.value if row is not None and not self._expired(row.expires_at) else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        Entry = models.SharedStateEntry
+        stmt = self._insert().values(key=key, value=value, version=0, expires_at=self._expiry(ttl))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Entry.key],
+            set_={"value": stmt.excluded.value, "version": Entry.version + 1, "expires_at": stmt.excluded.expires_at},
+        )
+        async with self.engine.begin() as connection:
+            await connection.execute(stmt)
+        await self._wrote()
+
+    async def pop(self, key: str) -> Any:
+        Entry = models.SharedStateEntry
+        async with self.engine.begin() as connection:
+            row = (await connection.execute(delete(Entry).where(Entry.key == key).returning(Entry.value, Entry.expires_at))).first()
+        return row.value if row is not None and not self._expired(row.expires_at) else None
+
+    async def _update(self, key: str, change: Callable[[Any], Any], ttl: Optional[float]) -> Any:
+        """Replaces the value with change(value), None if missing, retrying until no other write came between."""
+        Entry = models.SharedStateEntry
+        while True:
+            async with self.engine.begin() as connection:
+                row = (await connection.execute(select(Entry.value, Entry.version, Entry.expires_at).where(Entry.key == key))).first()
+                value = change(None if row is None or self._expired(row.expires_at) else row.value)
+                if row is None:
+                    stmt = self._insert().values(key=key, value=value, version=0, expires_at=self._expiry(ttl))
+                    result = await connection.execute(stmt.on_conflict_do_nothing(index_elements=[Entry.key]))
+                else:
+                    result = await connection.execute(
+                        update(Entry)
+                        .where(Entry.key == key, Entry.version == row.version)
+                        .values(value=value, version=row.version + 1, expires_at=self._expiry(ttl))
+                    )
+            if result.rowcount == 1:
+                await self._wrote()
+                return value
+
+    async def append(self, key: str, item: Any, ttl: Optional[float] = None) -> int:
+        return len(await self._update(key, lambda items: (items or []) + [item], ttl))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await self._update(key, lambda count: (count or 0) + amount, ttl)
+
+    async def _acquire(self, key: str, token: int) -> bool:
+        """Takes the lock row if it is free or its lease has run out."""
+        Entry = models.SharedStateEntry
+        now = time.time()
+        async with self.engine.begin() as connection:
+            stmt = self._insert().values(key=key, value=None, version=token, expires_at=now + self.lease)
+            result = await connection.execute(stmt.on_conflict_do_nothing(index_elements=[Entry.key]))
+            if result.rowcount != 1:
+                result = await connection.execute(
+                    update(Entry).where(Entry.key == key, Entry.expires_at < now).values(version=token, expires_at=now + self.lease)
+                )
+        return result.rowcount == 1
+
+    async def _renew(self, key: str, token: int):
+        """Extends the lease of a lock this holder has, until cancelled or the lock is lost."""
+        Entry = models.SharedStateEntry
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                async with self.engine.begin() as connection:
+                    result = await connection.execute(
+                        update(Entry).where(Entry.key == key, Entry.version == token).values(expires_at=time.time() + self.lease)
+                    )
+            except Exception as e:
+                # The lease has two more thirds to run; the next attempt may get through.
+                logger.warning(f"Could not renew shared lock {key}: {e}")
+                continue
+            if result.rowcount != 1:
+                logger.warning(f"Shared lock {key} was taken over while held")
+                return
+
+    @asynccontextmanager
+    async def lock(self, key: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        Entry = models.SharedStateEntry
+        key = f"lock:{key}"
+        # The holder's token is kept in version, which can be compared on any database.
+        token = secrets.randbits(31)
+        deadline = time.monotonic() + (timeout or settings.SHARED_STATE_LOCK_TIMEOUT_SECONDS)
+        delay = 0.002
+        while not await self._acquire(key, token):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for shared lock {key}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        renewer = asyncio.create_task(self._renew(key, token))
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            async with self.engine.begin() as connection:
+                await connection.execute(delete(Entry).where(Entry.key == key, Entry.version == token))
+
+def build_state(backend: str) -> SharedState:
+    """The SharedState for SHARED_STATE_BACKEND."""
+    if backend == "memory":
+        return MemoryState()
+    if backend == "database":
+        return DatabaseState(async_schema_engines()[0], lease=settings.SHARED_STATE_LOCK_LEASE_SECONDS)
+    raise ValueError(f"Unknown SHARED_STATE_BACKEND {backend!r}; expected memory or database")
+
+STATE = build_state(settings.SHARED_STATE_BACKEND)
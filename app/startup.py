@@ -0,0 +1,132 @@
+# app/startup.py
+"""
+Startup warm-up and the readiness report behind /healthz and /readyz.
+
+The app serves as soon as its lifespan has started the background writers.
+What used to be built at import, or by the first turn that needed it, is
+warmed up afterwards by STARTUP.warm_up(), one step at a time:
+
+- database: a connection to each engine (every shard), checked for the
+  app's tables. The schema is left to migrations (alembic upgrade head), so
+  a database without them is reported, not created.
+- http_client: the shared outbound client (see app/http_pool.py).
+- intent_classifier, question_bank: trained and indexed off the event loop.
+- job_feeds: the partner feeds in JOB_FEED_PATHS ingested into the index.
+- export_workers: the document export processes spawned.
+
+Then what was built is frozen out of the garbage collector's generations.
+
+A step that fails is logged and retried every STARTUP_RETRY_SECONDS, so a
+worker started before its database is up becomes ready once it is. Turns
+served before warm-up ends build what they need on first use.
+
+/healthz answers as long as the event loop does. /readyz answers 503 until
+every step has succeeded, and while the database does not answer a ping
+within READYZ_DB_TIMEOUT_SECONDS, with each step's status and duration.
+Each worker process warms up and reports on its own.
+"""
+import asyncio
+import gc
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Sequence, Tuple
+
+from sqlalchemy import inspect, text
+
+from . import http_pool, intent_classifier, job_feed, models, question_bank
+from .config import settings
+from .database import async_schema_engines
+from .document_export import EXPORTER
+
+logger = logging.getLogger(__name__)
+
+async def check_database():
+    """Connects to every engine, warming its pool, and fails if a table is missing."""
+    missing = set()
+    for engine in async_schema_engines():
+        async with engine.connect() as connection:
+            tables = await connection.run_sync(lambda sync_connection: set(inspect(sync_connection).get_table_names()))
+        missing.update(name for name in models.Base.metadata.tables if name not in tables)
+    if missing:
+        raise RuntimeError(f"missing tables {', '.join(sorted(missing))}; run alembic upgrade head")
+
+async def ping_database() -> Dict[str, Any]:
+    """The database's status for /readyz: ok with the round trip, or failed with why."""
+    async def select_one():
+        for engine in async_schema_engines():
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(select_one(), settings.READYZ_DB_TIMEOUT_SECONDS)
+    except Exception as e:
+        return {"status": "failed", "error": str(e) or type(e).__name__}
+    return {"status": "ok", "seconds": round(time.perf_counter() - start, 4)}
+
+def in_thread(function: Callable[[], Any]) -> Callable[[], Awaitable[Any]]:
+    """A step running function on the default executor, off the event loop."""
+    async def step():
+        await asyncio.get_running_loop().run_in_executor(None, function)
+    return step
+
+STEPS: Tuple[Tuple[str, Callable[[], Awaitable[Any]]], ...] = (
+    ("database", check_database),
+    ("http_client", in_thread(http_pool.client)),
+    ("intent_classifier", in_thread(intent_classifier.model)),
+    ("question_bank", in_thread(question_bank.bank)),
+    ("job_feeds", in_thread(job_feed.ingest_configured_feeds)),
+    ("export_workers", EXPORTER.warm_up),
+)
+
+class Startup:
+    """Runs the warm-up steps and keeps each one's status for /readyz."""
+
+    def __init__(self, steps: Sequence[Tuple[str, Callable[[], Awaitable[Any]]]]):
+        self.steps = steps
+        self.status: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name, _ in steps}
+        self.ready = False
+        self.started = time.perf_counter()
+        self.warm_up_seconds = None
+
+    async def _run(self, name: str, step: Callable[[], Awaitable[Any]]) -> bool:
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            self.status[name] = {"status": "failed", "error": str(e) or type(e).__name__, "seconds": round(time.perf_counter() - start, 4)}
+            logger.error(f"Warm-up step {name} failed: {e}", exc_info=True)
+            return False
+        self.status[name] = {"status": "ok", "seconds": round(time.perf_counter() - start, 4)}
+        return True
+
+    async def warm_up(self):
+        """Runs every step, retrying the failed ones until all have succeeded."""
+        self.started = time.perf_counter()
+        pending = list(self.steps)
+        while True:
+            pending = [(name, step) for name, step in pending if not await self._run(name, step)]
+            if not pending:
+                break
+            await asyncio.sleep(settings.STARTUP_RETRY_SECONDS)
+        # Everything imported and built so far lives as long as the process; frozen,
+        # it is left out of collections, the first of which would otherwise
+        # walk all of it in the middle of a turn.
+        gc.collect()
+        gc.freeze()
+        self.warm_up_seconds = round(time.perf_counter() - self.started, 4)
+        self.ready = True
+        logger.info(f"Warmed up in {self.warm_up_seconds:.2f}s: "
+                    + ", ".join(f"{name} {status['seconds']:.3f}s" for name, status in self.status.items()))
+
+    async def report(self) -> Dict[str, Any]:
+        """Whether this worker is ready, with the warm-up steps and a live database ping."""
+        database = await ping_database()
+        return {
+            "ready": self.ready and database["status"] == "ok",
+            "warm_up_seconds": self.warm_up_seconds,
+            "steps": self.status,
+            "database": database,
+        }
+
+STARTUP = Startup(STEPS)
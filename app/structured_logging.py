@@ -0,0 +1,211 @@
+# app/structured_logging.py
+"""
+Queued JSON logging with redaction and sampling.
+
+setup_logging() replaces the root logger's handlers with a QueuedHandler,
+so a log call on the event loop only builds the record and appends it to a
+queue; a writer thread formats the queued records as JSON lines and writes
+them to stdout in batches. uvicorn's loggers are routed through the same
+queue.
+
+Records carry structured fields as extra={...}. Two of them are redacted
+when the line is written: "phone" is replaced by event_log's keyed hash,
+and "body" (message text, CVs, AI output) is cut to LOG_BODY_MAX_CHARS,
+with its full length kept as body_chars. Phone numbers and email addresses
+inside the message itself, and inside a logged traceback (SQL parameters,
+request URLs), are masked as a fallback. Only phone-shaped numbers are:
+international ones with a leading +, and Kenyan ones (254 or 0, then 7 or
+1, then eight digits); byte counts and ids are left readable.
+
+LOG_SAMPLE_RATES keeps only a share of a logger's records below WARNING;
+the decision is made before the record is queued. When the queue is full,
+records are dropped and counted rather than blocking the loop.
+"""
+import atexit
+import json
+import logging
+import random
+import re
+import sys
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Deque, Dict, Optional
+
+from .config import settings
+from .event_log import phone_hash
+
+# Attributes every LogRecord has; anything else on a record came in through extra=.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+# Phone numbers and web user ids ("web-<time>-<random>"), as they appear in a message.
+_PHONE_NUMBER = re.compile(r"(?<![\w.])(?:web-[\w-]+|\+\d{9,15}\b|(?:254|0)[17]\d{8}\b)")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, default=str)
+
+# The same users' numbers come up line after line.
+_phone_hash = lru_cache(maxsize=4096)(phone_hash)
+
+# Loggers uvicorn configures with handlers of its own.
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+def redact_text(text: str) -> str:
+    """Masks the phone numbers (as their hash) and email addresses in free text."""
+    return _EMAIL.sub("<email>", _PHONE_NUMBER.sub(lambda match: _phone_hash(match.group()), text))
+
+def redact_body(body: str, max_chars: int) -> str:
+    return body[:max_chars] + "…" if len(body) > max_chars else body
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, then its extra fields, redacted."""
+
+    def __init__(self, body_max_chars: int):
+        super().__init__()
+        self.body_max_chars = body_max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        line = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact_text(message),
+        }
+        for key, value in vars(record).items():
+            if key in _RECORD_ATTRIBUTES:
+                continue
+            if key == "phone":
+                line["phone_hash"] = _phone_hash(str(value))
+            elif key == "body":
+                body = str(value)
+                line["body_chars"] = len(body)
+                if self.body_max_chars > 0:
+                    line["body"] = redact_body(body, self.body_max_chars)
+            else:
+                line[key] = value
+        if record.exc_info:
+            line["exc"] = redact_text(self.formatException(record.exc_info))
+        elif record.exc_text:
+            line["exc"] = redact_text(record.exc_text)
+        return _ENCODER.encode(line)
+
+class SamplingFilter(logging.Filter):
+    """Passes a share of each sampled logger's records below WARNING; a logger without a rate inherits its parent's."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._by_name: Dict[str, float] = {}
+
+    def rate(self, name: str) -> float:
+        rate = self._by_name.get(name)
+        if rate is None:
+            rate, parent = 1.0, name
+            while parent:
+                if parent in self.rates:
+                    rate = self.rates[parent]
+                    break
+                parent = parent.rpartition(".")[0]
+            self._by_name[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class QueuedHandler(logging.Handler):
+    """
+    Appends records to an in-memory queue that a writer thread formats and
+    writes every flush_interval seconds, in one write per batch. Appending
+    takes no lock and wakes no thread, so a log call never waits on the
+    writer or on the stream. Past max_pending waiting records, new ones are
+    dropped and counted. Only %-style arguments are merged on the caller's
+    thread, so objects are never turned into text on the writer's.
+    """
+
+    def __init__(self, stream, flush_interval: float, max_pending: int):
+        super().__init__()
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Deque[logging.LogRecord] = deque()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"queued": 0, "dropped": 0, "writes": 0}
+
+    def emit(self, record: logging.LogRecord):
+        if len(self._pending) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        self._pending.append(record)
+        self.stats["queued"] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.write_pending()
+        self.write_pending()
+
+    def write_pending(self):
+        lines = []
+        while self._pending:
+            record = self._pending.popleft()
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            self.stats["writes"] += 1
+
+    def stop(self):
+        """Writes what is still queued and stops the writer thread."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+_handler: Optional[QueuedHandler] = None
+
+def setup_logging(stream=None) -> QueuedHandler:
+    """Sends all logging through the queue to stream (stdout by default); safe to call again."""
+    global _handler
+    stop_logging()
+    _handler = QueuedHandler(stream or sys.stdout, settings.LOG_FLUSH_INTERVAL_SECONDS, settings.LOG_MAX_PENDING)
+    _handler.setFormatter(JsonFormatter(settings.LOG_BODY_MAX_CHARS))
+    if settings.LOG_SAMPLE_RATES:
+        _handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL)
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _handler.start()
+    return _handler
+
+def stop_logging():
+    """Writes what is still queued and stops the writer thread."""
+    if _handler is not None:
+        _handler.stop()
+
+atexit.register(stop_logging)
+
+def logging_stats() -> Dict[str, int]:
+    return dict(_handler.stats) if _handler is not None else {}
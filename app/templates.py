@@ -0,0 +1,106 @@
+# app/templates.py
+"""
+The bot's fixed replies, in every language it speaks.
+
+Each locale has a JSON file under app/data/locales mapping a template key to
+its text, or to a list of variants of which one is picked at random. Text
+uses str.format placeholders ("{interest}"), names only.
+
+The files are read once at import. Every template is split into its literal
+text and the placeholders between them, so rendering is a join rather than
+a parse, and only the values a template actually names are looked up: a
+value may be a callable, evaluated only if the chosen text uses it.
+
+Loading checks that every locale has every key of the default locale, and
+no placeholder the default's text for that key does not have, and refuses
+to start otherwise.
+"""
+import json
+import random
+import string
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+LOCALES_DIR = Path(__file__).resolve().parent / "data" / "locales"
+DEFAULT_LOCALE = "en"
+LOCALES = ("en", "sw", "sheng")
+# What a user types to switch language -> locale.
+LOCALE_NAMES = {"english": "en", "kiswahili": "sw", "swahili": "sw", "sheng": "sheng"}
+
+_FORMATTER = string.Formatter()
+
+class Template:
+    """One variant of a reply, split into literal text and the placeholders between it."""
+
+    __slots__ = ("parts", "fields")
+
+    def __init__(self, text: str):
+        parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in _FORMATTER.parse(text):
+            if field is not None and (not field.isidentifier() or spec or conversion):
+                raise ValueError(f"Only plain {{name}} placeholders are supported, not {{{field}}} in {text!r}")
+            parts.append((literal, field))
+        self.parts = tuple(parts)
+        self.fields = frozenset(field for _, field in parts if field)
+
+    def render(self, values: Dict[str, Any]) -> str:
+        if not self.fields:
+            return self.parts[0][0] if self.parts else ""
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = values[field]
+                out.append(str(value() if callable(value) else value))
+        return "".join(out)
+
+def _compile(path: Path) -> Dict[str, Tuple[Template, ...]]:
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    templates = {}
+    for key, text in raw.items():
+        variants = [text] if isinstance(text, str) else text
+        if not variants or not all(isinstance(variant, str) for variant in variants):
+            raise ValueError(f"{path}: {key!r} must be a string or a non-empty list of strings")
+        try:
+            templates[key] = tuple(Template(variant) for variant in variants)
+        except ValueError as e:
+            raise ValueError(f"{path}: {key!r}: {e}") from None
+    return templates
+
+def check(locales: Dict[str, Dict[str, Tuple[Template, ...]]]) -> List[str]:
+    """What each locale is missing or has extra compared with DEFAULT_LOCALE, as messages; empty if complete."""
+    reference = locales[DEFAULT_LOCALE]
+    problems = []
+    for locale, templates in locales.items():
+        for key in sorted(reference.keys() - templates.keys()):
+            problems.append(f"{locale}: missing {key!r}")
+        for key in sorted(templates.keys() - reference.keys()):
+            problems.append(f"{locale}: {key!r} is not in {DEFAULT_LOCALE}")
+        for key in sorted(reference.keys() & templates.keys()):
+            expected = frozenset().union(*(variant.fields for variant in reference[key]))
+            for variant in templates[key]:
+                if variant.fields - expected:
+                    problems.append(f"{locale}: {key!r} uses {sorted(variant.fields - expected)}, which {DEFAULT_LOCALE} does not")
+    return problems
+
+class TemplateRegistry:
+    """Every locale's compiled templates; see the module docstring."""
+
+    def __init__(self, directory: Path = LOCALES_DIR, locales: Tuple[str, ...] = LOCALES):
+        self.locales = {locale: _compile(directory / f"{locale}.json") for locale in locales}
+        problems = check(self.locales)
+        if problems:
+            raise ValueError("Incomplete locale files:\n" + "\n".join(problems))
+
+    def render(self, key: str, locale: Optional[str] = None, **values: Any) -> str:
+        """A variant of key in the user's locale (the default for one we don't know), filled in from values."""
+        templates = self.locales.get(locale) or self.locales[DEFAULT_LOCALE]
+        variants = templates[key]
+        variant = variants[0] if len(variants) == 1 else random.choice(variants)
+        return variant.render(values)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.locales[DEFAULT_LOCALE]
+
+TEMPLATES = TemplateRegistry()
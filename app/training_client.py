@@ -2,6 +2,8 @@
 import asyncio
 from typing import List, Optional
 
+from . import event_log, metrics
+
 # --- High-Quality Mock Database of Real, Relevant Courses ---
 # This list is manually curated to provide real value to users in the pilot program.
 MOCK_TRAINING_LIST = [
@@ -31,17 +33,19 @@ async def fetch_trainings(keyword: str) -> Optional[List[str]]:
     Simulates fetching training courses based on a keyword search.
     In the future, this could be an API call to a real course provider.
     """
-    await asyncio.sleep(1) # Simulate network latency
-    
-    try:
-        # A simple keyword search logic
-        keyword = keyword.lower()
-        results = [
-            course for course in MOCK_TRAINING_LIST 
-            if keyword in course.lower()
-        ]
-        return results if results else []
-    except Exception as e:
-        print(f"Error fetching training data: {e}")
-        return None
+    with metrics.span("catalog_training"):
+        await asyncio.sleep(1) # Simulate network latency
+
+        try:
+            # A simple keyword search logic
+            keyword = keyword.lower()
+            results = [
+                course for course in MOCK_TRAINING_LIST 
+                if keyword in course.lower()
+            ]
+            event_log.add("catalog_hits", len(results))
+            return results if results else []
+        except Exception as e:
+            print(f"Error fetching training data: {e}")
+            return None
 
@@ -0,0 +1,177 @@
+# app/turn_profiler.py
+"""
+On-demand profiling of slow turns.
+
+The webhook runs services.process_message inside TURN_PROFILER.profile().
+A share of turns (PROFILER_SAMPLE_RATE), and the next turns of any user an
+admin asked to capture, run under cProfile; a sampled turn is kept only if
+it took PROFILER_SLOW_TURN_SECONDS or longer, a captured one always. Kept
+profiles go into a ring buffer of the last PROFILER_MAX_PROFILES, with the
+turn's context redacted: the phone number as event_log's keyed hash, the
+message as its length, and state values as their type and size.
+
+cProfile traces the whole thread, so one turn is profiled at a time, and
+other users' turns that run while it awaits are included in its profile.
+Profiles are kept in this process; each worker has its own.
+
+With no sample rate and no capture requested, profile() is one method call
+returning a shared no-op.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from . import models
+from .config import settings
+from .event_log import phone_hash
+from .session_state import FLOW_STATES
+
+# How many functions the listing shows per profile, and the text report.
+TOP_FUNCTIONS = 5
+REPORT_LINES = 60
+
+def redact(value: Any) -> Any:
+    """A state value with nothing a user typed in it: flags and numbers as they are, anything else by type and size."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return f"<str, {len(value)} chars>"
+    if isinstance(value, (dict, list, tuple)):
+        return f"<{type(value).__name__}, {len(value)} items>"
+    return f"<{type(value).__name__}>"
+
+def session_context(session: models.UserSession) -> Dict[str, Any]:
+    """The menu, flow state and redacted payload of a session."""
+    state = session.session_data or {}
+    return {
+        "menu": session.current_menu,
+        "flow_states": [name for name in FLOW_STATES if state.get(name)],
+        "state": {key: redact(value) for key, value in state.items() if key not in FLOW_STATES},
+    }
+
+class ProfiledTurn:
+    """One turn run under cProfile; kept by the profiler when it ends if it was slow or captured."""
+
+    def __init__(self, profiler: "TurnProfiler", session: models.UserSession, message_text: str, captured: bool):
+        self.profiler = profiler
+        self.session = session
+        self.message_chars = len(message_text)
+        self.captured = captured
+        self.before: Dict[str, Any] = {}
+        self._cprofile = cProfile.Profile()
+        self._start = 0.0
+
+    def __enter__(self) -> "ProfiledTurn":
+        self.profiler._active = True
+        self.before = session_context(self.session)
+        self._start = time.perf_counter()
+        self._cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cprofile.disable()
+        seconds = time.perf_counter() - self._start
+        self.profiler._active = False
+        self.profiler.stats["profiled"] += 1
+        if self.captured or seconds >= self.profiler.slow_seconds:
+            self.profiler._keep(self, seconds, error=exc_type is not None)
+        return False
+
+class _NoOp:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoOp()
+
+class TurnProfiler:
+    """Profiles sampled and captured turns and keeps the slow ones in a bounded buffer."""
+
+    def __init__(self, sample_rate: float, slow_seconds: float, max_profiles: int):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.profiles: Deque[Dict[str, Any]] = deque(maxlen=max_profiles)
+        # phone number -> turns still to profile, set by capture().
+        self._captures: Dict[str, int] = {}
+        self._active = False
+        self._next_id = 1
+        self.stats: Dict[str, int] = {"profiled": 0, "kept": 0, "busy": 0}
+
+    def capture(self, phone_number: str, turns: int):
+        """Profiles the user's next turns, slow or not (0 cancels)."""
+        if turns > 0:
+            self._captures[phone_number] = turns
+        else:
+            self._captures.pop(phone_number, None)
+
+    def profile(self, session: models.UserSession, message_text: str):
+        """A context manager profiling the turn run inside it, if it is sampled or captured."""
+        captured = bool(self._captures) and session.phone_number in self._captures
+        if not captured and not (self.sample_rate and random.random() < self.sample_rate):
+            return _NOOP
+        if self._active:
+            # Another turn holds the profiler; a captured user keeps their turn for the next one.
+            self.stats["busy"] += 1
+            return _NOOP
+        if captured:
+            remaining = self._captures[session.phone_number] - 1
+            if remaining:
+                self._captures[session.phone_number] = remaining
+            else:
+                del self._captures[session.phone_number]
+        return ProfiledTurn(self, session, message_text, captured)
+
+    def _keep(self, turn: ProfiledTurn, seconds: float, error: bool):
+        report = io.StringIO()
+        stats = pstats.Stats(turn._cprofile, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LINES)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        self.profiles.append({
+            "id": self._next_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "phone_hash": phone_hash(turn.session.phone_number),
+            "seconds": round(seconds, 4),
+            "captured": turn.captured,
+            "error": error,
+            "message_chars": turn.message_chars,
+            "before": turn.before,
+            "after": session_context(turn.session),
+            "top": [{"function": pstats.func_std_string(function), "calls": entry[1], "cumulative_seconds": round(entry[3], 4)}
+                    for function, entry in top],
+            "_report": report.getvalue(),
+            "_prof": marshal.dumps(stats.stats),
+        })
+        self._next_id += 1
+        self.stats["kept"] += 1
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Kept profiles, newest first, without their reports."""
+        return [{key: value for key, value in profile.items() if not key.startswith("_")} for profile in reversed(self.profiles)]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        for profile in self.profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        """stats with the settings in force and what is pending, for the admin endpoint."""
+        return {
+            **self.stats,
+            "sample_rate": self.sample_rate,
+            "slow_seconds": self.slow_seconds,
+            "kept_profiles": len(self.profiles),
+            "pending_captures": sum(self._captures.values()),
+        }
+
+TURN_PROFILER = TurnProfiler(settings.PROFILER_SAMPLE_RATE, settings.PROFILER_SLOW_TURN_SECONDS, settings.PROFILER_MAX_PROFILES)
@@ -1,22 +1,37 @@
 import httpx
 import logging
+import re
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+from app import event_log, http_pool, metrics
 from app.config import settings
+from app.shared_state import STATE
 import asyncio
 
-# A temporary in-memory store for web replies.
-WEB_REPLIES = {}
+logger = logging.getLogger(__name__)
 
-async def send_whatsapp_message(to: str, message: str):
+# Replies to web users are kept in the shared state until their request
+# collects them; ones never collected expire.
+WEB_REPLY_TTL_SECONDS = 300
+
+def _web_replies_key(to: str) -> str:
+    return f"web_replies:{to}"
+
+async def pop_web_replies(to: str) -> List[str]:
+    """The replies stored for a web user since the last call, oldest first."""
+    return await STATE.pop(_web_replies_key(to)) or []
+
+async def send_whatsapp_message(to: str, message: str) -> bool:
     """
     Sends a message. If the recipient 'to' starts with 'web-', it stores the
     message for the web client to retrieve. Otherwise, it sends to WhatsApp.
+    Errors are logged, not raised; returns whether the message went out.
     """
     if to.startswith("web-"):
-        if to not in WEB_REPLIES:
-            WEB_REPLIES[to] = []
-        WEB_REPLIES[to].append(message)
-        logging.info(f"Stored web reply for {to}: {message}")
-        return
+        await STATE.append(_web_replies_key(to), message, ttl=WEB_REPLY_TTL_SECONDS)
+        logger.info("Stored web reply", extra={"phone": to, "body": message})
+        return True
 
     # Original WhatsApp sending logic
     headers = {
@@ -33,7 +48,8 @@ async def send_whatsapp_message(to: str, message: str):
     # THE FIX IS HERE: Corrected the URL construction
     url = f"https://graph.facebook.com/{settings.GRAPH_API_URL}/{settings.WHATSAPP_PHONE_ID}/messages"
 
-    async with httpx.AsyncClient() as client:
+    client = http_pool.client()
+    with event_log.timed("send"), metrics.span("send"):
         try:
             if len(message) > 4096:
                 chunks = [message[i:i+4096] for i in range(0, len(message), 4096)]
@@ -47,9 +63,178 @@ async def send_whatsapp_message(to: str, message: str):
                 response = await client.post(url, headers=headers, json=payload, timeout=20)
                 response.raise_for_status()
             
-            logging.info(f"Message sent to {to}")
+            logger.info("Message sent", extra={"phone": to, "body": message})
+            return True
+        except httpx.HTTPStatusError as e:
+            logger.error("Error sending message: %s", e.response.text, extra={"phone": to})
+        except Exception as e:
+            logger.error("Unexpected error in send_whatsapp_message: %s", e, extra={"phone": to})
+    return False
+
+
+# Ids of files "uploaded" for web users, which GET /documents/{media_id} serves from the export directory.
+LOCAL_MEDIA_ID = re.compile(r"local-[0-9a-f]+\.(pdf|docx)")
+
+def is_local(to: str) -> bool:
+    """Whether messages to this recipient stay in the process (the web client) rather than going to WhatsApp."""
+    return to.startswith("web-")
+
+def _local_media_dir() -> Path:
+    return Path(settings.EXPORT_LOCAL_DIR) if settings.EXPORT_LOCAL_DIR else Path(tempfile.gettempdir()) / "kazileo-exports"
+
+def local_media_path(media_id: str) -> Optional[Path]:
+    """The file behind a web user's media id, or None for an id that is not one."""
+    if not LOCAL_MEDIA_ID.fullmatch(media_id):
+        return None
+    path = _local_media_dir() / media_id
+    return path if path.is_file() else None
+
+async def upload_media(to: str, content: bytes, mime_type: str, filename: str, key: str) -> Optional[str]:
+    """
+    Uploads a file for a document message and returns its media id, or None
+    on failure. For web recipients the file is written to EXPORT_LOCAL_DIR
+    instead, under an id derived from key, and served by the web app.
+    """
+    if is_local(to):
+        media_id = f"local-{key}{Path(filename).suffix}"
+        directory = _local_media_dir()
+        def write():
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / media_id).write_bytes(content)
+        await asyncio.to_thread(write)
+        return media_id
+
+    url = f"https://graph.facebook.com/{settings.GRAPH_API_URL}/{settings.WHATSAPP_PHONE_ID}/media"
+    headers = {"Authorization": f"Bearer {settings.WHATSAPP_TOKEN}"}
+    client = http_pool.client()
+    with event_log.timed("send"):
+        try:
+            response = await client.post(
+                url, headers=headers, timeout=30,
+                data={"messaging_product": "whatsapp", "type": mime_type},
+                files={"file": (filename, content, mime_type)},
+            )
+            response.raise_for_status()
+            return response.json()["id"]
+        except httpx.HTTPStatusError as e:
+            logger.error("Error uploading media: %s", e.response.text, extra={"phone": to})
+        except Exception as e:
+            logger.error("Unexpected error in upload_media: %s", e, extra={"phone": to})
+    return None
+
+async def send_whatsapp_document(to: str, media_id: str, filename: str, caption: str = "") -> bool:
+    """
+    Sends an uploaded file as a document message; web recipients get a link
+    to it as a reply. Returns whether the message went out.
+    """
+    if is_local(to):
+        await STATE.append(_web_replies_key(to), f"📄 {filename}: /documents/{media_id}" + (f"\n{caption}" if caption else ""),
+                           ttl=WEB_REPLY_TTL_SECONDS)
+        logger.info("Stored web document", extra={"phone": to, "media_id": media_id})
+        return True
+
+    document = {"id": media_id, "filename": filename}
+    if caption:
+        document["caption"] = caption
+    return await _post_message(to, "document", {"document": document})
+
+class RateLimited(Exception):
+    """WhatsApp answered 429; retry_after is the seconds its Retry-After header asked for, if any."""
+
+    def __init__(self, retry_after: Optional[float]):
+        super().__init__(f"Rate limited by WhatsApp (retry after {retry_after} s)")
+        self.retry_after = retry_after
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+async def send_whatsapp_template(to: str, name: str, language: str, params: Sequence[str] = ()) -> bool:
+    """
+    Sends an approved message template, the only kind of message WhatsApp
+    delivers to a user who has not written in the last 24 hours; params fill
+    the template body's {{1}}, {{2}}, ... in order. Raises RateLimited on a
+    429, so a caller sending many can back off and retry; other errors are
+    logged and return False.
+    """
+    template = {"name": name, "language": {"code": language}}
+    if params:
+        template["components"] = [{"type": "body", "parameters": [{"type": "text", "text": str(param)} for param in params]}]
+    return await _post_message(to, "template", {"template": template}, raise_rate_limited=True)
+
+async def _post_message(to: str, kind: str, content: dict, raise_rate_limited: bool = False) -> bool:
+    """
+    Posts one non-text message (content is its type-specific part) to the
+    WhatsApp API. Errors are logged, not raised, except a 429 with
+    raise_rate_limited; returns whether it went out.
+    """
+    headers = {
+        "Authorization": f"Bearer {settings.WHATSAPP_TOKEN}",
+        "Content-Type": "application/json",
+    }
+    payload = {"messaging_product": "whatsapp", "to": to, "type": kind, **content}
+    url = f"https://graph.facebook.com/{settings.GRAPH_API_URL}/{settings.WHATSAPP_PHONE_ID}/messages"
+    client = http_pool.client()
+    with event_log.timed("send"), metrics.span("send"):
+        try:
+            response = await client.post(url, headers=headers, json=payload, timeout=20)
+            response.raise_for_status()
+            logger.info("%s message sent", kind.capitalize(), extra={"phone": to})
+            return True
         except httpx.HTTPStatusError as e:
-            logging.error(f"Error sending message: {e.response.text}")
+            if raise_rate_limited and e.response.status_code == 429:
+                raise RateLimited(_retry_after(e.response)) from None
+            logger.error("Error sending %s message: %s", kind, e.response.text, extra={"phone": to})
         except Exception as e:
-            logging.error(f"Unexpected error in send_whatsapp_message: {str(e)}")
+            logger.error("Unexpected error sending %s message: %s", kind, e, extra={"phone": to})
+    return False
+
+# WhatsApp's limits for interactive messages, in characters.
+INTERACTIVE_BODY_MAX = 1024
+BUTTON_TITLE_MAX = 20
+ROW_TITLE_MAX = 24
+MAX_BUTTONS = 3
+MAX_ROWS = 10
+
+def _split_for_body(text: str) -> Tuple[str, str]:
+    """
+    Splits a reply too long for an interactive body into the text to send
+    first and the last paragraph, which goes with the buttons or list.
+    """
+    head, _, tail = text.rpartition("\n\n")
+    return head, tail
+
+async def send_whatsapp_buttons(to: str, body: str, choices: Sequence[Tuple[str, str]]):
+    """
+    Sends body with up to three reply buttons; a tap comes back as the
+    button's id, as if the user had typed it. Web recipients get body as
+    plain text, which already asks the question in words.
+    """
+    if is_local(to) or not 0 < len(choices) <= MAX_BUTTONS:
+        await send_whatsapp_message(to, body)
+        return
+    if len(body) > INTERACTIVE_BODY_MAX:
+        head, body = _split_for_body(body)
+        if not head or len(body) > INTERACTIVE_BODY_MAX:
+            await send_whatsapp_message(to, f"{head}\n\n{body}".strip())
+            return
+        await send_whatsapp_message(to, head)
+    buttons = [{"type": "reply", "reply": {"id": choice, "title": title[:BUTTON_TITLE_MAX]}} for choice, title in choices]
+    await _post_message(to, "interactive", {"interactive": {"type": "button", "body": {"text": body}, "action": {"buttons": buttons}}})
 
+async def send_whatsapp_list(to: str, body: str, button: str, choices: Sequence[Tuple[str, str]], fallback: str):
+    """
+    Sends body with a list of up to ten choices behind a button; a pick comes
+    back as the row's id. Web recipients get fallback, the same choices as text.
+    """
+    if is_local(to) or not 0 < len(choices) <= MAX_ROWS:
+        await send_whatsapp_message(to, fallback)
+        return
+    if len(body) > INTERACTIVE_BODY_MAX:
+        head, body = _split_for_body(body)
+        await send_whatsapp_message(to, head)
+    rows = [{"id": choice, "title": title[:ROW_TITLE_MAX]} for choice, title in choices]
+    action = {"button": button[:BUTTON_TITLE_MAX], "sections": [{"rows": rows}]}
+    await _post_message(to, "interactive", {"interactive": {"type": "list", "body": {"text": body[:INTERACTIVE_BODY_MAX]}, "action": action}})
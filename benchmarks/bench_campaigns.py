@@ -0,0 +1,192 @@
+# benchmarks/bench_campaigns.py
+"""
+Broadcast campaigns over a large user_sessions table.
+
+Fills a temporary SQLite file with a million sessions (by default), spread
+over five job interests and 60 days of last_active, then:
+
+- campaign: sends a campaign to every user through CampaignSender with a
+  send that returns at once and no rate limit, so recipients per second is
+  the most the sender itself can do (WhatsApp's own limit is far lower),
+  then again under tracemalloc for the Python memory it peaked at.
+- select: reads the recipients of a 30-day last_active filter (about half
+  the table) streamed with yield_per, as the sender does, and loaded with
+  .all() for comparison, with the Python memory each one peaked at
+  (tracemalloc).
+- crash: a child process sends a campaign to one job interest, recording
+  each delivery, and dies (os._exit) partway through. Once its lease runs
+  out a second sender takes the campaign over from the checkpoint. Every
+  recipient must have been sent to; the ones sent twice are counted.
+
+Run from the project root: python -m benchmarks.bench_campaigns [sessions]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+if "BENCH_CAMPAIGNS_DB" not in os.environ:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ["BENCH_CAMPAIGNS_DB"] = path
+DB_PATH = os.environ["BENCH_CAMPAIGNS_DB"]
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import insert
+
+from app import models
+from app.campaigns import CampaignSender, recipients_query
+from app.database import AsyncSessionLocal, async_engine, engine
+
+INTERESTS = ["Accountant", "Driver", "Nurse", "Teacher", None]
+NOW = datetime.now(timezone.utc)
+CRASH_INTEREST = "Nurse"
+CRASH_LEASE_SECONDS = 1.0
+
+def populate(count: int):
+    models.Base.metadata.create_all(bind=engine)
+    batch = 20000
+    with engine.begin() as conn:
+        for start in range(0, count, batch):
+            conn.execute(insert(models.UserSession), [{
+                "phone_number": f"2547{n:08d}", "user_name": "Bench", "job_interest": INTERESTS[n % len(INTERESTS)],
+                "training_interest": None, "current_menu": "main", "session_data": {},
+                "last_active": NOW - timedelta(days=n % 60, seconds=n % 86400),
+            } for n in range(start, min(start + batch, count))])
+
+def sender(send, **options) -> CampaignSender:
+    settings = dict(rate=0, concurrency=8, fetch_size=1000, checkpoint_interval=5.0, lease=60.0, poll_interval=0)
+    return CampaignSender(async_engine, send=send, **{**settings, **options})
+
+async def select_recipients(filters, stream: bool) -> int:
+    query = recipients_query(filters).order_by(models.UserSession.id)
+    count = 0
+    async with AsyncSessionLocal() as db:
+        if stream:
+            async for batch in (await db.stream(query.execution_options(yield_per=1000))).partitions():
+                count += len(batch)
+        else:
+            count = len((await db.execute(query)).all())
+    return count
+
+async def compare_select():
+    filters = SimpleNamespace(job_interest=None, training_interest=None, active_since=NOW - timedelta(days=30), active_before=None)
+    for label, stream in (("streamed, yield_per=1000", True), ("loaded with .all()", False)):
+        start = time.perf_counter()
+        count = await select_recipients(filters, stream)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        await select_recipients(filters, stream)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:>25}: {count:,} recipients in {elapsed:.2f} s ({count / elapsed:,.0f}/s), peak {peak / 2**20:.1f} MiB")
+
+async def run_campaign(traced: bool):
+    async def send(to: str, campaign) -> bool:
+        return True
+
+    campaigns = sender(send)
+    await campaigns.create("Bench broadcast")
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await campaigns.send_campaign(await campaigns._claim())
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if traced else 0
+    tracemalloc.stop()
+    return campaigns.stats["sent"], elapsed, peak, campaigns.stats["checkpoints"]
+
+async def compare_campaign():
+    sent, elapsed, _, checkpoints = await run_campaign(traced=False)
+    # Traced separately: tracemalloc slows every allocation down.
+    _, _, peak, _ = await run_campaign(traced=True)
+    print(f"  {sent:,} sent in {elapsed:.1f} s: {sent / elapsed:,.0f} recipients/s, {checkpoints} checkpoints, peak {peak / 2**20:.1f} MiB")
+
+def crash_child(deliveries_path: str, crash_after: int):
+    """Sends the crash campaign, writing each delivery, and dies after crash_after sends."""
+    async def run():
+        deliveries = open(deliveries_path, "a")
+        sent = 0
+
+        async def send(to: str, campaign) -> bool:
+            nonlocal sent
+            await asyncio.sleep(0)
+            deliveries.write(to + "\n")
+            sent += 1
+            if sent == crash_after:
+                deliveries.flush()
+                os._exit(1)
+            return True
+
+        campaigns = sender(send, checkpoint_interval=0.5, lease=CRASH_LEASE_SECONDS)
+        await campaigns.send_campaign(await campaigns._claim())
+
+    asyncio.run(run())
+
+async def crash_and_resume():
+    fd, deliveries_path = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+    try:
+        campaigns = sender(None)
+        created = await campaigns.create("Bench broadcast after a crash", job_interest=CRASH_INTEREST.lower())
+        expected = await campaigns.count_recipients(SimpleNamespace(**{key: created[key] for key in
+                                                    ("job_interest", "training_interest", "active_since", "active_before")}))
+        crash_after = expected // 2
+        child = subprocess.run([sys.executable, "-m", "benchmarks.bench_campaigns", "--crash-child", deliveries_path, str(crash_after)])
+        assert child.returncode == 1, "the crash child did not crash"
+        checkpoint = await campaigns.get(created["id"])
+        await asyncio.sleep(CRASH_LEASE_SECONDS)
+
+        with open(deliveries_path, "a") as deliveries:
+            async def send(to: str, campaign) -> bool:
+                deliveries.write(to + "\n")
+                return True
+
+            resumer = sender(send)
+            claimed = await resumer._claim()
+            assert claimed is not None and claimed.id == created["id"], "the crashed campaign could not be taken over"
+            await resumer.send_campaign(claimed)
+        with open(deliveries_path) as deliveries:
+            sent = deliveries.read().split()
+    finally:
+        os.remove(deliveries_path)
+
+    campaign = await campaigns.get(created["id"])
+    print(f"  crashed after {crash_after:,} of {expected:,} sends, checkpointed at {checkpoint['sent']:,}; "
+          f"resumed to status {campaign['status']} with {campaign['sent']:,} sent")
+    print(f"  deliveries: {len(set(sent)):,} distinct recipients, {len(sent) - len(set(sent)):,} sent twice")
+    assert campaign["status"] == "done" and len(set(sent)) == expected, "recipients were lost across the crash"
+
+async def run():
+    print("campaign to everyone:")
+    await compare_campaign()
+    print("select:")
+    await compare_select()
+    print(f"crash and resume, job_interest={CRASH_INTEREST}:")
+    await crash_and_resume()
+    await async_engine.dispose()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    try:
+        start = time.perf_counter()
+        populate(count)
+        engine.dispose()
+        print(f"{count:,} sessions in a temporary SQLite file (filled in {time.perf_counter() - start:.1f} s)")
+        asyncio.run(run())
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--crash-child"]:
+        crash_child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
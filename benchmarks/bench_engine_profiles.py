@@ -0,0 +1,73 @@
+# benchmarks/bench_engine_profiles.py
+"""
+Write throughput of each database engine profile under concurrent webhook load.
+
+Every simulated user takes turns that upsert its session and then save the
+changed state, the two writes a real turn makes. The untuned "default"
+profile (rollback journal, no pragmas) is compared with the "sqlite" profile
+(WAL, synchronous=NORMAL, busy_timeout, mmap) on fresh SQLite files. Set
+BENCH_POSTGRES_URL to an empty scratch database to include the "postgres"
+profile as well.
+
+Run from the project root: python -m benchmarks.bench_engine_profiles [users] [turns]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, models
+from app.database import build_engines
+
+async def user_turns(sessionmaker, phone_number: str, turns: int, errors: dict):
+    writes = 0
+    for turn in range(turns):
+        try:
+            async with sessionmaker() as db:
+                session, _ = await crud.get_or_create_session(db, phone_number, "Bench")
+                session.current_menu = "jobs" if turn % 2 else "main"
+                session.session_data = {"awaiting_job_role": bool(turn % 2), "turn": turn}
+                await crud.update_session(db, session)
+                writes += 2
+        except Exception as e:
+            name = "database is locked" if "locked" in str(e) else type(e).__name__
+            errors[name] = errors.get(name, 0) + 1
+    return writes
+
+async def run_profile(url: str, profile: str, users: int, turns: int):
+    sync_engine, async_engine, profile = build_engines(url, profile)
+    models.Base.metadata.drop_all(bind=sync_engine)
+    models.Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+    sessionmaker = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    errors = {}
+    start = time.perf_counter()
+    writes = await asyncio.gather(*(user_turns(sessionmaker, f"bench-{u}", turns, errors) for u in range(users)))
+    elapsed = time.perf_counter() - start
+    await async_engine.dispose()
+    failed = ", ".join(f"{count} {name}" for name, count in errors.items()) or "none"
+    print(f"{profile:8s} {sum(writes) / elapsed:8.0f} writes/s, {elapsed:6.2f}s for {sum(writes)} writes, failed turns: {failed}")
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{users} concurrent users x {turns} turns (2 writes per turn)")
+    for profile in ("default", "sqlite"):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            await run_profile(f"sqlite:///{path}", profile, users, turns)
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    postgres_url = os.environ.get("BENCH_POSTGRES_URL")
+    if postgres_url:
+        for profile in ("default", "postgres"):
+            await run_profile(postgres_url, profile, users, turns)
+
+if __name__ == "__main__":
+    asyncio.run(main())
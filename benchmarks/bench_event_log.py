@@ -0,0 +1,97 @@
+# benchmarks/bench_event_log.py
+"""
+Per-turn overhead of the conversation event log.
+
+Runs the same scripted turns (menu, jobs search, CV builder) through
+services.process_message with the event log off and on, and reports the
+difference per turn. Writing happens off the turn, so the background flush
+is timed separately, as events written per second.
+
+Run from the project root: python -m benchmarks.bench_event_log [users] [rounds]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import event_log, models, services, whatsapp_client
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+
+SCRIPT = ["hi", "1", "Accountant", "5", "Jane Doe", "yes", "jane@example.com", "yes", "menu", "2", "Excel", "0"]
+
+async def turns(cache: SessionCache, users: int, rounds: int) -> float:
+    """Seconds spent in turns, the way the webhook runs them."""
+    elapsed = 0.0
+    async with AsyncSessionLocal() as db:
+        for _ in range(rounds):
+            for user in range(users):
+                phone_number = f"web-bench-{user}"
+                for text in SCRIPT:
+                    start = time.perf_counter()
+                    with event_log.record_turn(phone_number):
+                        with event_log.timed("db"):
+                            session, is_new = await cache.get_or_create(db, phone_number, "Bench")
+                        event_log.note(menu_before=session.current_menu)
+                        try:
+                            await services.process_message(db, session, text, is_new_user=is_new)
+                        finally:
+                            event_log.note(menu_after=session.current_menu)
+                            with event_log.timed("db"):
+                                await cache.mark_dirty(session)
+                    elapsed += time.perf_counter() - start
+                    await whatsapp_client.pop_web_replies(phone_number)
+    return elapsed
+
+async def compare(users: int, rounds: int):
+    cache = SessionCache(flush_interval=3600, max_entries=users * 2)
+    # Warm the cache so both runs see the same sessions.
+    settings.EVENT_LOG_ENABLED = False
+    await turns(cache, users, 1)
+    count = users * rounds * len(SCRIPT)
+
+    off = await turns(cache, users, rounds)
+    settings.EVENT_LOG_ENABLED = True
+    on = await turns(cache, users, rounds)
+    print(f"{count} turns per run")
+    print(f"event log off: {off / count * 1e6:8.1f} us/turn")
+    print(f"event log on:  {on / count * 1e6:8.1f} us/turn ({(on - off) / count * 1e6:+.1f} us/turn)")
+
+    start = time.perf_counter()
+    submit_count = 100_000
+    row = {"created_at": None, "phone_hash": "0" * 16}
+    writer = event_log.EventLogWriter(flush_interval=0, max_pending=submit_count, batch_size=1000)
+    for _ in range(submit_count):
+        writer.submit(row, "web-bench-0")
+    print(f"submit() alone: {(time.perf_counter() - start) / submit_count * 1e6:8.2f} us/event")
+
+    pending = len(event_log.EVENT_LOG._pending)
+    start = time.perf_counter()
+    await event_log.EVENT_LOG.flush()
+    elapsed = time.perf_counter() - start
+    print(f"background flush: {pending} events in {elapsed * 1000:.1f} ms ({pending / elapsed:,.0f} events/s), stats {event_log.EVENT_LOG.stats}")
+    await cache.flush()
+    await async_engine.dispose()
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    logging.disable(logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(users, rounds))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
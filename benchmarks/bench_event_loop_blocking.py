@@ -0,0 +1,88 @@
+# benchmarks/bench_event_loop_blocking.py
+"""
+Event-loop blocking under concurrent load: many users taking turns at once,
+each turn loading its session, awaiting a simulated AI/send call and saving.
+
+The sync variant runs the same queries through SessionLocal on the event loop
+(as handle_webhook used to); the async variant uses crud over AsyncSessionLocal.
+A ticker coroutine measures how late the loop wakes it, i.e. how long other
+users' AI calls and sends would have been stalled.
+
+Run from the project root: python -m benchmarks.bench_event_loop_blocking [users] [turns]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import select
+
+from app import crud, models
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+TICK = 0.001
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+async def sync_turn(phone_number: str):
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        session = db.execute(select(models.UserSession).where(models.UserSession.phone_number == phone_number)).scalars().first()
+        if session is None:
+            session = models.UserSession(phone_number=phone_number, user_name="Bench", current_menu="main", session_data={})
+            db.add(session)
+        db.commit()  # hand the connection back before awaiting, as crud does
+        await asyncio.sleep(0.02)  # the AI call / WhatsApp send
+        session.current_menu = "jobs"
+        session.session_data = {"awaiting_job_role": True, "n": time.perf_counter()}
+        db.commit()
+    finally:
+        db.close()
+
+async def async_turn(phone_number: str):
+    async with AsyncSessionLocal() as db:
+        session, _ = await crud.get_or_create_session(db, phone_number, "Bench")
+        await asyncio.sleep(0.02)  # the AI call / WhatsApp send
+        session.current_menu = "jobs"
+        session.session_data = {"awaiting_job_role": True, "n": time.perf_counter()}
+        await crud.update_session(db, session)
+
+async def run(turn, users: int, turns: int):
+    stop, lags = asyncio.Event(), []
+    tick_task = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    for i in range(turns):
+        await asyncio.gather(*(turn(f"web-bench-{u}") for u in range(users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+    lags.sort()
+    return elapsed, sum(lags), lags[len(lags) // 2], lags[int(len(lags) * 0.99)], lags[-1]
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{users} concurrent users x {turns} turns")
+    for label, turn in (("sync SessionLocal", sync_turn), ("async crud", async_turn)):
+        elapsed, blocked, p50, p99, worst = await run(turn, users, turns)
+        print(
+            f"{label:18s} wall {elapsed:6.2f}s, loop blocked {blocked:6.2f}s total, "
+            f"tick lag p50 {p50 * 1000:6.2f} ms, p99 {p99 * 1000:6.2f} ms, max {worst * 1000:6.2f} ms"
+        )
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(main())
+    finally:
+        os.remove(DB_PATH)
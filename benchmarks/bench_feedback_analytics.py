@@ -0,0 +1,115 @@
+# benchmarks/bench_feedback_analytics.py
+"""
+Feedback writes and admin analytics.
+
+Writes: completed feedback forms written one commit each (the writer with
+buffering disabled) versus buffered and flushed in batches.
+
+Analytics: the /admin/feedback/analytics query over the daily aggregates
+versus computing the same distribution and trend with a scan of the feedback
+table, once the table holds a large backlog loaded through the batch writer.
+
+Run from the project root: python -m benchmarks.bench_feedback_analytics [rows] [submissions]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import case, func, select
+
+from app import crud, models
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.feedback_writer import FeedbackWriter
+
+USERS = 1000
+ANSWERS = {"what_liked": "The job search", "what_confusing": "The CV builder steps", "feature_requests": "More internships"}
+
+def populate_users():
+    with engine.begin() as conn:
+        conn.execute(models.UserSession.__table__.insert(), [
+            {"phone_number": f"2547{u:08d}", "user_name": "Bench", "current_menu": "main", "session_data": {}} for u in range(USERS)
+        ])
+
+async def submissions(writer: FeedbackWriter, count: int) -> float:
+    rng = random.Random(5)
+    start = time.perf_counter()
+    for i in range(count):
+        await writer.submit(f"2547{i % USERS:08d}", {"rating": rng.randint(1, 5), **ANSWERS})
+    await writer.flush()
+    return time.perf_counter() - start
+
+async def load_backlog(rows: int, batch_size: int = 10_000):
+    """Spreads rows over the last year, written through crud.save_feedback so the aggregates follow."""
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    for offset in range(0, rows, batch_size):
+        batch = [
+            crud.feedback_row(f"2547{rng.randrange(USERS):08d}", {"rating": rng.randint(1, 5), **ANSWERS}, now - timedelta(minutes=rng.uniform(0, 60 * 24 * 365)))
+            for _ in range(min(batch_size, rows - offset))
+        ]
+        async with AsyncSessionLocal() as db:
+            await crud.save_feedback(db, batch)
+
+async def full_scan(days: int):
+    feedback = models.Feedback
+    day = func.date(feedback.timestamp)
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+    async with AsyncSessionLocal() as db:
+        distribution = (await db.execute(select(feedback.rating, func.count()).group_by(feedback.rating))).all()
+        trend = (await db.execute(
+            select(day, func.count(), func.avg(case((feedback.rating > 0, feedback.rating)))).where(day >= since).group_by(day)
+        )).all()
+    return distribution, trend
+
+async def timed(coro_factory, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await coro_factory()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+async def analytics():
+    async with AsyncSessionLocal() as db:
+        return await crud.feedback_analytics(db, days=30, recent=20)
+
+async def compare(rows: int, count: int):
+    populate_users()
+    per_commit = await submissions(FeedbackWriter(flush_interval=0, batch_size=1), count)
+    writer = FeedbackWriter(flush_interval=3600, batch_size=500)
+    buffered = await submissions(writer, count)
+    print(f"{count} submissions, one commit each: {count / per_commit:8.0f} forms/s")
+    print(f"{count} submissions, buffered:        {count / buffered:8.0f} forms/s ({writer.stats['flushes']} flushes)")
+
+    start = time.perf_counter()
+    await load_backlog(rows)
+    print(f"loaded {rows} rows through the batch writer path in {time.perf_counter() - start:.1f} s")
+
+    result = await analytics()
+    print(f"responses {result['responses']}, average {result['average_rating']}, distribution {result['distribution']}")
+    print(f"analytics from aggregates: {await timed(analytics) * 1000:8.2f} ms")
+    print(f"same numbers by full scan: {await timed(lambda: full_scan(30), repeats=2) * 1000:8.2f} ms")
+    await async_engine.dispose()
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(rows, count))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
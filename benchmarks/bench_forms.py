@@ -0,0 +1,99 @@
+# benchmarks/bench_forms.py
+"""
+Round trips per completed CV, one answer at a time versus all at once.
+
+Runs scripted CV conversations through services.process_message with the
+event log on, then reads the round trips back the way an admin would, from
+crud.flow_funnel's turns_per_completion. Also times the form engine's turn
+on its own.
+
+Run from the project root: python -m benchmarks.bench_forms [users]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import crud, event_log, models, resume_builder, services, whatsapp_client
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+
+ANSWERS = [
+    "Jane Wanjiru", "jane.wanjiru@example.com", "0712 345 678", "linkedin.com/in/janewanjiru",
+    "Accountant with 3 years of experience who cut reporting errors by 15%.",
+    "Accountant, XYZ Corp (2022-2024) - Reduced monthly reporting errors by 15%.",
+    "QuickBooks, Financial Reporting, Excel", "BCom Finance, University of Nairobi, 2021",
+]
+ONE_BY_ONE = ["5"] + [turn for answer in ANSWERS for turn in (answer, "yes")]
+BULK = ["5", "\n".join([
+    f"Name: {ANSWERS[0]}", ANSWERS[1], ANSWERS[2], f"Links: {ANSWERS[3]}", f"Summary: {ANSWERS[4]}",
+    f"Experience: {ANSWERS[5]}", f"Skills: {ANSWERS[6]}", f"Education: {ANSWERS[7]}",
+]), "yes"]
+
+async def converse(cache: SessionCache, phone_number: str, script):
+    async with AsyncSessionLocal() as db:
+        for text in script:
+            with event_log.record_turn(phone_number):
+                session, is_new = await cache.get_or_create(db, phone_number, "Bench")
+                await services.process_message(db, session, text, is_new_user=is_new)
+                await cache.mark_dirty(session)
+            await whatsapp_client.pop_web_replies(phone_number)
+    return session
+
+async def round_trips(label: str, script, users: int):
+    cache = SessionCache(flush_interval=3600, max_entries=users * 2)
+    since = datetime.now(timezone.utc) - timedelta(minutes=1)
+    # Each run is measured on its own: the funnel covers every event since `since`.
+    async with AsyncSessionLocal() as db:
+        await db.execute(models.ConversationEvent.__table__.delete())
+        await db.commit()
+    start = time.perf_counter()
+    for user in range(users):
+        session = await converse(cache, f"web-{label}-{user}", script)
+        assert session.current_menu == "main" and len(session.resume_data) == len(resume_builder.CV_FORM.keys), session.resume_data
+    elapsed = time.perf_counter() - start
+    await cache.flush()
+    await event_log.EVENT_LOG.flush()
+    async with AsyncSessionLocal() as db:
+        funnel = await crud.flow_funnel(db, "resume_builder", since=since)
+    print(f"{label:>10}: {funnel['turns_per_completion']:5.1f} round trips per completed CV "
+          f"({funnel['completed']} completed, {elapsed / (users * len(script)) * 1e6:.0f} us per turn)")
+
+def engine_turns(repeats: int = 20000):
+    """The form engine alone, answering and confirming the eight CV questions."""
+    start = time.perf_counter()
+    for _ in range(repeats // len(ONE_BY_ONE)):
+        state, data = {}, {}
+        resume_builder.CV_FORM.handle(state, data, "")
+        for text in ONE_BY_ONE[1:]:
+            resume_builder.CV_FORM.handle(state, data, text)
+    turns = repeats // len(ONE_BY_ONE) * len(ONE_BY_ONE)
+    print(f"form engine: {(time.perf_counter() - start) / turns * 1e6:.2f} us per turn")
+
+async def compare(users: int):
+    await round_trips("one by one", ONE_BY_ONE, users)
+    await round_trips("bulk", BULK, users)
+    engine_turns()
+    await async_engine.dispose()
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    logging.disable(logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(users))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_intent_classifier.py
+"""
+Accuracy and latency of the local intent classifier.
+
+Accuracy is measured on benchmarks/data/intent_eval.tsv, messages written
+separately from the training phrases in app/data/intent_phrases.tsv: the
+intent, and the slot where the message names one. Latency is per call to
+intent_classifier.classify over the same messages, which must stay well
+under a millisecond.
+
+Run from the project root: python -m benchmarks.bench_intent_classifier [repeats]
+"""
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from app import intent_classifier
+
+EVAL_PATH = Path(__file__).resolve().parent / "data" / "intent_eval.tsv"
+
+def load_eval():
+    """(intent, message, slot or None) rows; # starts a comment."""
+    rows = []
+    with open(EVAL_PATH, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            intent, message, *slot = line.split("\t")
+            rows.append((intent, message, slot[0] if slot else None))
+    return rows
+
+def accuracy(rows):
+    correct = slots_correct = slots_expected = 0
+    misses = Counter()
+    for intent, message, slot in rows:
+        prediction = intent_classifier.classify(message)
+        if prediction.intent == intent:
+            correct += 1
+        else:
+            misses[(intent, prediction.intent)] += 1
+            print(f"  miss: {message!r} expected {intent}, got {prediction.intent} ({prediction.confidence:.2f})")
+        if slot is not None:
+            slots_expected += 1
+            slots_correct += (prediction.slot or "").lower() == slot.lower()
+        elif prediction.slot:
+            print(f"  spurious slot: {message!r} -> {prediction.slot!r}")
+    print(f"intent accuracy: {correct}/{len(rows)} ({correct / len(rows):.1%})")
+    print(f"slot accuracy:   {slots_correct}/{slots_expected} ({slots_correct / max(slots_expected, 1):.1%})")
+    if misses:
+        print(f"confusions: {dict(misses)}")
+
+def latency(rows, repeats: int):
+    timings = []
+    messages = [message for _, message, _ in rows]
+    for _ in range(repeats):
+        for message in messages:
+            start = time.perf_counter()
+            intent_classifier.classify(message)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"{len(timings)} classifications: mean {statistics.fmean(timings) * 1e6:.1f} us, p50 {p50 * 1e6:.1f} us, p99 {p99 * 1e6:.1f} us, max {timings[-1] * 1e6:.1f} us")
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    start = time.perf_counter()
+    classifier = intent_classifier.IntentClassifier(intent_classifier.load_phrases())
+    print(f"trained on {len(intent_classifier.load_phrases())} phrases, {len(classifier.vocabulary)} features, "
+          f"{len(classifier.intents)} intents in {(time.perf_counter() - start) * 1000:.1f} ms")
+    rows = load_eval()
+    accuracy(rows)
+    latency(rows, repeats)
+
+if __name__ == "__main__":
+    main()
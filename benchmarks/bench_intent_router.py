@@ -0,0 +1,71 @@
+# benchmarks/bench_intent_router.py
+"""
+Routing cost per message: the old if/elif cascade in process_message versus
+the compiled intent router.
+
+The cascade is reproduced below exactly as it decided a route: the greeting
+checks, the reset and feedback commands, the main-menu keyword rewrite and
+the nine menu branches. Both are run over the same mix of messages and
+menus, and are checked to agree before they are timed.
+
+Run from the project root: python -m benchmarks.bench_intent_router [messages]
+"""
+import random
+import sys
+import timeit
+
+from app import intent_router
+
+MENUS = ["main"] * 6 + ["jobs", "training", "resume_builder", "cover_letter", "interview_practice", "feedback"]
+MESSAGES = [
+    "hi", "menu", "0", "1", "5", "9", "yes", "no", "feedback", "niaje", "sasa msee", "natafuta kazi",
+    "nataka kujifunza excel", "ushauri", "biashara ya kuku", "accountant",
+    "I prepared monthly reports at XYZ and cut errors by 15%.",
+    "Detail-oriented accountant with 3 years of experience in audit and tax.",
+    "We are hiring a Project Accountant to own monthly close and donor reporting. " * 3,
+]
+
+def legacy_route(message_text: str, current_menu: str):
+    sheng_greetings = ["niaje", "sasa", "vipi", "habari", "mambo"]
+    if message_text in ["hi", "hello", "start", "menu"] or any(greeting in message_text for greeting in sheng_greetings):
+        if any(greeting in message_text for greeting in sheng_greetings):
+            return ("sheng_greeting", message_text)
+        return ("greeting", message_text)
+    if message_text == "0":
+        return ("reset", message_text)
+    if message_text in ["feedback", "maoni"] or current_menu == "feedback":
+        return ("feedback", message_text)
+    if current_menu == "main":
+        if "kazi" in message_text or "ajira" in message_text or "wera" in message_text or "mboka" in message_text or "works" in message_text: message_text = "1"
+        elif "mafunzo" in message_text or "jifunza" in message_text or "kusoma" in message_text: message_text = "2"
+        elif "ushauri" in message_text: message_text = "3"
+        elif "biashara" in message_text: message_text = "4"
+    if message_text == "1" or current_menu == "jobs": return ("jobs", message_text)
+    elif message_text == "2" or current_menu == "training": return ("training", message_text)
+    elif message_text == "3" or current_menu == "mentorship": return ("mentorship", message_text)
+    elif message_text == "4" or current_menu == "entrepreneurship": return ("entrepreneurship", message_text)
+    elif message_text == "5" or current_menu == "resume_builder": return ("resume_builder", message_text)
+    elif message_text == "6" or current_menu == "interview_practice": return ("interview_practice", message_text)
+    elif message_text == "7" or current_menu == "cover_letter": return ("cover_letter", message_text)
+    elif message_text == "8" or current_menu == "cv_optimizer": return ("cv_optimizer", message_text)
+    elif message_text == "9" or current_menu == "skills_analyzer": return ("skills_analyzer", message_text)
+    return ("unknown", message_text)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(3)
+    cases = [(rng.choice(MESSAGES).strip().lower(), rng.choice(MENUS)) for _ in range(count)]
+    mismatches = [case for case in cases if tuple(intent_router.resolve(*case)) != legacy_route(*case)]
+    print(f"{count} messages, {len(set(cases))} distinct, {len(mismatches)} routed differently")
+
+    for name, route in (("if/elif cascade", legacy_route), ("compiled router", intent_router.resolve)):
+        best = min(timeit.repeat(lambda: [route(text, menu) for text, menu in cases], number=1, repeat=5))
+        print(f"{name}: {best / count * 1e6:6.2f} us/message")
+
+    long_text = MESSAGES[-1].strip().lower()
+    for name, route in (("if/elif cascade", legacy_route), ("compiled router", intent_router.resolve)):
+        best = min(timeit.repeat(lambda: route(long_text, "main"), number=20_000, repeat=5))
+        print(f"{name}, pasted job description in the main menu: {best / 20_000 * 1e6:6.2f} us/message")
+
+if __name__ == "__main__":
+    main()
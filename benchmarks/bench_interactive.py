@@ -0,0 +1,102 @@
+# benchmarks/bench_interactive.py
+"""
+Retries per flow when confirmations are typed versus tapped.
+
+Runs scripted users through the CV builder (one answer at a time, each
+confirmed) and the job search through services.process_message with the
+event log on. Typing users misspell a share of their yes/no answers, the way
+real users do ("yse", "yea", "ok"); tapping users send what a Yes button
+sends. Retries and round trips are read back from crud.intent_summary, the
+admin view. Also times how a reply is turned into an interactive message.
+
+Run from the project root: python -m benchmarks.bench_interactive [users] [typo_rate]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import crud, event_log, models, services, text_responses, whatsapp_client
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+
+ANSWERS = [
+    "Jane Wanjiru", "jane.wanjiru@example.com", "0712 345 678", "skip",
+    "Accountant with 3 years of experience who cut reporting errors by 15%.",
+    "Accountant, XYZ Corp (2022-2024) - Reduced monthly reporting errors by 15%.",
+    "QuickBooks, Financial Reporting, Excel", "BCom Finance, University of Nairobi, 2021",
+]
+TYPOS = ["yse", "yea", "ok", "yes please", "sure"]
+
+def script(rng: random.Random, typo_rate: float):
+    """A user's turns: the CV one answer at a time, then a repeat job search. A typo is followed by a correct yes."""
+    def confirm():
+        return ([rng.choice(TYPOS)] if rng.random() < typo_rate else []) + ["yes"]
+    turns = ["5"]
+    for answer in ANSWERS:
+        turns += [answer] + confirm()
+    return turns + ["1", "Accountant", "1"] + confirm()
+
+async def run(label: str, users: int, typo_rate: float):
+    cache = SessionCache(flush_interval=3600, max_entries=users * 2)
+    rng = random.Random(7)
+    since = datetime.now(timezone.utc) - timedelta(minutes=1)
+    async with AsyncSessionLocal() as db:
+        await db.execute(models.ConversationEvent.__table__.delete())
+        await db.commit()
+        for user in range(users):
+            phone_number = f"web-{label}-{user}"
+            for text in script(rng, typo_rate):
+                with event_log.record_turn(phone_number):
+                    session, is_new = await cache.get_or_create(db, phone_number, "Bench")
+                    await services.process_message(db, session, text, is_new_user=is_new)
+                    await cache.mark_dirty(session)
+            await whatsapp_client.pop_web_replies(phone_number)
+    await cache.flush()
+    await event_log.EVENT_LOG.flush()
+    async with AsyncSessionLocal() as db:
+        summary = {row["intent"]: row for row in await crud.intent_summary(db, since=since)}
+    for flow in ("resume_builder", "jobs"):
+        row = summary[flow]
+        print(f"{label:>7} {flow:>14}: {row['turns'] / users:5.1f} turns per user, {row['retries'] / users:4.2f} retries per user "
+              f"(retry rate {row['retry_rate']:.1%})")
+
+def send_cost(repeats: int = 20000):
+    """What services._send adds to a turn: spotting the menu or a yes/no question and building the choices."""
+    menu_reply = "Here are the first results I found for you:\n\n" + text_responses.get_main_menu("en")
+    question = "I remember you were interested in *Accountant* jobs. Shall I search for those again? (yes/no)"
+    start = time.perf_counter()
+    for _ in range(repeats):
+        menu_reply.endswith(text_responses.get_main_menu("en")) and text_responses.get_menu_choices("en")
+        services.YES_NO_QUESTION.search(question) and text_responses.get_yes_no_choices("en")
+    print(f"interactive choice: {(time.perf_counter() - start) / (2 * repeats) * 1e6:.2f} us per reply")
+
+async def compare(users: int, typo_rate: float):
+    await run("typed", users, typo_rate)
+    await run("tapped", users, 0.0)
+    send_cost()
+    await async_engine.dispose()
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    typo_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    logging.disable(logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(users, typo_rate))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
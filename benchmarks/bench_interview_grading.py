@@ -0,0 +1,97 @@
+# benchmarks/bench_interview_grading.py
+"""
+AI calls and latency per interview practice session.
+
+Runs scripted interviews through services.process_message with the Gemini
+call replaced by a stand-in that answers after a fixed delay, and counts the
+AI calls each interview makes through the event log. Also times the local
+score each answer gets instantly.
+
+Run from the project root: python -m benchmarks.bench_interview_grading [interviews] [ai_delay_ms]
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import ai_client, event_log, interview_simulator, models, services, whatsapp_client
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+
+ANSWERS = [
+    "I am an accountant.",
+    "In my previous role at XYZ I was responsible for month-end close. I introduced a checklist and as a result errors fell by 15%.",
+    "My biggest strength is attention to detail, which helped me catch a KES 200,000 invoice error last year.",
+    "I worked with the sales team to reduce overdue invoices. I called every client with a balance over 90 days and we cut the backlog by half in two months.",
+    "I want to grow into a finance manager role.",
+]
+AI_CALLS = 0
+
+def stand_in(delay: float):
+    async def get_ai_response(system_prompt: str, user_prompt: str, json_response: bool = False):
+        global AI_CALLS
+        AI_CALLS += 1
+        event_log.add("ai_calls")
+        with event_log.timed("ai"):
+            await asyncio.sleep(delay)
+        count = user_prompt.count("\nAnswer ")
+        return json.dumps([{"question": n, "score": 3, "tip": "Add a measurable result."} for n in range(1, count + 1)])
+    return get_ai_response
+
+async def interviews(count: int):
+    cache = SessionCache(flush_interval=3600, max_entries=count * 2)
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for user in range(count):
+            phone_number = f"web-interview-{user}"
+            for text in ["6", "Accountant"] + ANSWERS:
+                with event_log.record_turn(phone_number):
+                    session, is_new = await cache.get_or_create(db, phone_number, "Bench")
+                    await services.process_message(db, session, text, is_new_user=is_new)
+                    await cache.mark_dirty(session)
+            replies = await whatsapp_client.pop_web_replies(phone_number)
+            assert any("AI Coach Feedback" in reply for reply in replies), replies[-3:]
+    elapsed = time.perf_counter() - start
+    await cache.flush()
+    return elapsed
+
+async def compare(count: int, delay: float):
+    ai_client.get_ai_response = stand_in(delay)
+    elapsed = await interviews(count)
+    events = list(event_log.EVENT_LOG._pending)
+    ai_calls = sum(row["ai_calls"] for row, _ in events)
+    print(f"{count} interviews: {AI_CALLS / count:.1f} AI calls per interview ({ai_calls} recorded in the event log), "
+          f"{elapsed / count * 1000:.1f} ms per interview with a {delay * 1000:.0f} ms AI call")
+    print(f"per-answer grading would make {len(ANSWERS)} calls per interview, {len(ANSWERS) * delay * 1000:.0f} ms of AI time")
+
+    start = time.perf_counter()
+    repeats = 20000
+    for i in range(repeats):
+        interview_simulator.score_answer(ANSWERS[i % len(ANSWERS)])
+    print(f"local quick score: {(time.perf_counter() - start) / repeats * 1e6:.2f} us per answer")
+    for answer in ANSWERS:
+        print(f"  {interview_simulator.score_answer(answer)} {answer[:50]!r}")
+    await async_engine.dispose()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    delay = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.8
+    logging.disable(logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(count, delay))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_job_feed.py
+"""
+Streams a synthetic 500k-record CSV partner feed through job_feed.ingest_feed
+and reports rows/sec, dedup counts and peak memory, then the time a few
+searches take on the resulting index.
+
+Run from the project root: python -m benchmarks.bench_job_feed [records]
+"""
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import job_client, job_feed
+
+TITLES = ["Accountant", "Sales Agent", "Software Developer", "Driver", "Waiter", "IT Support", "Electrician", "Nurse"]
+COMPANIES = ["Tatu City", "Safaricom", "Bolt", "Sarova Hotels", "KCB", "Twiga Foods", "Equity Bank", "Jumia"]
+
+def write_feed(path: str, records: int):
+    """Writes a feed where ~5% of rows repeat an earlier URL (with tracking params) and ~40% are stale."""
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "company", "url", "posted_at"])
+        for i in range(records):
+            job_id = rng.randrange(i) if i and rng.random() < 0.05 else i
+            title = f"{TITLES[job_id % len(TITLES)]} {job_id}"
+            company = COMPANIES[job_id % len(COMPANIES)]
+            url = f"https://www.example-board.co.ke/jobs/{job_id}?utm_source=feed{i % 3}"
+            age = timedelta(days=rng.randrange(50))
+            writer.writerow([title, company, url, (now - age).isoformat()])
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_feed(path, records)
+        size_mb = os.path.getsize(path) / 1e6
+        index = job_client.JobIndex()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        start = time.perf_counter()
+        stats = job_feed.ingest_feed(path, index=index, max_age_days=30)
+        elapsed = time.perf_counter() - start
+
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        print(f"feed: {records} records, {size_mb:.1f} MB")
+        print(f"ingest: {elapsed:.2f}s, {stats['read'] / elapsed:,.0f} rows/sec")
+        print(f"stats: {stats}")
+        print(f"index size: {len(index)} listings, peak RSS +{rss_after - rss_before:.0f} MB")
+        for query in ("accountant 12", "nurse 4567", "it support 9", "12"):
+            search_start = time.perf_counter()
+            hits = index.search(query)
+            search_ms = (time.perf_counter() - search_start) * 1000
+            print(f"search {query!r}: {len(hits)} hits in {search_ms:.2f} ms")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
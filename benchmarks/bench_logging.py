@@ -0,0 +1,157 @@
+# benchmarks/bench_logging.py
+"""
+Logging cost per turn, and what reaches the log.
+
+Runs scripted web users (the CV builder one answer at a time, then a job
+search) through services.process_message with logging switched off; with
+a synchronous text handler on the root logger, as main.py's
+logging.basicConfig used to, writing each line the way the old f-strings
+did ("Stored web reply for <number>: <message>"); and with
+structured_logging's queue, plain and sampled. For the queue the time to
+drain it is shown as well, since the writer thread competes for the same
+CPU.
+
+Each runs against a local file and against a slow sink, standing in for
+stdout piped to a log shipper that is falling behind (each write blocks
+for SLOW_WRITE_SECONDS). Every user's phone number and name are then looked
+for in each log.
+
+Run from the project root: python -m benchmarks.bench_logging [users] [rounds]
+"""
+import asyncio
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import models, services, structured_logging, whatsapp_client
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+
+ANSWERS = [
+    "Jane Wanjiru", "jane.wanjiru@example.com", "0712 345 678", "skip",
+    "Accountant with 3 years of experience who cut reporting errors by 15%.",
+    "Accountant, XYZ Corp (2022-2024) - Reduced monthly reporting errors by 15%.",
+    "QuickBooks, Financial Reporting, Excel", "BCom Finance, University of Nairobi, 2021",
+]
+# The CV is left unconfirmed ("0" resets), so no PDF export runs in the measured turns.
+SCRIPT = ["5"] + [turn for answer in ANSWERS for turn in (answer, "yes")][:-1] + ["0", "1", "Accountant"]
+SLOW_WRITE_SECONDS = 0.0002
+RECORD_START = re.compile(r"^(?:DEBUG|INFO|WARNING|ERROR|CRITICAL):", re.MULTILINE)
+
+class OldLineFormatter(logging.Formatter):
+    """Renders records as the f-strings used to, with the number and message in the line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if hasattr(record, "phone"):
+            line += f" for {record.phone}"
+        if hasattr(record, "body"):
+            line += f": {record.body}"
+        return line
+
+class SlowSink:
+    """A stream whose writes block, like a full pipe."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text: str):
+        time.sleep(SLOW_WRITE_SECONDS)
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+async def turns(label: str, users: int) -> int:
+    cache = SessionCache(flush_interval=3600, max_entries=users * 2)
+    count = 0
+    async with AsyncSessionLocal() as db:
+        for user in range(users):
+            phone_number = f"2547{user:08d}"
+            for text in SCRIPT:
+                session, is_new = await cache.get_or_create(db, f"web-{label}-{phone_number}", "Bench")
+                await services.process_message(db, session, text, is_new_user=is_new)
+                await cache.mark_dirty(session)
+                count += 1
+            await whatsapp_client.pop_web_replies(f"web-{label}-{phone_number}")
+    await cache.flush()
+    return count
+
+def configure(mode: str, sink):
+    root = logging.getLogger()
+    structured_logging.stop_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logging.disable(logging.NOTSET)
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode == "before":
+        logging.basicConfig(level=logging.INFO, stream=sink, force=True)
+        root.handlers[0].setFormatter(OldLineFormatter("%(levelname)s:%(name)s:%(message)s"))
+    else:
+        settings.LOG_SAMPLE_RATES = {"app.whatsapp_client": 0.1} if mode == "queue, sampled" else {}
+        structured_logging.setup_logging(sink)
+
+async def run(mode: str, users: int, slow: bool, label: str) -> dict:
+    """Seconds per turn in the turns and with the queue drained, and what the log holds."""
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as sink:
+        configure(mode, SlowSink(sink) if slow else sink)
+        start = time.perf_counter()
+        count = await turns(label, users)
+        in_turns = time.perf_counter() - start
+        structured_logging.stop_logging()
+        drained = time.perf_counter() - start
+        sink.flush()
+        sink.seek(0)
+        log = sink.read()
+    # Old lines can span several lines of text (a whole CV); JSON records are one line each.
+    records = len(RECORD_START.findall(log)) if mode == "before" else log.count("\n")
+    return {
+        "turn": in_turns / count,
+        "drained": drained / count,
+        "records": records / count,
+        "bytes": len(log.encode("utf-8")) / count,
+        "numbers": sum(1 for user in range(users) if f"2547{user:08d}" in log),
+        "names": sum(1 for record in log.splitlines() if "Jane Wanjiru" in record),
+    }
+
+async def compare(users: int, rounds: int):
+    await turns("warmup", users)
+    runs = [("off", False)] + [(mode, slow) for slow in (False, True) for mode in ("before", "queue", "queue, sampled")]
+    results = {run_key: [] for run_key in runs}
+    for n in range(rounds):
+        for mode, slow in runs:
+            results[(mode, slow)].append(await run(mode, users, slow, f"{n}-{mode}-{slow}".replace(" ", "").replace(",", "")))
+    baseline = statistics.median(result["turn"] for result in results[("off", False)])
+    print(f"no logging: {baseline * 1e6:.1f} us per turn (median of {rounds} rounds of {users} users)")
+    for mode, slow in runs[1:]:
+        median = {key: statistics.median(result[key] for result in results[(mode, slow)]) for key in results[(mode, slow)][0]}
+        drain = f", {(median['drained'] - baseline) * 1e6:+6.1f} us drained" if mode.startswith("queue") else " " * 20
+        print(f"{mode:>15} to {'a slow sink' if slow else 'a file':>11}: {(median['turn'] - baseline) * 1e6:+6.1f} us per turn{drain}; "
+              f"{median['records']:4.2f} records, {median['bytes']:4.0f} bytes per turn; "
+              f"{median['numbers']:.0f}/{users} users' numbers and {median['names']:.0f} records with their name")
+    await async_engine.dispose()
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(users, rounds))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/bench_metrics.py
+"""
+What latency tracing adds to a turn.
+
+Posts scripted web-user turns (a job search, then the CV builder one answer
+at a time) to the webhook in-process, through httpx's ASGI transport, in
+rounds alternating METRICS_ENABLED on and off. Web users have no WhatsApp
+send or AI call, so these are the cheapest turns the bot serves and the
+overhead is relative to the least it could be hidden in.
+
+End-to-end differences of a fraction of a percent are within the noise of a
+shared machine, so the tracing itself is also timed on its own: one turn with
+as many spans as the scripted turns averaged, less the same loop untraced,
+set against the mean turn time. Finally prints a sample of the /metrics
+exposition.
+
+Run from the project root: python -m benchmarks.bench_metrics [users] [rounds]
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import httpx
+
+from app import metrics, models
+from app.config import settings
+from app.database import async_engine, engine
+from app.main import app
+
+ANSWERS = [
+    "Jane Wanjiru", "jane.wanjiru@example.com", "0712 345 678", "skip",
+    "Accountant with 3 years of experience who cut reporting errors by 15%.",
+    "Accountant, XYZ Corp (2022-2024) - Reduced monthly reporting errors by 15%.",
+    "QuickBooks, Financial Reporting, Excel", "BCom Finance, University of Nairobi, 2021",
+]
+SCRIPT = ["hi", "1", "Accountant", "menu", "5"] + [turn for answer in ANSWERS for turn in (answer, "yes")]
+
+def webhook_body(phone_number: str, text: str) -> dict:
+    message = {"id": "wamid.bench", "from": phone_number, "timestamp": "0", "type": "text", "text": {"body": text}}
+    value = {"messaging_product": "whatsapp", "metadata": {}, "contacts": [{"profile": {"name": "Bench"}, "wa_id": phone_number}],
+             "messages": [message]}
+    return {"object": "whatsapp_business_account", "entry": [{"id": "0", "changes": [{"value": value, "field": "messages"}]}]}
+
+async def run(client: httpx.AsyncClient, label: str, users: int, enabled: bool) -> float:
+    """Seconds per turn for a round of users, with tracing on or off."""
+    settings.METRICS_ENABLED = enabled
+    turns = 0
+    start = time.perf_counter()
+    for user in range(users):
+        phone_number = f"web-{label}-{user}"
+        for text in SCRIPT:
+            response = await client.post("/webhook", json=webhook_body(phone_number, text))
+            assert response.json()["replies"], text
+            turns += 1
+    return (time.perf_counter() - start) / turns
+
+def tracing_cost(spans: int, enabled: bool, repeats: int = 100000) -> float:
+    """Seconds of tracing per turn: the turn itself and its spans, less the same loop with nothing traced."""
+    settings.METRICS_ENABLED = enabled
+    start = time.perf_counter()
+    for _ in range(repeats):
+        with metrics.turn() as trace:
+            for _ in range(spans):
+                with metrics.span("send"):
+                    pass
+            trace.flow = "jobs"
+    traced = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for _ in range(spans):
+            pass
+    return (traced - (time.perf_counter() - start)) / repeats
+
+async def compare(users: int, rounds: int):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await run(client, "warmup", users, True)
+        samples = {False: [], True: []}
+        for n in range(rounds):
+            # Alternate which goes first, so a slowly growing database does not favour one.
+            for enabled in ((False, True) if n % 2 == 0 else (True, False)):
+                samples[enabled].append(await run(client, f"r{n}-{enabled}", users, enabled))
+        off, on = statistics.median(samples[False]), statistics.median(samples[True])
+        ratio = statistics.median(on_round / off_round for on_round, off_round in zip(samples[True], samples[False]))
+        print(f"end to end, median of {rounds} rounds: off {off * 1e6:7.1f} us per turn, on {on * 1e6:7.1f} us per turn "
+              f"(on/off within a round {ratio - 1:+.2%}, noise included)")
+
+        settings.METRICS_ENABLED = True
+        exposition = (await client.get("/metrics")).text.splitlines()
+    print(f"/metrics: {len(exposition)} lines, e.g.")
+    for line in exposition:
+        if line.startswith("kazileo_turn_duration_seconds_count") or line.startswith('kazileo_span_duration_seconds_sum{span="parse"'):
+            print(f"  {line}")
+
+    def count(histogram):
+        return sum(sum(counts) for counts, _ in histogram._series.values())
+    spans_per_turn = max(1, round(count(metrics.SPAN_SECONDS) / count(metrics.TURN_SECONDS)))
+    for enabled in (False, True):
+        cost = tracing_cost(spans_per_turn, enabled)
+        print(f"tracing {'on ' if enabled else 'off'}: {cost * 1e6:5.2f} us per turn ({spans_per_turn} spans), "
+              f"{cost / off:.3%} of a {off * 1e6:.0f} us turn")
+    await async_engine.dispose()
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    logging.disable(logging.ERROR)
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(users, rounds))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
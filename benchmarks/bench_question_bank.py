@@ -0,0 +1,74 @@
+# benchmarks/bench_question_bank.py
+"""
+Question selection latency against a large interview question bank.
+
+Builds a bank of the shipped questions plus a synthetic load (many roles,
+all seniorities, a dozen competencies) and times QuestionBank.select for a
+mix of typed roles: exact titles, Swahili names, typos, several roles at
+once and unknown roles, for a user with a long history of seen questions.
+Role resolution is timed cold (no cache) and warm.
+
+Run from the project root: python -m benchmarks.bench_question_bank [questions] [selections]
+"""
+import random
+import statistics
+import sys
+import time
+
+from app import question_bank
+
+ROLE_TEXTS = [
+    "Accountant", "sales accountant", "Senior sofware developer", "mhasibu", "dereva", "junior teacher",
+    "astronaut", "Head of HR", "boda boda rider", "customer care", "data scientist", "accontant",
+]
+COMPETENCIES = ["communication", "teamwork", "problem_solving", "technical", "customer_focus", "leadership",
+                "integrity", "motivation", "adaptability", "time_management", "safety", "attention_to_detail"]
+
+def synthetic_bank(count: int) -> question_bank.QuestionBank:
+    rng = random.Random(3)
+    aliases = question_bank.load_roles()
+    roles = sorted(set(aliases.values())) + ["general"]
+    questions = question_bank.load_questions([question_bank.QUESTIONS_DIR])
+    for i in range(count):
+        text = f"Synthetic question {i} about {rng.choice(COMPETENCIES)}?"
+        questions.append(question_bank.Question(
+            question_bank.question_id(text), rng.choice(roles), rng.choice(question_bank.SENIORITIES), rng.choice(COMPETENCIES), text,
+        ))
+    return question_bank.QuestionBank(questions, aliases)
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return f"mean {statistics.fmean(timings) * 1e6:7.1f} us, p50 {timings[len(timings) // 2] * 1e6:7.1f} us, p99 {timings[int(len(timings) * 0.99)] * 1e6:7.1f} us"
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    selections = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    start = time.perf_counter()
+    bank = synthetic_bank(count)
+    print(f"indexed {len(bank.questions)} questions over {len(bank.roles)} roles in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    cold = []
+    for text in ROLE_TEXTS:
+        start = time.perf_counter()
+        bank._resolve(text)
+        cold.append(time.perf_counter() - start)
+    print(f"resolve, cold:  {percentiles(cold)}")
+
+    rng = random.Random(11)
+    seen = [question.id for question in rng.sample(bank.questions, question_bank.SEEN_LIMIT)]
+    history = question_bank.decode_seen(question_bank.encode_seen(seen))
+    timings = []
+    for i in range(selections):
+        start = time.perf_counter()
+        picked = bank.select(ROLE_TEXTS[i % len(ROLE_TEXTS)], 5, seen=history, rng=rng)
+        timings.append(time.perf_counter() - start)
+        assert len(picked) == 5 and not set(history) & {question.id for question in picked}
+    print(f"select, warm:   {percentiles(timings)} ({question_bank.SEEN_LIMIT} seen questions)")
+    print(f"history stored in {len(question_bank.encode_seen(seen))} characters")
+
+    for text in ROLE_TEXTS:
+        print(f"  {text!r:>28} -> {question_bank.bank().resolve(text)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_session_split.py
+"""
+Per-turn load/save cost of an ordinary menu turn before and after moving the
+CV, cover letter and interview documents into user_documents.
+
+"Before" loads the whole user_sessions row (documents included) and rewrites
+all four JSON columns; "after" loads only the hot row and writes the changed
+hot columns. Both run against SQLite files with the same users and documents.
+
+Run from the project root: python -m benchmarks.bench_session_split [users] [turns]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+RESUME = {key: "x" * 250 for key in ("full_name", "email", "phone", "links", "summary", "experience", "skills", "education")}
+COVER_LETTER = {key: "y" * 300 for key in ("company_name", "job_role", "key_skill", "experience_match", "passion")}
+INTERVIEW = {"role": "accountant", "questions": ["q" * 120] * 5, "answers": {f"q{i}": "a" * 400 for i in range(5)}}
+
+def legacy_table(metadata: sa.MetaData) -> sa.Table:
+    return sa.Table(
+        "user_sessions", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("phone_number", sa.String, unique=True, index=True),
+        sa.Column("current_menu", sa.String),
+        sa.Column("session_data", sa.JSON),
+        sa.Column("resume_data", sa.JSON),
+        sa.Column("cover_letter_data", sa.JSON),
+        sa.Column("interview_data", sa.JSON),
+        sa.Column("last_active", sa.DateTime(timezone=True)),
+    )
+
+def split_tables(metadata: sa.MetaData):
+    sessions = sa.Table(
+        "user_sessions", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("phone_number", sa.String, unique=True, index=True),
+        sa.Column("current_menu", sa.String),
+        sa.Column("session_data", sa.JSON),
+        sa.Column("last_active", sa.DateTime(timezone=True)),
+    )
+    documents = sa.Table(
+        "user_documents", metadata,
+        sa.Column("user_session_id", sa.Integer, sa.ForeignKey("user_sessions.id"), primary_key=True),
+        sa.Column("resume_data", sa.JSON),
+        sa.Column("cover_letter_data", sa.JSON),
+        sa.Column("interview_data", sa.JSON),
+    )
+    return sessions, documents
+
+def populate(engine: sa.Engine, users: int, split: bool):
+    metadata = sa.MetaData()
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        if split:
+            sessions, documents = split_tables(metadata)
+            metadata.create_all(conn)
+            conn.execute(sessions.insert(), [
+                {"id": i, "phone_number": f"2547{i:08d}", "current_menu": "main", "session_data": {}, "last_active": now}
+                for i in range(users)
+            ])
+            conn.execute(documents.insert(), [
+                {"user_session_id": i, "resume_data": RESUME, "cover_letter_data": COVER_LETTER, "interview_data": INTERVIEW}
+                for i in range(users)
+            ])
+            return sessions
+        sessions = legacy_table(metadata)
+        metadata.create_all(conn)
+        conn.execute(sessions.insert(), [
+            {"id": i, "phone_number": f"2547{i:08d}", "current_menu": "main", "session_data": {},
+             "resume_data": RESUME, "cover_letter_data": COVER_LETTER, "interview_data": INTERVIEW, "last_active": now}
+            for i in range(users)
+        ])
+        return sessions
+
+def run_turns(engine: sa.Engine, sessions: sa.Table, users: int, turns: int, split: bool):
+    rng = random.Random(7)
+    bytes_read = bytes_written = 0
+    start = time.perf_counter()
+    for _ in range(turns):
+        phone_number = f"2547{rng.randrange(users):08d}"
+        with engine.begin() as conn:
+            row = conn.execute(sessions.select().where(sessions.c.phone_number == phone_number)).mappings().one()
+            bytes_read += sum(len(json.dumps(v, default=str)) for v in row.values())
+            state = dict(row["session_data"])
+            state["awaiting_job_role"] = True
+            values = {"current_menu": "jobs", "session_data": state, "last_active": datetime.now(timezone.utc)}
+            if not split:
+                # The old update_session flagged every JSON column, so all of them were rewritten.
+                values.update(resume_data=row["resume_data"], cover_letter_data=row["cover_letter_data"], interview_data=row["interview_data"])
+            conn.execute(sessions.update().where(sessions.c.id == row["id"]).values(**values))
+            bytes_written += sum(len(json.dumps(v, default=str)) for v in values.values())
+    elapsed = time.perf_counter() - start
+    return elapsed / turns * 1000, bytes_read / turns, bytes_written / turns
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    for label, split in (("before (one row)", False), ("after (split)", True)):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            engine = sa.create_engine(f"sqlite:///{path}")
+            sessions = populate(engine, users, split)
+            ms, read, written = run_turns(engine, sessions, users, turns, split)
+            engine.dispose()
+            print(f"{label:17s} {ms:6.3f} ms/turn, {read:7.0f} bytes loaded/turn, {written:7.0f} bytes written/turn")
+        finally:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
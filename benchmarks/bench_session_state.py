@@ -0,0 +1,100 @@
+# benchmarks/bench_session_state.py
+"""
+Stored session_data size per turn: the old layout versus the compact state
+encoding, over a scripted conversation that walks most of the menu.
+
+The old layout is reconstructed from the state each turn leaves behind. Every
+"awaiting_*" flag the conversation has touched is kept as False, which is what
+the old reset_flags left in the row. AI feedback and job descriptions stay inline.
+The AI calls are replaced by canned replies of realistic length so the run is
+offline and repeatable.
+
+Run from the project root: python -m benchmarks.bench_session_state
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import ai_client, models, services, skills_analyzer, whatsapp_client
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+from app.session_state import TRANSIENT_STORE, stored_bytes
+
+JOB_DESCRIPTION = (
+    "We are hiring a Project Accountant to own monthly close, reconcile project ledgers, prepare "
+    "donor reports and support audits. Requirements: CPA(K), 3+ years in project accounting, "
+    "QuickBooks or Sage, advanced Excel, strong communication. " * 4
+)
+CV_FEEDBACK = "1. Lead with project accounting. 2. Quantify reconciliations. 3. Name QuickBooks. " * 12
+
+SCRIPT = [
+    "hi", "1", "Accountant", "menu", "2", "Excel", "menu", "3", "Finance", "menu", "4", "Agribusiness", "menu",
+    "5", "Jane Doe", "yes", "jane@example.com", "yes", "0712 345 678", "yes", "linkedin.com/in/jane", "yes",
+    "Accountant with 3 years of experience who cut reporting errors by 15%.", "yes", "skip", "yes",
+    "QuickBooks, Excel, Budgeting", "yes", "BCom Finance, University of Nairobi", "yes",
+    "menu", "7", "Tatu City", "yes", "Project Accountant", "yes", "Financial Reporting", "yes",
+    "I prepared monthly reports at XYZ.", "yes", "Your sustainability work.", "yes", "no",
+    "menu", "8", JOB_DESCRIPTION, "menu", "9", JOB_DESCRIPTION, "no",
+    "feedback", "4", "The CV builder", "Nothing", "More jobs", "menu", "1", "yes",
+]
+
+async def canned_optimize_resume(cv_text: str, job_description: str):
+    return CV_FEEDBACK
+
+async def canned_skills_gap(session, job_description: str):
+    return "You match most of the role. Missing: Sage, donor reporting.", ["Sage", "Donor reporting"]
+
+def legacy_layout(state: dict, touched_flags: set) -> dict:
+    legacy = {flag: False for flag in touched_flags}
+    legacy.update(state)
+    return legacy
+
+async def converse(cache: SessionCache, phone_number: str):
+    touched_flags = set()
+    legacy_sizes, compact_sizes = [], []
+    async with AsyncSessionLocal() as db:
+        for text in SCRIPT:
+            session, is_new = await cache.get_or_create(db, phone_number, "Jane")
+            await services.process_message(db, session, text, is_new_user=is_new)
+            await cache.mark_dirty(session)
+            await whatsapp_client.pop_web_replies(phone_number)
+            state = session.session_data
+            touched_flags.update(key for key in state if key.startswith("awaiting_"))
+            legacy_sizes.append(stored_bytes(legacy_layout(state, touched_flags), encoded=False))
+            compact_sizes.append(stored_bytes(state))
+    await cache.flush()
+    return legacy_sizes, compact_sizes
+
+async def compare():
+    ai_client.optimize_resume = canned_optimize_resume
+    skills_analyzer.analyze_skills_gap = canned_skills_gap
+    cache = SessionCache(flush_interval=0, max_entries=10)
+    legacy, compact = await converse(cache, "web-bench-state")
+    turns = len(SCRIPT)
+
+    print(f"turns: {turns}")
+    print(f"old layout:     {sum(legacy) / turns:6.0f} bytes/turn avg, {max(legacy):5d} max, {legacy[-1]:5d} at the end")
+    print(f"compact:        {sum(compact) / turns:6.0f} bytes/turn avg, {max(compact):5d} max, {compact[-1]:5d} at the end")
+    print(f"reduction:      {1 - sum(compact) / sum(legacy):6.1%} of session_data bytes; {len(TRANSIENT_STORE)} values held out of row")
+    with engine.connect() as conn:
+        stored = conn.exec_driver_sql("SELECT session_data FROM user_sessions WHERE phone_number = 'web-bench-state'").scalar()
+    print(f"stored row:     {stored}")
+    await async_engine.dispose()
+
+def main():
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare())
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_session_sweep.py
+"""
+Bulk expiry of idle sessions: one incremental sweeper pass (batched UPDATEs
+over the last_active index) versus a single table-wide UPDATE, plus a second
+pass to show that later sweeps only look at newly idle sessions.
+
+The longest batch is the longest the writer lock is held by the sweeper.
+
+Run from the project root: python -m benchmarks.bench_session_sweep [sessions] [batch_size]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import Text, cast, event, func, or_, select, text, update
+
+from app import models
+from app.config import settings
+from app.database import async_engine, engine
+from app.session_sweeper import SessionSweeper, _expire_candidates
+
+STATE = {"awaiting_job_role": False, "awaiting_cv_summary": False, "job_role": "accountant", "page": 3}
+BATCH_TIMES = []
+
+@event.listens_for(async_engine.sync_engine, "commit")
+def time_batch(conn):
+    BATCH_TIMES.append(time.perf_counter())
+
+def populate(sessions: int, now: datetime):
+    """A third of the users are idle past the timeout with state left behind, the rest recent."""
+    rng = random.Random(11)
+    rows = []
+    for i in range(sessions):
+        idle = i % 3 == 0
+        minutes = rng.uniform(settings.SESSION_TIMEOUT_MINUTES + 1, 60 * 24 * 30) if idle else rng.uniform(0, settings.SESSION_TIMEOUT_MINUTES - 1)
+        rows.append({
+            "phone_number": f"2547{i:08d}", "user_name": "Bench", "current_menu": "jobs", "session_data": STATE,
+            "created_at": now - timedelta(days=31), "last_active": now - timedelta(minutes=minutes),
+        })
+    with engine.begin() as conn:
+        conn.execute(models.UserSession.__table__.insert(), rows)
+
+def expired_with_state(cutoff: datetime) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(models.UserSession).where(
+                models.UserSession.last_active < cutoff,
+                or_(models.UserSession.current_menu != "main", cast(models.UserSession.session_data, Text) != "{}"),
+            )
+        ).scalar()
+
+async def sweeper_pass(sweeper: SessionSweeper, now: datetime):
+    BATCH_TIMES.clear()
+    start = time.perf_counter()
+    swept = await sweeper.sweep(now)
+    elapsed = time.perf_counter() - start
+    gaps = [b - a for a, b in zip([start] + BATCH_TIMES, BATCH_TIMES)]
+    return swept["rows_expired"], elapsed, max(gaps) if gaps else 0.0
+
+async def compare(sessions: int, batch_size: int):
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
+    populate(sessions, now)
+    print(f"{sessions} sessions, {expired_with_state(cutoff)} idle with state left behind")
+
+    with engine.connect() as conn:
+        stmt = _expire_candidates().where(models.UserSession.last_active < cutoff).order_by(models.UserSession.last_active).limit(batch_size)
+        compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+        print("batch query plan:", "; ".join(row[-1] for row in plan))
+
+    sweeper = SessionSweeper(interval=0, batch_size=batch_size, compact_after_days=0)
+    rows, elapsed, longest = await sweeper_pass(sweeper, now)
+    print(f"sweeper, first pass:        {rows:7d} rows in {elapsed * 1000:8.1f} ms, {sweeper.stats['batches']} batches, longest batch {longest * 1000:6.1f} ms")
+    rows, elapsed, longest = await sweeper_pass(sweeper, now + timedelta(seconds=60))
+    print(f"sweeper, next pass (+60 s): {rows:7d} rows in {elapsed * 1000:8.1f} ms")
+    print(f"left idle with state:       {expired_with_state(cutoff):7d}")
+
+    # The same reset as one statement, for comparison; the whole run holds the writer lock.
+    with engine.begin() as conn:
+        conn.execute(update(models.UserSession).values(current_menu="jobs", session_data=STATE, last_active=models.UserSession.last_active))
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(models.UserSession)
+            .where(models.UserSession.last_active < cutoff)
+            .values(current_menu="main", session_data={}, last_active=models.UserSession.last_active)
+        )
+    print(f"single UPDATE:              {result.rowcount:7d} rows in {(time.perf_counter() - start) * 1000:8.1f} ms, all under one lock")
+    await async_engine.dispose()
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else settings.SESSION_SWEEP_BATCH_SIZE
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare(sessions, batch_size))
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# benchmarks/bench_session_upsert.py
+"""
+Concurrency check and round-trip count for crud.get_or_create_session.
+
+Fires 100 simultaneous first messages from the same number, then 100 first
+messages from distinct numbers, then returning users, and compares
+statements per call with the old SELECT / INSERT / COMMIT / refresh path.
+
+It doubles as the concurrency test: for the upsert, the same-number burst
+must yield one row, exactly one is_new and no IntegrityError (or any other
+error), distinct numbers one new session each, returning users no is_new,
+and an idle session must come back reset. The script exits non-zero when
+any of these fails, so it can be run as a check.
+
+Run from the project root: python -m benchmarks.bench_session_upsert [concurrent]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import event, func, select, update
+
+from app import crud, models
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine, engine
+
+STATEMENTS = {"count": 0}
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    STATEMENTS["count"] += 1
+
+async def legacy_get_or_create(db, phone_number: str, user_name: str):
+    """The pre-upsert implementation: SELECT, then INSERT + COMMIT + refresh for new users."""
+    result = await db.execute(select(models.UserSession).where(models.UserSession.phone_number == phone_number))
+    session = result.scalars().first()
+    if session:
+        session.last_active = datetime.now(timezone.utc)
+        return session, False
+    session = models.UserSession(phone_number=phone_number, user_name=user_name, current_menu="main", session_data={})
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return session, True
+
+async def first_message(get_or_create, phone_number: str):
+    async with AsyncSessionLocal() as db:
+        try:
+            _, is_new = await get_or_create(db, phone_number, "Bench")
+            return is_new
+        except Exception as e:
+            return e
+
+async def burst(get_or_create, phone_numbers):
+    STATEMENTS["count"] = 0
+    start = time.perf_counter()
+    results = await asyncio.gather(*(first_message(get_or_create, number) for number in phone_numbers))
+    elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, Exception)]
+    return {
+        "ms": elapsed * 1000,
+        "new": sum(1 for r in results if r is True),
+        "errors": len(errors),
+        "first_error": type(errors[0]).__name__ if errors else "",
+        "statements": STATEMENTS["count"] / len(phone_numbers),
+    }
+
+async def row_count(prefix: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(models.UserSession).where(models.UserSession.phone_number.like(f"{prefix}%")))
+
+def report(label: str, stats: dict):
+    error = f" ({stats['first_error']})" if stats["errors"] else ""
+    print(
+        f"{label:40s} {stats['ms']:8.1f} ms, is_new {stats['new']:3d}, errors {stats['errors']:3d}{error}, "
+        f"{stats['statements']:.2f} statements/call"
+    )
+
+def check(failures: list, label: str, ok: bool, detail: str = ""):
+    print(f"check: {label:50s} {'ok' if ok else 'FAILED: ' + detail}")
+    if not ok:
+        failures.append(label)
+
+async def check_timeout_reset(failures: list):
+    """An idle session comes back on the main menu with its flow state cleared, in the same statement."""
+    async with AsyncSessionLocal() as db:
+        session, _ = await crud.get_or_create_session(db, "idle-user", "Bench")
+        await db.execute(
+            update(models.UserSession)
+            .where(models.UserSession.id == session.id)
+            .values(current_menu="jobs", session_data={"awaiting_job_role": True},
+                    last_active=datetime.now(timezone.utc) - timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES + 1))
+        )
+        await db.commit()
+        session, is_new = await crud.get_or_create_session(db, "idle-user", "Bench")
+    check(failures, "idle session reset to the main menu",
+          not is_new and session.current_menu == "main" and session.session_data == {},
+          f"is_new={is_new}, menu={session.current_menu!r}, state={session.session_data!r}")
+
+async def main() -> list:
+    concurrent = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    results = {}
+    for label, get_or_create, prefix in (("legacy select/insert", legacy_get_or_create, "legacy"), ("upsert", crud.get_or_create_session, "upsert")):
+        same = await burst(get_or_create, [f"{prefix}-same"] * concurrent)
+        report(f"{label}: {concurrent} x same number", same)
+        distinct = await burst(get_or_create, [f"{prefix}-{i}" for i in range(concurrent)])
+        report(f"{label}: {concurrent} new numbers", distinct)
+        returning = await burst(get_or_create, [f"{prefix}-{i}" for i in range(concurrent)])
+        report(f"{label}: {concurrent} returning users", returning)
+        print(f"{label:40s} {await row_count(prefix)} rows for {concurrent + 1} numbers")
+        results[prefix] = (same, distinct, returning)
+
+    # Only the upsert is held to these; the legacy path is there for comparison.
+    same, distinct, returning = results["upsert"]
+    same_rows = await row_count("upsert-same")
+    failures = []
+    check(failures, f"{concurrent} x same number: no IntegrityError or other error",
+          same["errors"] == 0, f"{same['errors']} errors ({same['first_error']})")
+    check(failures, f"{concurrent} x same number: exactly one is_new", same["new"] == 1, f"{same['new']} is_new")
+    check(failures, f"{concurrent} x same number: one row", same_rows == 1, f"{same_rows} rows")
+    check(failures, f"{concurrent} new numbers: no errors, all is_new",
+          distinct["errors"] == 0 and distinct["new"] == concurrent,
+          f"{distinct['errors']} errors, {distinct['new']} is_new")
+    check(failures, f"{concurrent} returning users: no errors, none is_new",
+          returning["errors"] == 0 and returning["new"] == 0,
+          f"{returning['errors']} errors, {returning['new']} is_new")
+    await check_timeout_reset(failures)
+    await async_engine.dispose()
+    return failures
+
+if __name__ == "__main__":
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        failures = asyncio.run(main())
+    finally:
+        os.remove(DB_PATH)
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
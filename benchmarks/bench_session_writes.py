@@ -0,0 +1,72 @@
+# benchmarks/bench_session_writes.py
+"""
+Measures row bytes written per turn for a scripted conversation: the old
+update_session (all columns re-serialised every turn) versus dirty-column
+writes, both write-through and coalesced by the write-behind cache.
+
+Run from the project root: python -m benchmarks.bench_session_writes
+"""
+import asyncio
+import os
+import tempfile
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from app import crud, models, services, whatsapp_client
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.session_cache import SessionCache
+
+SCRIPT = [
+    "hi", "5", "Jane Doe", "yes", "jane@example.com", "yes", "0712 345 678", "yes", "linkedin.com/in/jane", "yes",
+    "Accountant with 3 years of experience who cut reporting errors by 15%.", "yes", "skip", "yes",
+    "QuickBooks, Excel, Budgeting", "yes", "BCom Finance, University of Nairobi", "yes",
+    "menu", "7", "Tatu City", "yes", "Project Accountant", "yes", "Financial Reporting", "yes",
+    "I prepared monthly reports at XYZ.", "yes", "Your sustainability work.", "yes", "no", "0", "menu",
+]
+
+def full_row_bytes(session: models.UserSession, documents) -> int:
+    """What the old update_session wrote: every state column and all four JSON blobs, every turn."""
+    columns = {column: crud._column_value(session, column) for column in crud.SESSION_STATE_COLUMNS}
+    if documents is not None:
+        columns.update({column: crud._column_value(documents, column) for column in crud.DOCUMENT_COLUMNS})
+    return crud.row_bytes(columns)
+
+async def converse(cache: SessionCache, phone_number: str) -> int:
+    """Plays the script through the cache and returns the full-row bytes the old path would have written."""
+    full_bytes = 0
+    documents = None
+    async with AsyncSessionLocal() as db:
+        for text in SCRIPT:
+            session, is_new = await cache.get_or_create(db, phone_number, "Jane")
+            await services.process_message(db, session, text, is_new_user=is_new)
+            documents = crud.loaded_documents(session) or documents
+            full_bytes += full_row_bytes(session, documents)
+            await cache.mark_dirty(session)
+            await whatsapp_client.pop_web_replies(phone_number)
+    await cache.flush()
+    return full_bytes
+
+async def compare():
+    turns = len(SCRIPT)
+    write_through = SessionCache(flush_interval=0, max_entries=100)
+    full_bytes = await converse(write_through, "web-bench-a")
+    coalesced = SessionCache(flush_interval=3600, max_entries=100)
+    await converse(coalesced, "web-bench-b")
+
+    print(f"turns: {turns}")
+    print(f"full-row rewrite:       {full_bytes / turns:6.0f} bytes/turn, {turns} row writes")
+    print(f"dirty columns only:     {write_through.stats['bytes_written'] / turns:6.0f} bytes/turn, {write_through.stats['rows_written']} row writes")
+    print(f"write-behind (1 flush): {coalesced.stats['bytes_written'] / turns:6.0f} bytes/turn, {coalesced.stats['rows_written']} row writes")
+    await async_engine.dispose()
+
+def main():
+    models.Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(compare())
+    finally:
+        os.remove(DB_PATH)
+
+if __name__ == "__main__":
+    main()
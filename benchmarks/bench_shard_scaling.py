@@ -0,0 +1,78 @@
+# benchmarks/bench_shard_scaling.py
+"""
+Write throughput of sharded SQLite as the shard count grows.
+
+Each simulated user takes turns that upsert its session and save the changed
+state through crud, with every shard file on the sqlite engine profile
+(WAL, synchronous=NORMAL). One shard is the single-file layout; with more,
+commits for users on different shards stop queueing behind one writer lock.
+
+Run from the project root: python -m benchmarks.bench_shard_scaling [users] [turns] [synchronous]
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, models
+from app.config import settings
+from app.database import build_engines, build_shard_engines, sharded_sessionmaker
+
+SHARD_COUNTS = (1, 2, 4, 8)
+
+async def user_turns(sessionmaker, phone_number: str, turns: int, errors: list):
+    for turn in range(turns):
+        try:
+            async with sessionmaker() as db:
+                session, _ = await crud.get_or_create_session(db, phone_number, "Bench")
+                session.current_menu = "jobs" if turn % 2 else "main"
+                session.session_data = {"awaiting_job_role": bool(turn % 2), "turn": turn}
+                await crud.update_session(db, session)
+        except Exception as e:
+            errors.append(e)
+
+async def run(shards: int, users: int, turns: int, directory: str):
+    settings.SQLITE_SHARD_COUNT = shards
+    url = f"sqlite:///{directory}/bench.db"
+    if shards == 1:
+        sync_engine, async_engine, _ = build_engines(url)
+        engines = {"single": (sync_engine, async_engine)}
+        sessionmaker = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    else:
+        engines = build_shard_engines(url, shards)
+        sessionmaker = sharded_sessionmaker({shard_id: pair[1] for shard_id, pair in engines.items()})
+    for sync_engine, _ in engines.values():
+        models.Base.metadata.create_all(bind=sync_engine)
+        sync_engine.dispose()
+
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(user_turns(sessionmaker, f"2547{u:08d}", turns, errors) for u in range(users)))
+    elapsed = time.perf_counter() - start
+    for _, async_engine in engines.values():
+        await async_engine.dispose()
+    writes = users * turns * 2 - len(errors) * 2
+    return writes / elapsed, elapsed, len(errors)
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    if len(sys.argv) > 3:
+        settings.SQLITE_SYNCHRONOUS = sys.argv[3]
+    print(f"{users} concurrent users x {turns} turns (2 writes per turn), synchronous={settings.SQLITE_SYNCHRONOUS}")
+    baseline = None
+    for shards in SHARD_COUNTS:
+        directory = tempfile.mkdtemp()
+        try:
+            rate, elapsed, failed = await run(shards, users, turns, directory)
+        finally:
+            shutil.rmtree(directory)
+        baseline = baseline or rate
+        print(f"{shards} shard(s): {rate:8.0f} writes/s ({rate / baseline:4.2f}x), {elapsed:6.2f}s, failed turns: {failed}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
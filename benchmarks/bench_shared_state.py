@@ -0,0 +1,136 @@
+# benchmarks/bench_shared_state.py
+"""
+Shared state across worker processes: what each backend keeps consistent.
+
+Starts four worker processes, as uvicorn --workers 4 would, on one temporary
+SQLite file, and has them all hit the same keys at once (a barrier starts
+each phase together):
+
+- counter: every worker increments one counter.
+- locked update: every worker reads a number under STATE.lock and writes it
+  back plus one, so an update made without the lock would be lost.
+- web replies: every worker stores replies, through send_whatsapp_message,
+  for the same handful of web users; then each worker collects the replies
+  of the users it owns, most of them stored by other workers.
+
+With SHARED_STATE_BACKEND=database the counter, the total and the collected
+replies must all equal what the four workers wrote (the run fails
+otherwise). With memory each worker only sees its own writes, which is what
+module-level dicts gave several workers. Throughput is operations per second
+over all workers for each phase.
+
+Run from the project root: python -m benchmarks.bench_shared_state [ops per worker]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# Spawned workers import this module again; they must use the parent's database.
+if "BENCH_SHARED_STATE_DB" not in os.environ:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ["BENCH_SHARED_STATE_DB"] = path
+DB_PATH = os.environ["BENCH_SHARED_STATE_DB"]
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+WORKERS = 4
+USERS = 8
+
+def worker(index: int, ops: int, barrier, results):
+    """One worker process: runs each phase once the others are ready and reports what it saw."""
+    from app import whatsapp_client
+    from app.database import async_schema_engines
+    from app.shared_state import STATE
+
+    async def phase(name: str, body, timings: dict):
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+        start = time.perf_counter()
+        await body()
+        timings[name] = time.perf_counter() - start
+
+    async def counter():
+        for _ in range(ops):
+            await STATE.incr("bench:counter")
+
+    async def locked_update():
+        for _ in range(ops):
+            async with STATE.lock("bench:total"):
+                await STATE.set("bench:total", (await STATE.get("bench:total") or 0) + 1)
+
+    async def store_replies():
+        for n in range(ops):
+            await whatsapp_client.send_whatsapp_message(f"web-bench-{n % USERS}", f"{index}:{n}")
+
+    async def run():
+        timings = {}
+        await phase("counter", counter, timings)
+        await phase("locked update", locked_update, timings)
+        await phase("web replies", store_replies, timings)
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+        collected = []
+        for user in range(index, USERS, WORKERS):
+            collected += await whatsapp_client.pop_web_replies(f"web-bench-{user}")
+        # Each worker's replies to one user must come back in the order it sent them.
+        for user in range(index, USERS, WORKERS):
+            for sender in range(WORKERS):
+                sent = [int(reply.split(":")[1]) for reply in collected if reply.startswith(f"{sender}:") and int(reply.split(":")[1]) % USERS == user]
+                assert sent == sorted(sent), f"replies to web-bench-{user} from worker {sender} out of order"
+        counter_seen = await STATE.get("bench:counter")
+        total_seen = await STATE.get("bench:total")
+        for engine in async_schema_engines():
+            await engine.dispose()
+        return {"timings": timings, "counter": counter_seen, "total": total_seen, "collected": len(collected)}
+
+    results.put(asyncio.run(run()))
+
+def run_backend(backend: str, ops: int) -> list:
+    os.environ["SHARED_STATE_BACKEND"] = backend
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(WORKERS), context.Queue()
+    processes = [context.Process(target=worker, args=(index, ops, barrier, results)) for index in range(WORKERS)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0, f"a {backend} worker failed"
+    return reports
+
+def report(backend: str, ops: int, reports: list) -> bool:
+    expected = WORKERS * ops
+    counters = sorted(r["counter"] for r in reports)
+    totals = sorted(r["total"] for r in reports)
+    collected = sum(r["collected"] for r in reports)
+    print(f"{backend}:")
+    for name in reports[0]["timings"]:
+        # Phases start together, so the slowest worker is the phase's wall time.
+        wall = max(r["timings"][name] for r in reports)
+        print(f"  {name:>14}: {expected / wall:9,.0f} ops/s ({wall:.2f} s for {expected:,})")
+    print(f"  counter seen by each worker: {counters} (expected {expected:,})")
+    print(f"  locked total seen by each worker: {totals} (expected {expected:,})")
+    print(f"  web replies collected: {collected:,} of {expected:,}")
+    return counters == [expected] * WORKERS and totals == [expected] * WORKERS and collected == expected
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    from app import models
+    from app.database import engine
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        engine.dispose()
+        print(f"{WORKERS} worker processes, {ops} operations each per phase, on one SQLite file")
+        report("memory", ops, run_backend("memory", ops))
+        consistent = report("database", ops, run_backend("database", ops))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+    assert consistent, "the database backend lost writes between workers"
+    print("database backend: every worker saw every other worker's writes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_startup.py
+"""
+Cold start: how long a fresh worker takes to import, serve and be ready.
+
+Each run is a new interpreter, as a new uvicorn worker is. It imports
+app.main, enters the app's lifespan (what uvicorn does before it accepts
+connections) and then polls /healthz and /readyz in-process, through httpx's
+ASGI transport, until the warm-up reports ready; then one free-text turn
+(which needs the intent classifier) is timed. Times are from interpreter
+start, so they include Python's own startup, and each run's warm-up steps
+are taken from /readyz.
+
+The database is a temporary SQLite file given the schema beforehand, as
+alembic upgrade head would.
+
+Run from the project root: python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RESULT = "RESULT "
+
+def child():
+    """One cold start; prints its timings as a RESULT line."""
+    import asyncio
+    started = float(os.environ["BENCH_STARTED"])
+
+    import httpx
+    from app.main import app
+    from benchmarks.bench_metrics import webhook_body
+    imported = time.time() - started
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            serving = time.time() - started
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                assert (await client.get("/healthz")).status_code == 200
+                healthy = time.time() - started
+                while (response := await client.get("/readyz")).status_code != 200:
+                    await asyncio.sleep(0.005)
+                ready = time.time() - started
+                start = time.perf_counter()
+                reply = await client.post("/webhook", json=webhook_body("web-bench-1", "nataka kazi ya driver"))
+                first_turn = time.perf_counter() - start
+                assert reply.json()["replies"]
+        steps = {name: status["seconds"] for name, status in response.json()["steps"].items()}
+        return {"import": imported, "serving": serving, "healthz": healthy, "ready": ready, "first_turn": first_turn, **steps}
+
+    print(RESULT + json.dumps(asyncio.run(run())), flush=True)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "LOG_LEVEL": "WARNING"}
+    try:
+        subprocess.run([sys.executable, "-c", "from app import models; from app.database import engine; "
+                        "models.Base.metadata.create_all(bind=engine)"], env=env, check=True)
+        results = []
+        for _ in range(runs):
+            env["BENCH_STARTED"] = repr(time.time())
+            output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], env=env,
+                                    check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(next(line for line in output.splitlines() if line.startswith(RESULT))[len(RESULT):]))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    print(f"median of {runs} cold starts, seconds from interpreter start:")
+    for key in ("import", "serving", "healthz", "ready"):
+        print(f"  {key:>8}: {statistics.median(result[key] for result in results):6.3f}")
+    print(f"first free-text turn once ready: {statistics.median(result['first_turn'] for result in results) * 1000:.1f} ms")
+    print("warm-up steps (run after serving starts):")
+    for key in results[0]:
+        if key not in ("import", "serving", "healthz", "ready", "first_turn"):
+            print(f"  {key:>17}: {statistics.median(result[key] for result in results) * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--child"]:
+        child()
+    else:
+        main()
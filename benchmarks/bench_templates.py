@@ -0,0 +1,84 @@
+# benchmarks/bench_templates.py
+"""
+Reply rendering cost per turn: the old text_responses, which built every
+f-string of a dict on each call, versus the precompiled template registry.
+
+The old functions are reproduced below as they were. A turn renders what a
+search turn sends: the "searching" note, the results line with a few
+listings, and the main menu. The English output of both is checked to agree
+before timing, and every locale is checked for missing keys.
+
+Run from the project root: python -m benchmarks.bench_templates [turns]
+"""
+import random
+import sys
+import timeit
+from typing import List, Optional
+
+from app import templates, text_responses
+
+LISTINGS = ["*Accountant* at XYZ Ltd, Nairobi", "*Junior Accountant* at ABC Sacco, Thika", "*Audit Assistant* at KPMG, Nairobi"]
+CONTEXTS = ["jobs_found", "no_jobs_found", "training_found", "mentors_found", "interest_saved_and_guides_found", "other"]
+
+def legacy_main_menu() -> str:
+    return (
+        "What's our mission for today?\n\n"
+        "1️⃣ **Find a new job** (Tafuta Kazi)\n"
+        "2️⃣ **Learn a new skill** (Jifunze Ujuzi)\n"
+        "3️⃣ **Connect with a mentor** (Pata Ushauri)\n"
+        "4️⃣ **Explore a business idea** (Anzisha Biashara)\n"
+        "5️⃣ **Build a simple CV**\n"
+        "6️⃣ **AI Interview Practice**\n"
+        "7️⃣ **Generate a Cover Letter**\n"
+        "8️⃣ **Optimize My CV for a Job**\n"
+        "9️⃣ **Analyze Job Skills**\n\n"
+        "Just reply with the number of your choice, or type '0' to reset."
+    )
+
+def legacy_empathetic_response(context: str, listings: List[str] = [], interest: Optional[str] = None) -> str:
+    interest_text = f"*{interest}*" if interest else "your topic"
+    responses = {
+        "searching": [ f"Okay, let me check the latest opportunities for {interest_text}. One moment..." ],
+        "api_error": [ "Apologies, I'm having a little trouble connecting to our services right now. Could you please try again in a few minutes?" ],
+        "jobs_found": [ f"Alright, I found a few promising roles for {interest_text}! Here’s what I’ve got:" ],
+        "no_jobs_found": [ f"Hmm, it looks like there aren't any open roles for {interest_text} right now. That's okay! I'll keep an eye out and can alert you when one is posted." ],
+        "training_found": [ f"Perfect! I've found some great courses to help you build your skills in {interest_text}. Take a look:" ],
+        "no_training_found": [ f"I couldn't find any specific courses for {interest_text} at the moment, but I'll keep searching and let you know if something comes up!" ],
+        "guides_found": [ f"That's a great field! I've gathered some resources to get you started with {interest_text}:" ],
+        "no_guides_found": [ f"I don't have specific guides for {interest_text} just yet, but that's a great topic. I'll research it and add it to my knowledge base!" ],
+        "mentors_found": [ f"Connecting with a mentor is a brilliant idea! Here are some experienced professionals in {interest_text} who are available:" ],
+        "no_mentors_found": [ f"It seems my list of mentors for {interest_text} is empty right now. I'll work on finding experts to add!" ],
+        "interest_saved_and_jobs_found": [ f"Great! I've saved your interest in {interest_text}.\n\nHere are the first results I found for you:" ],
+        "interest_saved_and_training_found": [ f"Great! I've saved your interest in {interest_text}.\n\nHere are the first courses:" ],
+        "interest_saved_and_mentors_found": [ f"Perfect! I've saved your interest in {interest_text}.\n\nHere are some available mentors:" ],
+        "interest_saved_and_guides_found": [ f"Excellent! I've saved your interest in {interest_text}.\n\nHere are the first guides:" ],
+    }
+    listing_str = "\n\n" + "\n".join(listings) if listings else ""
+    return random.choice(responses.get(context, ["Here is the information I found for you:"])) + listing_str
+
+def legacy_turn(context: str, interest: Optional[str], locale: str):
+    return (legacy_empathetic_response("searching", interest=interest), legacy_empathetic_response(context, listings=LISTINGS, interest=interest),
+            legacy_main_menu())
+
+def registry_turn(context: str, interest: Optional[str], locale: str):
+    return (text_responses.get_empathetic_response("searching", interest=interest, locale=locale),
+            text_responses.get_empathetic_response(context, listings=LISTINGS, interest=interest, locale=locale),
+            text_responses.get_main_menu(locale))
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    problems = templates.check(templates.TEMPLATES.locales)
+    keys = len(templates.TEMPLATES.locales[templates.DEFAULT_LOCALE])
+    print(f"{len(templates.LOCALES)} locales, {keys} keys each: {'complete' if not problems else '; '.join(problems)}")
+
+    rng = random.Random(3)
+    cases = [(rng.choice(CONTEXTS), rng.choice(["Accountant", "data entry", None]), rng.choice(templates.LOCALES)) for _ in range(turns)]
+    differ = [case for case in cases if legacy_turn(case[0], case[1], "en") != registry_turn(case[0], case[1], "en")]
+    print(f"{turns} turns, {len(differ)} rendered differently in English")
+
+    for name, turn in (("f-string dict per call", legacy_turn), ("precompiled registry", registry_turn)):
+        best = min(timeit.repeat(lambda: [turn(*case) for case in cases], number=1, repeat=5))
+        print(f"{name}: {best / turns * 1e6:6.2f} us/turn")
+
+if __name__ == "__main__":
+    main()
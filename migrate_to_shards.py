@@ -0,0 +1,115 @@
+# migrate_to_shards.py
+"""
+Copies a single-file SQLite database (DATABASE_URL) into the sharded layout:
+SQLITE_SHARD_COUNT files next to it, each holding the sessions whose phone
+number hashes to that shard, plus their documents and feedback. Each shard's
+feedback_daily_stats is rebuilt from the feedback it was given.
+
+Row ids are kept, so user_documents keeps pointing at the right session. The
+source file is left untouched; set SQLITE_SHARD_COUNT in .env once this
+reports matching counts. The shard files must not exist yet, and the source
+must be on the current schema (alembic upgrade head, run without
+SQLITE_SHARD_COUNT). The shards are stamped with that revision, so from then
+on alembic upgrade head migrates every shard.
+
+Usage: SQLITE_SHARD_COUNT=4 python migrate_to_shards.py [batch_size]
+"""
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import case, func, select
+
+from app import models, sharding
+from app.config import settings
+from app.database import build_engines, build_shard_engines
+
+def copy_table(source, shard_engines, table, shard_of_row, batch_size: int) -> dict:
+    """Streams a table out of the source and appends each row to its shard; returns rows per shard."""
+    counts = defaultdict(int)
+    with source.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(select(table))
+        for partition in result.mappings().partitions():
+            by_shard = defaultdict(list)
+            for row in partition:
+                shard_id = shard_of_row(row)
+                if shard_id is not None:
+                    by_shard[shard_id].append(dict(row))
+            for shard_id, rows in by_shard.items():
+                with shard_engines[shard_id].begin() as shard_conn:
+                    shard_conn.execute(table.insert(), rows)
+                counts[shard_id] += len(rows)
+    return counts
+
+def rebuild_daily_stats(shard_engine) -> int:
+    """Counts a shard's feedback per day into feedback_daily_stats, as migration 0005 does; returns responses counted."""
+    feedback, stats = models.Feedback.__table__, models.FeedbackDailyStats.__table__
+    day = func.date(feedback.c.timestamp)
+    with shard_engine.begin() as conn:
+        conn.execute(stats.insert().from_select(
+            ["day", "responses", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5"],
+            select(day, func.count(), *[func.sum(case((feedback.c.rating == stars, 1), else_=0)) for stars in range(1, 6)])
+            .group_by(day),
+        ))
+        return conn.execute(select(func.coalesce(func.sum(stats.c.responses), 0))).scalar()
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    if not sharding.is_sharded():
+        sys.exit("Set SQLITE_SHARD_COUNT to 2 or more for the target layout.")
+    for shard_id in sharding.shard_ids():
+        path = sharding.shard_url(settings.DATABASE_URL, shard_id).split("///", 1)[-1]
+        if os.path.exists(path):
+            sys.exit(f"{path} already exists; refusing to merge into an existing shard.")
+
+    source = build_engines(settings.DATABASE_URL)[0]
+    shard_engines = {shard_id: engines[0] for shard_id, engines in build_shard_engines(settings.DATABASE_URL).items()}
+    for shard_engine in shard_engines.values():
+        models.Base.metadata.create_all(bind=shard_engine)
+    # The shards start on the current schema; later migrations are applied to each of them.
+    root = Path(__file__).resolve().parent
+    alembic_config = Config(str(root / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(root / "app" / "alembic"))
+    command.stamp(alembic_config, "head")
+
+    # Documents only carry the session id, so remember which shard each id went to.
+    shard_of_session = {}
+    def session_shard(row):
+        shard_id = sharding.shard_for(row["phone_number"])
+        shard_of_session[row["id"]] = shard_id
+        return shard_id
+
+    print(f"--- Sharding '{settings.DATABASE_URL}' into {len(shard_engines)} files ---")
+    tables = (
+        (models.UserSession.__table__, session_shard),
+        (models.UserDocuments.__table__, lambda row: shard_of_session.get(row["user_session_id"])),
+        (models.Feedback.__table__, lambda row: sharding.shard_for(row["user_phone_number"])),
+    )
+    for table, shard_of_row in tables:
+        counts = copy_table(source, shard_engines, table, shard_of_row, batch_size)
+        with source.connect() as conn:
+            expected = conn.execute(select(func.count()).select_from(table)).scalar()
+        copied = sum(counts.values())
+        per_shard = ", ".join(f"{shard_id}={counts[shard_id]}" for shard_id in shard_engines)
+        status = "ok" if copied == expected else f"MISMATCH (source has {expected})"
+        print(f"{table.name:20s} {copied:8d} rows [{per_shard}] {status}")
+
+    # Days are split across shards, so the check is on responses rather than rows.
+    stats = models.FeedbackDailyStats.__table__
+    counts = {shard_id: rebuild_daily_stats(shard_engine) for shard_id, shard_engine in shard_engines.items()}
+    with source.connect() as conn:
+        expected = conn.execute(select(func.coalesce(func.sum(stats.c.responses), 0))).scalar()
+    counted = sum(counts.values())
+    per_shard = ", ".join(f"{shard_id}={counts[shard_id]}" for shard_id in shard_engines)
+    status = "ok" if counted == expected else f"MISMATCH (source counts {expected})"
+    print(f"{stats.name:20s} {counted:8d} responses [{per_shard}] {status}")
+
+    source.dispose()
+    for shard_engine in shard_engines.values():
+        shard_engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 # test_cli.py
 import asyncio
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud, services, whatsapp_client # Import the client
-from app.database import SessionLocal, engine, Base
+from app.database import AsyncSessionLocal, engine, Base
 
 # --- IMPORTANT: Activate Mock Mode ---
 # This tells the whatsapp_client to print messages instead of sending them.
@@ -24,10 +24,10 @@ async def main():
     test_user_name = "Test User"
     
     # Get a database session
-    db: Session = SessionLocal()
+    db: AsyncSession = AsyncSessionLocal()
     
     # Get or create the user session
-    session, is_new = crud.get_or_create_session(db, phone_number=test_phone_number, user_name=test_user_name)
+    session, is_new = await crud.get_or_create_session(db, phone_number=test_phone_number, user_name=test_user_name)
     
     print(f"\n[System] Starting session for user: {test_user_name} (New User: {is_new})")
     print("-" * 20)
@@ -35,7 +35,7 @@ async def main():
     # Send an initial "hi" to start the conversation
     print("KaziLeo:")
     await services.process_message(db, session, "hi", is_new_user=is_new)
-    crud.update_session(db, session)
+    await crud.update_session(db, session)
 
     while True:
         user_input = input("\nYou: ")
@@ -49,9 +49,9 @@ async def main():
         await services.process_message(db, session, user_input, is_new_user=False)
         
         # IMPORTANT: We must update the session after each message to save the state
-        crud.update_session(db, session)
+        await crud.update_session(db, session)
 
-    db.close()
+    await db.close()
 
 if __name__ == "__main__":
     asyncio.run(main())